@@ -0,0 +1,162 @@
+import os
+import csv
+import math
+from typing import Dict, List
+
+# Used for the bus-load estimate when the log does not say otherwise
+DEFAULT_BITRATE = 500_000
+
+# Per-ID record layout: [frames, intervals, last_ts, min_dt, max_dt, mean_dt, m2_dt, dlc_counts]
+_FRAMES, _INTERVALS, _LAST, _MIN_DT, _MAX_DT, _MEAN_DT, _M2_DT, _DLCS = range(8)
+
+
+def frame_bits(can_id: int, dlc: int) -> int:
+    """
+    Length of a classic CAN frame on the wire, with worst-case bit stuffing
+    and the 3-bit interframe space. IDs above 0x7FF are taken as extended.
+    """
+    data_bits = 8 * dlc
+    if can_id > 0x7FF:
+        return 67 + data_bits + (54 + data_bits - 1) // 4
+    return 47 + data_bits + (34 + data_bits - 1) // 4
+
+
+class BusStats:
+    """
+    Bus statistics accumulated while a log is decoded.
+
+    add() is called once per frame and updates a fixed-size record for the
+    frame's ID (count, last time, min/max inter-arrival, running mean
+    and variance via Welford, DLC counts) plus the bits seen in that second.
+    Memory is O(IDs + seconds); nothing is stored per frame and the file is
+    never read a second time.
+    """
+
+    def __init__(self, bitrate: int = DEFAULT_BITRATE):
+        self.bitrate = bitrate
+        self.frames = 0
+        self.first_ts = None
+        self.last_ts = None
+        self._ids: Dict[int, list] = {}
+        self._bits_per_second: Dict[int, int] = {}
+
+    def __len__(self):
+        return self.frames
+
+    def add(self, timestamp: float, can_id: int, dlc: int):
+        self.frames += 1
+        if self.first_ts is None:
+            self.first_ts = timestamp
+        self.last_ts = timestamp
+
+        rec = self._ids.get(can_id)
+        if rec is None:
+            self._ids[can_id] = [1, 0, timestamp, math.inf, 0.0, 0.0, 0.0, {dlc: 1}]
+        else:
+            dt = timestamp - rec[_LAST]
+            if dt >= 0:  # a backwards jump (unsorted input) starts a new interval chain
+                rec[_INTERVALS] += 1
+                n = rec[_INTERVALS]
+                if dt < rec[_MIN_DT]:
+                    rec[_MIN_DT] = dt
+                if dt > rec[_MAX_DT]:
+                    rec[_MAX_DT] = dt
+                delta = dt - rec[_MEAN_DT]
+                rec[_MEAN_DT] += delta / n
+                rec[_M2_DT] += delta * (dt - rec[_MEAN_DT])
+            rec[_FRAMES] += 1
+            rec[_LAST] = timestamp
+            dlcs = rec[_DLCS]
+            dlcs[dlc] = dlcs.get(dlc, 0) + 1
+
+        second = math.floor(timestamp)
+        self._bits_per_second[second] = self._bits_per_second.get(second, 0) + frame_bits(can_id, dlc)
+
+    # ------------------ RESULTS ------------------
+    def per_id(self) -> List[dict]:
+        """One entry per CAN ID, sorted by ID. Times are in milliseconds."""
+        duration = (self.last_ts - self.first_ts) if self.frames else 0.0
+        total_bits = sum(self._bits_per_second.values()) or 1
+        out = []
+        for can_id in sorted(self._ids):
+            frames, intervals, _, min_dt, max_dt, mean_dt, m2, dlcs = self._ids[can_id]
+            bits = sum(frame_bits(can_id, dlc) * count for dlc, count in dlcs.items())
+            out.append({
+                "id": can_id,
+                "frames": frames,
+                "rate_hz": frames / duration if duration > 0 else 0.0,
+                "min_ms": min_dt * 1000 if intervals else None,
+                "mean_ms": mean_dt * 1000 if intervals else None,
+                "max_ms": max_dt * 1000 if intervals else None,
+                "jitter_ms": math.sqrt(m2 / intervals) * 1000 if intervals > 1 else None,
+                "dlcs": dict(sorted(dlcs.items())),
+                "bus_share_pct": 100.0 * bits / total_bits,
+            })
+        return out
+
+    def load_per_second(self) -> List[tuple]:
+        """(second since the first frame, estimated bus load in %) for every second with traffic."""
+        if not self.frames:
+            return []
+        start = math.floor(self.first_ts)
+        return [
+            (second - start, 100.0 * bits / self.bitrate)
+            for second, bits in sorted(self._bits_per_second.items())
+        ]
+
+    def report_lines(self, title: str = "") -> List[str]:
+        loads = [load for _, load in self.load_per_second()]
+        duration = (self.last_ts - self.first_ts) if self.frames else 0.0
+        lines = [f"Bus statistics{': ' + title if title else ''}"]
+        lines.append(f"Frames: {self.frames:,}  |  IDs: {len(self._ids)}  |  Duration: {duration:.3f} s")
+        if loads:
+            peak_second, peak = max(self.load_per_second(), key=lambda x: x[1])
+            lines.append(
+                f"Bus load @ {self.bitrate // 1000} kbit/s: mean {sum(loads) / len(loads):.1f} %  |  "
+                f"peak {peak:.1f} % (second {peak_second})"
+            )
+        lines.append("")
+
+        fmt = lambda v: "-" if v is None else f"{v:.3f}"
+        header = f"{'CAN ID':>10} {'Frames':>10} {'Rate Hz':>9} {'Min ms':>9} {'Mean ms':>9} {'Max ms':>9} {'Jitter ms':>9} {'Share %':>7}  DLCs"
+        lines.append(header)
+        lines.append("-" * len(header))
+        for s in self.per_id():
+            can_id = f"0x{s['id']:08X}" if s["id"] > 0x7FF else f"0x{s['id']:03X}"
+            dlcs = " ".join(f"{dlc}:{count}" for dlc, count in s["dlcs"].items())
+            lines.append(
+                f"{can_id:>10} {s['frames']:>10,} {s['rate_hz']:>9.2f} {fmt(s['min_ms']):>9} {fmt(s['mean_ms']):>9} "
+                f"{fmt(s['max_ms']):>9} {fmt(s['jitter_ms']):>9} {s['bus_share_pct']:>7.2f}  {dlcs}"
+            )
+        return lines
+
+    def write_report(self, path: str, title: str = "") -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.report_lines(title)) + "\n")
+        return path
+
+    def write_load_csv(self, path: str) -> str:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Time (s)", "Bus load (%)"])
+            for second, load in self.load_per_second():
+                writer.writerow([second, f"{load:.2f}"])
+        return path
+
+
+def write_bus_reports(stats: BusStats, source_path: str) -> List[str]:
+    """
+    Write <source>_bus_stats.txt (summary and per-ID table) and
+    <source>_bus_load.csv (load per second) next to the input log.
+    """
+    if not stats:
+        return []
+    base = os.path.splitext(source_path)[0]
+    paths = []
+    try:
+        paths.append(stats.write_report(base + "_bus_stats.txt", title=os.path.basename(source_path)))
+        paths.append(stats.write_load_csv(base + "_bus_load.csv"))
+        print(f"📊 Saved bus statistics: {paths[0]}")
+    except OSError as e:
+        print(f"⚠️ Could not write bus statistics for {source_path}: {e}")
+    return paths
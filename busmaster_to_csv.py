@@ -1,31 +1,38 @@
-import cantools
 import csv
 import re
 import os
 import sys
-import math
+import importlib
+import importlib.util
 import subprocess
+from collections import deque
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from tkinter import filedialog, Tk, messagebox, ttk
 import tkinter as tk
-from collections import OrderedDict
 from datetime import datetime, timedelta
-import pandas as pd
-import requests
 
 # ------------------ AUTO PACKAGE INSTALL ------------------
 def ensure_package(pkg_name, import_name=None):
+    # find_spec only locates the package; the import itself happens where it is used
     import_name = import_name or pkg_name
-    try:
-        __import__(import_name)
-    except ImportError:
+    if importlib.util.find_spec(import_name) is None:
         print(f"⚡ Installing {pkg_name}...")
         subprocess.check_call([sys.executable, "-m", "pip", "install", pkg_name])
+        importlib.invalidate_caches()
 
-for pkg, imp in [("pandas", None), ("cantools", None), ("tqdm", None), ("requests", None)]:
+for pkg, imp in [("pandas", None), ("cantools", None), ("requests", None)]:
     ensure_package(pkg, imp)
 
-from tqdm import tqdm
-from merge_csv import merge_csv_files
+from progress import iter_file_lines
+from bus_stats import BusStats, write_bus_reports
+from derived_signals import DerivedSignals
+from csv_writer import compression_from_env, write_large_csv as write_csv_parts
+from signal_db import SignalDatabaseWriter, database_path, export_enabled as signal_db_export_enabled
+from long_csv import long_layout_enabled, open_long_csv
+from delta_rows import ChangeFilter
+from spill import memory_budget
+from dbc_cache import fetch_and_load_dbc_from_url, load_dbc_file, prefetch_dbcs
 
 # ------------------- PATHS & URLS -------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -48,75 +55,13 @@ START_DT_RE = re.compile(
 # Allow hours to be 1..N digits because BUSMASTER can output 31:07:17:2586 etc.
 TIME_RE_FLEX = re.compile(r"^(?P<h>\d+):(?P<m>\d{2}):(?P<s>\d{2}):(?P<sub>\d{4,5})$")
 
-
-# ------------------- DBC FUNCTIONS -------------------
-def _looks_like_html(text: str) -> bool:
-    head = (text or "").lstrip()[:200].lower()
-    return head.startswith("<!doctype html") or head.startswith("<html") or "<head" in head
-
-
-def _unwrap_semicolon_terminated_statements(text: str) -> str:
-    """Fixes DBC files that were hard-wrapped mid-line."""
-    if not text:
-        return text
-
-    text = text.replace("\r\n", "\n").replace("\r", "\n")
-    lines = text.split("\n")
-
-    starters = {
-        "VAL_",
-        "CM_",
-        "BA_",
-        "BA_DEF_",
-        "BA_DEF_DEF_",
-        "VAL_TABLE_",
-        "SIG_VALTYPE_",
-    }
-
-    out: list[str] = []
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        stripped = line.lstrip()
-        keyword = stripped.split(None, 1)[0] if stripped else ""
-
-        if keyword in starters:
-            buf = line.rstrip()
-            while i + 1 < len(lines):
-                if buf.strip().endswith(";") and (buf.count('"') % 2 == 0):
-                    break
-
-                i += 1
-                cont = lines[i].strip()
-                buf = f"{buf} {cont}" if cont else f"{buf} "
-
-            out.append(buf)
-        else:
-            out.append(line)
-
-        i += 1
-
-    return "\n".join(out)
-
-
-def fetch_and_load_dbc_from_url(dbc_url: str):
-    resp = requests.get(dbc_url, timeout=15)
-    resp.raise_for_status()
-
-    if not resp.encoding:
-        try:
-            resp.encoding = resp.apparent_encoding
-        except Exception:
-            pass
-
-    text = (resp.text or "").lstrip("\ufeff")
-    if _looks_like_html(text):
-        raise ValueError("Downloaded HTML instead of a DBC. The GitHub URL likely isn't a raw .dbc file.")
-
-    text = _unwrap_semicolon_terminated_statements(text)
-    return cantools.database.load_string(text, strict=False)
+# Timestamps are tracked as integer microseconds since this (naive) epoch and
+# only turned into datetimes when a table is built.
+EPOCH = datetime(1970, 1, 1)
+DAY_US = 86_400_000_000
 
 
+# ------------------- DBC FUNCTIONS -------------------
 def select_dbc_file(root):
     """Popup to select a DBC source from a dropdown."""
     custom_label = "Load Custom DBC..."
@@ -199,10 +144,7 @@ def _parse_time_parts(time_str: str):
     mt = TIME_RE_FLEX.match(time_str)
     if not mt:
         return None
-    h = int(mt["h"])
-    m = int(mt["m"])
-    s = int(mt["s"])
-    sub = int(mt["sub"])
+    h, m, s, sub = map(int, mt.groups())
     if h < 0 or not (0 <= m <= 59) or not (0 <= s <= 59):
         return None
     return h, m, s, sub
@@ -216,38 +158,82 @@ def _sub_to_micro(sub: int) -> int:
     return min(sub * 100, 999_999)
 
 
-def _abs_dt(session_start: datetime,
-            current_date_base: datetime,
-            last_line_dt: datetime | None,
-            time_str: str):
+def _to_us(dt: datetime) -> int:
+    """Microseconds since EPOCH."""
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def _us_to_datetimes(us):
+    """Vectorized inverse of _to_us for an int64 array."""
+    import pandas as pd
+
+    return pd.to_datetime(us, unit="us")
+
+
+def _ascii_digits(values, width):
+    """(n,) non-negative ints -> (n, width) uint8 matrix of zero-padded ASCII digits."""
+    import numpy as np
+
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return (values[:, None] // powers % 10 + ord("0")).astype(np.uint8)
+
+
+def format_busmaster_times(abs_us, session_start_us=None):
     """
-    Returns:
-      abs_dt, new_current_date_base
-    Rules:
-      - If HH <= 23: treat as time-of-day on current_date_base, with midnight rollover if time goes backwards.
-      - If HH > 23: treat as elapsed time since session_start (no rollover logic needed).
+    Vectorized BUSMASTER time strings for an int64 array of microseconds since EPOCH.
+
+    Without *session_start_us* this is time-of-day ``HH:MM:SS:ssss``. With it,
+    hours count the elapsed time since the session start and are not padded
+    (``31:07:17:2586``). Rows are assembled as fixed-width ASCII byte matrices,
+    one per distinct hour width, so there is no per-row Python call.
     """
-    parts = _parse_time_parts(time_str)
-    if parts is None:
-        return None, current_date_base
+    import numpy as np
 
-    h, m, s, sub = parts
-    micro = _sub_to_micro(sub)
+    us = np.asarray(abs_us, dtype=np.int64)
+    sub = (us % 1_000_000) // 100
+    if session_start_us is None:
+        secs = (us % DAY_US) // 1_000_000
+    else:
+        delta = us - session_start_us
+        # truncate toward zero like int(timedelta.total_seconds())
+        secs = np.where(delta >= 0, delta // 1_000_000, -(-delta // 1_000_000))
+
+    hours = secs // 3600
+    tail = np.concatenate(
+        [
+            np.full((len(us), 1), ord(":"), dtype=np.uint8),
+            _ascii_digits((secs % 3600) // 60, 2),
+            np.full((len(us), 1), ord(":"), dtype=np.uint8),
+            _ascii_digits(secs % 60, 2),
+            np.full((len(us), 1), ord(":"), dtype=np.uint8),
+            _ascii_digits(sub, 4),
+        ],
+        axis=1,
+    )
+
+    out = np.empty(len(us), dtype=object)
+    if session_start_us is None:
+        widths = np.full(len(us), 2)
+    else:
+        widths = np.ones(len(us), dtype=np.int64)
+        widths[hours > 0] = np.floor(np.log10(hours[hours > 0])).astype(np.int64) + 1
+        widths[hours < 0] = 0   # only possible before the session start; formatted below
 
-    if h <= 23:
-        # time-of-day mode
-        dt = datetime(current_date_base.year, current_date_base.month, current_date_base.day, h, m, s, micro)
+    for width in np.unique(widths[widths > 0]):
+        rows = widths == width
+        mat = np.ascontiguousarray(np.concatenate([_ascii_digits(hours[rows], width), tail[rows]], axis=1))
+        out[rows] = mat.view(f"S{mat.shape[1]}").ravel().astype(f"U{mat.shape[1]}")
 
-        # midnight rollover: time went backwards compared to previous dt
-        if last_line_dt is not None and dt < last_line_dt:
-            current_date_base = current_date_base + timedelta(days=1)
-            dt = datetime(current_date_base.year, current_date_base.month, current_date_base.day, h, m, s, micro)
+    for i in np.flatnonzero(widths == 0):
+        h, m, s = hours[i], (secs[i] % 3600) // 60, secs[i] % 60
+        out[i] = f"{h}:{m:02d}:{s:02d}:{sub[i]:04d}"
+    return out
 
-        return dt, current_date_base
 
-    # elapsed-time mode (HH can exceed 23)
-    dt = session_start + timedelta(hours=h, minutes=m, seconds=s, microseconds=micro)
-    return dt, current_date_base
+def _time_offset_us(parts) -> int:
+    """HH:MM:SS:ssss parts -> microseconds (HH may exceed 23 in elapsed mode)."""
+    h, m, s, sub = parts
+    return ((h * 60 + m) * 60 + s) * 1_000_000 + _sub_to_micro(sub)
 
 
 def _extract_fields(parts):
@@ -256,7 +242,8 @@ def _extract_fields(parts):
         return None
 
     time_str = parts[0]
-    if _parse_time_parts(time_str) is None:
+    time_parts = _parse_time_parts(time_str)
+    if time_parts is None:
         return None
 
     can_id_tok = parts[3]
@@ -275,7 +262,7 @@ def _extract_fields(parts):
     if len(data_hex) != dlc:
         return None
 
-    return time_str, can_id_tok, dlc, data_hex
+    return time_str, time_parts, can_id_tok, dlc, data_hex
 
 
 def _get_start_time_from_file(log_path):
@@ -294,24 +281,252 @@ def _get_start_time_from_file(log_path):
     return None
 
 
-# ------------------- DATAFRAME FUNCTIONS -------------------
-def write_large_csv(df, base_path):
-    """Write DataFrame to CSV, splitting if needed"""
-    row_limit = 1_000_000
-    total_rows = len(df)
-    total_parts = math.ceil(total_rows / row_limit)
-    paths = []
+# ------------------- CHANGE LOG -------------------
+HELPER_COLUMNS = ("AbsDatetime", "SessionStart", "ElapsedMode")
 
-    print(f"\n💾 Writing decoded data to CSV ({total_parts} part(s))...")
-    for i in range(total_parts):
-        chunk = df.iloc[i * row_limit : (i + 1) * row_limit]
-        suffix = "" if i == 0 else f"_part{i+1}"
-        path = f"{base_path}{suffix}.csv"
-        chunk.to_csv(path, index=False)
-        paths.append(path)
-        print(f"✅ Saved: {path}")
 
-    return paths
+class SignalChangeLog:
+    """
+    Columnar record of one decoded log.
+
+    There is one row per distinct timestamp, but per signal only the
+    (row, value) pairs where a message actually carried that signal are kept,
+    so memory grows with the number of decoded values instead of
+    timestamps x signals. The wide, forward-filled table is built on demand
+    by iter_frames() / to_dataframe().
+    """
+
+    def __init__(self, initial_state=None):
+        self.initial = dict(initial_state or {})
+        self.abs_us = array("q")  # row timestamps, microseconds since EPOCH
+        self.time_strs = []
+        self.in_order = True      # False if a timestamp ever went backwards
+        self._rows = {}           # signal -> array('q') of row numbers (ascending)
+        self._values = {}         # signal -> list of values, parallel to _rows
+
+    def __len__(self):
+        return len(self.abs_us)
+
+    @property
+    def signals(self):
+        return sorted(set(self._rows) | set(self.initial))
+
+    def add(self, abs_us, time_str, decoded):
+        """Record the signals of one decoded message at *abs_us*."""
+        if self.abs_us and self.abs_us[-1] == abs_us:
+            row = len(self.abs_us) - 1
+            self.time_strs[row] = time_str
+        else:
+            if self.abs_us and abs_us < self.abs_us[-1]:
+                self.in_order = False
+            row = len(self.abs_us)
+            self.abs_us.append(abs_us)
+            self.time_strs.append(time_str)
+
+        for sig, value in decoded.items():
+            rows = self._rows.get(sig)
+            if rows is None:
+                rows = self._rows[sig] = array("q")
+                self._values[sig] = []
+            if rows and rows[-1] == row:
+                # several messages at one timestamp: the last value wins
+                self._values[sig][-1] = value
+            else:
+                rows.append(row)
+                self._values[sig].append(value)
+
+    def iter_series(self):
+        """(signal, int64 microseconds since EPOCH, values) for every signal a message carried."""
+        import numpy as np
+
+        abs_us = np.frombuffer(self.abs_us, dtype=np.int64)
+        for sig, rows in self._rows.items():
+            yield sig, abs_us[np.frombuffer(rows, dtype=np.int64)], self._values[sig]
+
+    def change_rows(self, change_filter):
+        """
+        Row numbers *change_filter* (see delta_rows.py) lets through, found by
+        replaying the decoded values row by row without building any rows.
+        """
+        import numpy as np
+
+        signals = list(self._rows)
+        if not signals:
+            return np.arange(len(self))
+        sample_rows = np.concatenate([np.frombuffer(self._rows[sig], dtype=np.int64) for sig in signals])
+        order = np.argsort(sample_rows, kind="stable")
+        names = np.repeat(np.array(signals, dtype=object), [len(self._rows[sig]) for sig in signals])[order]
+        values = np.empty(len(sample_rows), dtype=object)
+        values[:] = [v for sig in signals for v in self._values[sig]]
+        values = values[order]
+        # samples of row r are names/values[bounds[r]:bounds[r + 1]]
+        bounds = np.searchsorted(sample_rows[order], np.arange(len(self) + 1)).tolist()
+        seconds = (np.frombuffer(self.abs_us, dtype=np.int64) / 1_000_000).tolist()
+        names, values = names.tolist(), values.tolist()
+
+        update = change_filter.update
+        keep = [
+            row for row in range(len(self))
+            if update(seconds[row], dict(zip(names[bounds[row]:bounds[row + 1]], values[bounds[row]:bounds[row + 1]])))
+        ]
+        return np.array(keep, dtype=np.int64)
+
+    def unit_row(self, helper_columns=True):
+        row = {"Time": "busmaster"}
+        if helper_columns:
+            row.update({col: "" for col in HELPER_COLUMNS})
+        row.update({sig: "" for sig in self.signals})
+        return row
+
+    def _frames_in_log_order(self, chunk_rows, session_start, elapsed_mode, helper_columns, keep_rows=None):
+        import numpy as np
+        import pandas as pd
+
+        signals = self.signals
+        abs_us = np.frombuffer(self.abs_us, dtype=np.int64)
+        last = {sig: self.initial.get(sig, "") for sig in signals}
+        consumed = dict.fromkeys(signals, 0)   # changes already folded into last[sig]
+        row_arrays = {
+            sig: np.frombuffer(self._rows[sig], dtype=np.int64) if sig in self._rows else None
+            for sig in signals
+        }
+        total = len(self) if keep_rows is None else len(keep_rows)
+
+        for start in range(0, total, chunk_rows):
+            stop = min(start + chunk_rows, total)
+            n = stop - start
+            if keep_rows is None:
+                positions = np.arange(start, stop)
+                columns = {"Time": self.time_strs[start:stop]}
+            else:
+                positions = keep_rows[start:stop]
+                columns = {"Time": [self.time_strs[p] for p in positions.tolist()]}
+            if helper_columns:
+                columns["AbsDatetime"] = _us_to_datetimes(abs_us[positions])
+                columns["SessionStart"] = [session_start] * n
+                columns["ElapsedMode"] = [elapsed_mode] * n
+
+            end = positions[-1] + 1
+            for sig in signals:
+                rows = row_arrays[sig]
+                lo = consumed[sig]
+                hi = lo if rows is None else int(np.searchsorted(rows, end))
+                if hi == lo:
+                    columns[sig] = np.full(n, last[sig], dtype=object)
+                    continue
+                # values[0] is the state carried into this chunk, values[k] its k-th change;
+                # each output row takes the latest change at or before it
+                values = np.array([last[sig], *self._values[sig][lo:hi]], dtype=object)
+                columns[sig] = values[np.searchsorted(rows[lo:hi], positions, side="right")]
+                last[sig] = values[-1]
+                consumed[sig] = hi
+
+            yield pd.DataFrame(columns)
+
+    def iter_frames(self, chunk_rows=200_000, session_start=None, elapsed_mode=False,
+                    helper_columns=True, with_units=True, change_filter=None):
+        """
+        Yield the wide, forward-filled table in chunks of *chunk_rows*, sorted
+        by time, starting with the BUSMASTER unit row when *with_units* is set.
+        Only one chunk is materialized at a time unless the log's timestamps
+        went backwards, in which case the whole table has to be sorted first.
+        With a *change_filter*, only the rows it lets through are built; it
+        needs the log in time order and is not consulted otherwise (see
+        in_order).
+        """
+        import pandas as pd
+
+        if with_units:
+            yield pd.DataFrame([self.unit_row(helper_columns)])
+
+        if self.in_order:
+            keep_rows = self.change_rows(change_filter) if change_filter is not None else None
+            yield from self._frames_in_log_order(chunk_rows, session_start, elapsed_mode, helper_columns, keep_rows)
+            return
+
+        frames = self._frames_in_log_order(chunk_rows, session_start, elapsed_mode, True)
+
+        df = pd.concat(list(frames), ignore_index=True)
+        df = (
+            df.sort_values("AbsDatetime", kind="stable")
+            .drop_duplicates("AbsDatetime", keep="last")
+            .reset_index(drop=True)
+        )
+        if not helper_columns:
+            df = df.drop(columns=list(HELPER_COLUMNS))
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+
+    def iter_resampled(self, interval_sec, session_start=None, elapsed_mode=False, derived=None,
+                       chunk_rows=200_000):
+        """
+        The table resample_dataframe() makes from to_dataframe() (derived
+        columns included, helper columns dropped), built chunk by chunk from
+        the change log instead of from the whole table: one row per interval on
+        a grid aligned to midnight of the first day, from the first timestamp's
+        slot to the last one's, holding the latest row at or before it. The log
+        must be in time order.
+        """
+        import numpy as np
+        import pandas as pd
+
+        float_columns = set(self.signals)   # the unit row makes every signal column float in the whole table
+        unit_df = pd.DataFrame([self.unit_row(helper_columns=False)])
+        yield derived.apply(unit_df, float_columns) if derived else unit_df
+        if not len(self):
+            return
+
+        session_start_us = None
+        if elapsed_mode and session_start is not None and not pd.isna(session_start):
+            session_start_us = _to_us(pd.Timestamp(session_start).to_pydatetime())
+
+        abs_us = np.frombuffer(self.abs_us, dtype=np.int64)
+        step = int(interval_sec * 1000) * 1000
+        origin = abs_us[0] - abs_us[0] % DAY_US
+        first = origin + (abs_us[0] - origin) // step * step
+        last = origin + (abs_us[-1] - origin) // step * step
+        labels = np.arange(first, last + 1, step, dtype=np.int64)
+        positions = np.searchsorted(abs_us, labels, side="right") - 1
+
+        frames = self._frames_in_log_order(chunk_rows, None, False, False, np.maximum(positions, 0))
+        for start, frame in zip(range(0, len(labels), chunk_rows), frames):
+            stop = start + len(frame)
+            if derived:
+                frame = derived.apply(frame, float_columns)
+            before = positions[start:stop] < 0
+            if before.any():
+                # a slot starting before the first message is empty
+                frame = frame.astype(object)
+                frame.loc[before, :] = np.nan
+            frame["Time"] = format_busmaster_times(labels[start:stop], session_start_us)
+            yield frame
+
+    def to_dataframe(self, session_start=None, elapsed_mode=False, helper_columns=True, with_units=True):
+        import pandas as pd
+
+        return pd.concat(
+            list(self.iter_frames(
+                session_start=session_start,
+                elapsed_mode=elapsed_mode,
+                helper_columns=helper_columns,
+                with_units=with_units,
+            )),
+            ignore_index=True,
+        )
+
+
+# ------------------- DATAFRAME FUNCTIONS -------------------
+def write_large_csv(df, base_path, row_limit=1_000_000, precision=None, compression=None, level=None,
+                    streaming=False):
+    """
+    Write a DataFrame (or an iterable of DataFrame chunks) to CSV, splitting every
+    row_limit rows. BUSMASTER values are written at full precision unless
+    *precision* (decimals) is given; *compression* is "gzip", "zstd" or None.
+    With *streaming*, only one chunk is held at a time (under a memory budget).
+    """
+    return write_csv_parts(
+        df, base_path, row_limit, precision, compression=compression, level=level, streaming=streaming,
+    )
 
 
 def resample_dataframe(df, interval_sec):
@@ -322,6 +537,8 @@ def resample_dataframe(df, interval_sec):
     column (BUSMASTER-style string). After resampling, the `Time` column is
     regenerated in the BUSMASTER format for each resampled timestamp.
     """
+    import pandas as pd
+
     df = df.copy()
     unit_row = df.iloc[0:1]
     df_numeric = df.iloc[1:].copy()
@@ -337,23 +554,6 @@ def resample_dataframe(df, interval_sec):
 
         df_resampled = df_numeric.resample(f"{int(interval_sec*1000)}ms").ffill().reset_index()
 
-        # Recreate BUSMASTER-style Time strings from the resampled datetimes
-        def _fmt_busmaster(dt, session_start=None, elapsed_mode=False):
-            if elapsed_mode and session_start is not None:
-                delta = dt - pd.to_datetime(session_start)
-                total_seconds = int(delta.total_seconds())
-                h = total_seconds // 3600
-                m = (total_seconds % 3600) // 60
-                s = total_seconds % 60
-                sub = int(dt.microsecond // 100)
-                return f"{h}:{m:02d}:{s:02d}:{sub:04d}"
-            else:
-                h = dt.hour
-                m = dt.minute
-                s = dt.second
-                sub = int(dt.microsecond // 100)
-                return f"{h:02d}:{m:02d}:{s:02d}:{sub:04d}"
-
         # If the original unit row specifies a session start, try to read it
         session_start = None
         elapsed_mode = False
@@ -361,7 +561,12 @@ def resample_dataframe(df, interval_sec):
             session_start = df_numeric['SessionStart'].iloc[0]
             elapsed_mode = bool(df_numeric.get('ElapsedMode', False).iloc[0])
 
-        df_resampled['Time'] = df_resampled['AbsDatetime'].apply(lambda dt: _fmt_busmaster(dt, session_start, elapsed_mode))
+        # Recreate BUSMASTER-style Time strings from the resampled datetimes, whole column at once
+        session_start_us = None
+        if elapsed_mode and session_start is not None and not pd.isna(session_start):
+            session_start_us = _to_us(pd.Timestamp(session_start).to_pydatetime())
+        abs_us = df_resampled['AbsDatetime'].to_numpy(dtype="datetime64[us]").astype("int64")
+        df_resampled['Time'] = format_busmaster_times(abs_us, session_start_us)
 
         # Drop helper columns from final output
         if 'SessionStart' in df_resampled.columns:
@@ -382,130 +587,241 @@ def resample_dataframe(df, interval_sec):
     return df_final
 
 
-def parse_log_file_to_dataframe(
+def parse_log_file(
     log_path,
     dbc,
     id_mask=0x1FFFFFFF,
     carry_state_from=None,
+    progress_listeners=None,
+    bus_stats=None,
 ):
-    """Parse a single log file and return DataFrame with Time (s) column"""
-    message_map = {msg.frame_id: msg for msg in dbc.messages}
+    """
+    Decode a single log file into a SignalChangeLog.
 
-    rows = {}  # abs_dt -> (abs_dt, time_str, snapshot)
+    Returns (change_log, last_known, session_start, elapsed_mode); change_log
+    is None when nothing could be decoded. Every frame, decodable or not, is
+    also counted into *bus_stats* when one is given.
+    """
+    message_map = getattr(dbc, "message_index", None) or {msg.frame_id: msg for msg in dbc.messages}
+
+    changes = SignalChangeLog(carry_state_from)
     last_known = carry_state_from.copy() if carry_state_from else {}
 
     parsed = 0
     skipped = 0
     elapsed_mode = False  # Initialize elapsed_mode flag
 
-    with open(log_path, "r", errors="replace") as f:
-        session_start = None
-        current_date_base = None
-        last_line_dt = None
-
-        # Read lines into memory and iterate with tqdm to show decoding progress
-        lines = f.readlines()
-        for raw in tqdm(lines, desc=f"🔍 Decoding {os.path.basename(log_path)}", unit="lines"):
-            line = raw.strip()
-            if not line:
-                continue
+    session_start = None
+    session_start_us = None
+    day_base_us = None    # midnight of the current day (time-of-day mode)
+    last_us = None
+
+    # Stream the file; progress is reported from byte offsets instead of a line count
+    lines = iter_file_lines(
+        log_path,
+        f"🔍 Decoding {os.path.basename(log_path)}",
+        progress_listeners,
+        errors="replace",
+    )
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
 
+        if "***" in line:
             maybe_start = _parse_start_dt_from_line(line)
             if maybe_start is not None:
                 session_start = maybe_start
-                current_date_base = maybe_start
-                last_line_dt = None
+                session_start_us = _to_us(maybe_start)
+                day_base_us = session_start_us - session_start_us % DAY_US
+                last_us = None
                 continue
 
             if line.startswith("***"):
                 continue
 
-            if session_start is None or current_date_base is None:
-                continue
+        if session_start is None:
+            continue
 
-            parts = line.split()
-            fields = _extract_fields(parts)
-            if fields is None:
-                continue
+        parts = line.split()
+        fields = _extract_fields(parts)
+        if fields is None:
+            continue
 
-            time_str, can_id_tok, dlc, data_hex = fields
+        time_str, time_parts, can_id_tok, dlc, data_hex = fields
 
-            # Detect if the log encodes elapsed-time mode (HH > 23)
-            parts_check = _parse_time_parts(time_str)
-            if parts_check is not None and parts_check[0] > 23:
-                elapsed_mode = True
+        if time_parts[0] <= 23:
+            # time-of-day mode, with midnight rollover when time goes backwards
+            abs_us = day_base_us + _time_offset_us(time_parts)
+            if last_us is not None and abs_us < last_us:
+                day_base_us += DAY_US
+                abs_us += DAY_US
+        else:
+            # elapsed-time mode (HH > 23): offset from the session start
+            elapsed_mode = True
+            abs_us = session_start_us + _time_offset_us(time_parts)
 
-            abs_dt, current_date_base = _abs_dt(
-                session_start=session_start,
-                current_date_base=current_date_base,
-                last_line_dt=last_line_dt,
-                time_str=time_str
-            )
-            if abs_dt is None:
-                skipped += 1
+        last_us = abs_us
+
+        try:
+            can_id = int(can_id_tok, 16) & id_mask
+            if bus_stats is not None:
+                bus_stats.add(abs_us / 1_000_000, can_id, dlc)
+            data = bytes(int(b, 16) for b in data_hex)
+
+            msg = message_map.get(can_id)
+            if msg is None:
                 continue
 
-            last_line_dt = abs_dt
+            decoded = msg.decode(data)
+            last_known.update(decoded)
 
-            try:
-                can_id = int(can_id_tok, 16) & id_mask
-                data = bytes(int(b, 16) for b in data_hex)
+            # Only the signals this message carried are recorded
+            changes.add(abs_us, time_str, decoded)
+            parsed += 1
 
-                msg = message_map.get(can_id)
-                if msg is None:
-                    continue
+        except Exception:
+            skipped += 1
+            continue
 
-                decoded = msg.decode(data)
-                last_known.update(decoded)
+    if not changes:
+        print(f"⚠️ No messages decoded from {log_path}")
+        return None, last_known, session_start, elapsed_mode
 
-                prev = rows.get(abs_dt)
-                if prev is None:
-                    snapshot = last_known.copy()
-                else:
-                    _, snapshot = prev
-                    snapshot = snapshot.copy()
+    print(f"✅ Parsed {log_path}: {parsed} messages, {skipped} skipped")
+    return changes, last_known, session_start, elapsed_mode
 
-                snapshot.update(decoded)
 
-                # Store reference time, original time string, and snapshot
-                rows[abs_dt] = (abs_dt, time_str, snapshot)
-                parsed += 1
+def parse_log_file_to_dataframe(
+    log_path,
+    dbc,
+    id_mask=0x1FFFFFFF,
+    carry_state_from=None,
+    progress_listeners=None,
+):
+    """Parse a single log file and return the wide DataFrame (unit row first)"""
+    changes, last_known, session_start, elapsed_mode = parse_log_file(
+        log_path, dbc, id_mask, carry_state_from, progress_listeners
+    )
+    if changes is None:
+        return None, last_known, session_start, elapsed_mode
+    df = changes.to_dataframe(session_start, elapsed_mode)
+    return df, last_known, session_start, elapsed_mode
 
-            except Exception:
-                skipped += 1
-                continue
 
-    # Convert to DataFrame
-    ordered = OrderedDict((k, rows[k]) for k in sorted(rows.keys()))
-    all_signals = sorted({sig for (_, _, snap) in ordered.values() for sig in snap.keys()})
+# ------------------- PARALLEL DECODING -------------------
+_worker_dbc = None
 
-    if not ordered:
-        print(f"⚠️ No messages decoded from {log_path}")
-        return None, last_known, session_start, elapsed_mode
 
-    # Calculate output rows including original BUSMASTER time strings and absolute datetimes
-    first_dt = list(ordered.keys())[0]
-    data = []
-    for abs_dt, (_, time_str, snap) in ordered.items():
-        row = {"Time": time_str, "AbsDatetime": abs_dt, "SessionStart": session_start, "ElapsedMode": elapsed_mode}
-        row.update({sig: snap.get(sig, "") for sig in all_signals})
-        data.append(row)
+def _init_decode_worker(dbc):
+    global _worker_dbc
+    _worker_dbc = dbc
 
-    df = pd.DataFrame(data)
-    
-    # Add units row at the beginning
-    unit_row = {"Time": "busmaster"}
-    for sig in all_signals:
-        unit_row[sig] = ""
-    # include helper unit cells so columns align
-    unit_row["AbsDatetime"] = ""
-    unit_row["SessionStart"] = ""
-    unit_row["ElapsedMode"] = ""
-    
-    df = pd.concat([pd.DataFrame([unit_row]), df], ignore_index=True)
 
-    print(f"✅ Parsed {log_path}: {parsed} messages, {skipped} skipped")
-    return df, last_known, session_start, elapsed_mode
+def _decode_worker(log_path):
+    """Decode one file from an empty state inside a worker process."""
+    bus_stats = BusStats()
+    return parse_log_file(log_path, _worker_dbc, progress_listeners=[], bus_stats=bus_stats), bus_stats
+
+
+def decode_logs(log_paths, dbc, max_workers=None):
+    """
+    Decode *log_paths* (already in time order) and yield
+    (log_path, change_log, session_start, elapsed_mode, bus_stats) in the
+    same order.
+
+    Files are decoded in parallel worker processes, each from an empty
+    state. Before a file is yielded, its change-log's initial state is set to
+    the combined final state of the files before it, so leading gaps are
+    forward-filled exactly as a serial run with carry_state_from would.
+    A file is yielded as soon as it and its predecessors are done. Only
+    workers + 1 files are in flight at a time, and the next one is submitted
+    as each is taken, so decoded files never pile up in this process.
+    """
+    workers = min(len(log_paths), max_workers or os.cpu_count() or 1)
+    pool = None
+    if workers > 1:
+        try:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_decode_worker, initargs=(dbc,))
+            print(f"⚡ Decoding {len(log_paths)} files with {workers} worker processes...")
+        except Exception as e:
+            print(f"⚠️ Parallel decoding unavailable ({e}); decoding one file at a time")
+            pool = None
+
+    pending = deque()   # futures of the next files to yield, in order
+    submitted = 0
+    carried = {}
+    try:
+        for i, log_path in enumerate(log_paths):
+            while pool is not None and submitted < len(log_paths) and len(pending) < workers + 1:
+                try:
+                    pending.append(pool.submit(_decode_worker, log_paths[submitted]))
+                    submitted += 1
+                except Exception as e:
+                    print(f"⚠️ Parallel decoding stopped ({e}); decoding the remaining files one at a time")
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    pool = None
+
+            print(f"\n📄 Processing: {log_path}")
+            result = None
+            if i < submitted:
+                future = pending.popleft()
+                try:
+                    result, bus_stats = future.result()
+                except Exception as e:
+                    print(f"⚠️ Worker failed on {os.path.basename(log_path)} ({e}); decoding it here")
+                future = None   # the result is only held by this generator from here on
+            if result is None:
+                bus_stats = BusStats()
+                result = parse_log_file(log_path, dbc, bus_stats=bus_stats)
+
+            changes, last_known, session_start, elapsed_mode = result
+            if changes is not None:
+                changes.initial = dict(carried)
+            carried.update(last_known)
+            yield log_path, changes, session_start, elapsed_mode, bus_stats
+    finally:
+        if pool is not None:
+            # wait=True: leaving a (possibly broken) pool behind can hang interpreter exit
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def write_signal_db(changes, log_path, dbc, session_start=None):
+    """Export the decoded samples of one log to <log>_signals.db, times in seconds since the session start."""
+    origin_us = _to_us(session_start) if session_start is not None else changes.abs_us[0]
+    units = getattr(dbc, "units", None) or {sig.name: sig.unit or "" for msg in dbc.messages for sig in msg.signals}
+    can_ids = {sig.name: msg.frame_id for msg in dbc.messages for sig in msg.signals}
+    db = SignalDatabaseWriter(
+        database_path(log_path), units, source=os.path.basename(log_path),
+        time_origin=(EPOCH + timedelta(microseconds=int(origin_us))).isoformat(sep=" "),
+    )
+    with db:
+        for sig, abs_us, values in changes.iter_series():
+            db.add_series(sig, ((abs_us - origin_us) / 1_000_000).tolist(), values, can_ids.get(sig))
+
+
+def write_long_csv(changes, log_path, dbc, session_start=None, compression=None, level=None):
+    """Write the decoded samples of one log to <log>_long.csv in time order, times in seconds since the session start."""
+    import numpy as np
+
+    origin_us = _to_us(session_start) if session_start is not None else changes.abs_us[0]
+    units = getattr(dbc, "units", None) or {sig.name: sig.unit or "" for msg in dbc.messages for sig in msg.signals}
+    can_ids = {sig.name: msg.frame_id for msg in dbc.messages for sig in msg.signals}
+
+    series = list(changes.iter_series())
+    if not series:
+        return None
+    abs_us = np.concatenate([t for _, t, _ in series])
+    names = np.repeat(np.array([sig for sig, _, _ in series], dtype=object), [len(t) for _, t, _ in series])
+    values = np.empty(len(abs_us), dtype=object)
+    values[:] = [v for _, _, vals in series for v in vals]
+    order = np.argsort(abs_us, kind="stable")
+
+    # BUSMASTER values keep full precision, as in the wide export
+    with open_long_csv(log_path, units, compression, level, precision=None) as writer:
+        writer.column_order = changes.signals   # as in the wide export
+        writer.add_samples(((abs_us[order] - origin_us) / 1_000_000).tolist(), names[order], values[order], can_ids)
+    return writer.path
 
 
 def parse_logs_to_csv_with_sampling(
@@ -513,14 +829,27 @@ def parse_logs_to_csv_with_sampling(
     dbc,
     output_csv_path,
     sampling_interval=0,
+    derived=None,
+    compression=None,
+    level=None,
+    memory_budget=None,
 ):
-    """Parse multiple logs, decode, optionally resample, and merge"""
+    """
+    Parse multiple logs, decode, add derived values, optionally resample, and merge.
+    With *memory_budget* (bytes, see spill.py) the wide tables are only ever
+    built and written one chunk at a time.
+    """
+    from merge_csv import merge_csv_files
+
     # Sort files by their START DATE AND TIME
     print("\n🔄 Sorting files by START DATE AND TIME...")
     files_with_start_time = []
-    
-    for log_path in log_paths:
-        start_time = _get_start_time_from_file(log_path)
+
+    # The header scans are I/O bound, so they run concurrently
+    with ThreadPoolExecutor(max_workers=min(8, len(log_paths) or 1)) as pool:
+        start_times = list(pool.map(_get_start_time_from_file, log_paths))
+
+    for log_path, start_time in zip(log_paths, start_times):
         if start_time is not None:
             files_with_start_time.append((start_time, log_path))
             print(f"  📄 {os.path.basename(log_path)}: {start_time}")
@@ -537,30 +866,59 @@ def parse_logs_to_csv_with_sampling(
         print(f"  {i}. {os.path.basename(log_path)}")
     
     all_csv_paths = []
-    last_known = {}
+    export_signal_db = signal_db_export_enabled()
+    long_layout = long_layout_enabled()
 
-    for log_path in sorted_log_paths:
-        print(f"\n📄 Processing: {log_path}")
-        df, last_known, session_start, elapsed_mode = parse_log_file_to_dataframe(log_path, dbc, carry_state_from=last_known)
-        
-        if df is None:
+    for log_path, changes, session_start, elapsed_mode, bus_stats in decode_logs(sorted_log_paths, dbc):
+        write_bus_reports(bus_stats, log_path)
+
+        if changes is None:
+            continue
+
+        if export_signal_db:
+            write_signal_db(changes, log_path, dbc, session_start)
+
+        if long_layout:
+            # one row per decoded sample (see long_csv.py); no wide table is built
+            write_long_csv(changes, log_path, dbc, session_start, compression, level)
             continue
 
         # Apply resampling if requested
+        change_filter = None
         if sampling_interval > 0:
             print(f"⏱️ Resampling to {sampling_interval*1000}ms intervals...")
-            # pass session_start and elapsed_mode so resampling can regenerate BUSMASTER-format timestamps
-            df = resample_dataframe(df, sampling_interval)
+            if memory_budget and changes.in_order:
+                frames = changes.iter_resampled(sampling_interval, session_start, elapsed_mode, derived)
+            else:
+                # pass session_start and elapsed_mode so resampling can regenerate BUSMASTER-format timestamps
+                df = changes.to_dataframe(session_start, elapsed_mode)
+                if derived:
+                    df = derived.apply(df)
+                df = resample_dataframe(df, sampling_interval)
+                frames = df.drop(columns=list(HELPER_COLUMNS), errors="ignore")
+        else:
+            # Stream the forward-filled table chunk by chunk straight to the writer,
+            # adding the derived columns to each chunk on the way
+            change_filter = ChangeFilter.from_env()
+            if change_filter is not None and not changes.in_order:
+                print("⚠️ Timestamps go backwards in this log; writing every row (CSV_DELTA needs time order)")
+                change_filter = None
+            frames = changes.iter_frames(helper_columns=False, change_filter=change_filter)
+            if derived:
+                frames = map(derived.apply, frames)
 
-        # Write to CSV (drop internal helper columns first)
         base_path = os.path.splitext(log_path)[0] + "_decoded"
-        df_to_write = df.copy()
-        for _col in ("AbsDatetime", "SessionStart", "ElapsedMode"):
-            if _col in df_to_write.columns:
-                del df_to_write[_col]
-        csv_paths = write_large_csv(df_to_write, base_path)
+        csv_paths = write_large_csv(
+            frames, base_path, compression=compression, level=level, streaming=bool(memory_budget),
+        )
+        if change_filter is not None:
+            print(change_filter.summary())
         all_csv_paths.extend(csv_paths)
 
+    if long_layout:
+        print("💡 Rebuild the wide table with: python long_csv.py pivot <file>_long.csv")
+        return
+
     if not all_csv_paths:
         print("❌ No CSV files were created.")
         return
@@ -576,6 +934,9 @@ def parse_logs_to_csv_with_sampling(
             final_csv,
             open_after=False,
             row_limit=1_000_000,
+            compression=compression,
+            level=level,
+            memory_budget=memory_budget,
         )
     except Exception as e:
         print(f"❌ Failed to merge CSV files: {e}")
@@ -629,37 +990,49 @@ def main(root):
             dbc = fetch_and_load_dbc_from_url(dbc_url)
         else:
             print(f"📁 Loading your DBC file: {dbc_source}")
-            dbc = cantools.database.load_file(dbc_source)
+            dbc = load_dbc_file(dbc_source)
     except Exception as e:
         print(f"❌ Failed to load DBC: {e}")
         return
 
-    # --- Sampling time selection ---
-    interval_var = tk.DoubleVar(value=0)
-    interval_win = tk.Toplevel(root)
-    interval_win.title("⏱️ Select Time Resolution")
-    tk.Label(interval_win, text="Select the time resolution for the output CSV:", font=("Segoe UI", 12)).pack(pady=10)
+    # --- Sampling time selection (the long layout, CSV_LAYOUT=long, is never resampled) ---
+    if long_layout_enabled():
+        selected_interval = 0.0
+    else:
+        interval_var = tk.DoubleVar(value=0)
+        interval_win = tk.Toplevel(root)
+        interval_win.title("⏱️ Select Time Resolution")
+        tk.Label(interval_win, text="Select the time resolution for the output CSV:", font=("Segoe UI", 12)).pack(pady=10)
 
-    def set_interval(val):
-        interval_var.set(val)
-        interval_win.destroy()
+        def set_interval(val):
+            interval_var.set(val)
+            interval_win.destroy()
 
-    tk.Button(interval_win, text="Default timestamps (no resampling)", command=lambda: set_interval(0), width=30).pack(pady=5)
-    tk.Button(interval_win, text="Resample every 300 ms", command=lambda: set_interval(0.3), width=30).pack(pady=5)
-    tk.Button(interval_win, text="Resample every 500 ms", command=lambda: set_interval(0.5), width=30).pack(pady=5)
-    tk.Button(interval_win, text="Resample every 1000 ms", command=lambda: set_interval(1), width=30).pack(pady=5)
-    interval_win.grab_set()
-    root.wait_window(interval_win)
+        tk.Button(interval_win, text="Default timestamps (no resampling)", command=lambda: set_interval(0), width=30).pack(pady=5)
+        tk.Button(interval_win, text="Resample every 300 ms", command=lambda: set_interval(0.3), width=30).pack(pady=5)
+        tk.Button(interval_win, text="Resample every 500 ms", command=lambda: set_interval(0.5), width=30).pack(pady=5)
+        tk.Button(interval_win, text="Resample every 1000 ms", command=lambda: set_interval(1), width=30).pack(pady=5)
+        interval_win.grab_set()
+        root.wait_window(interval_win)
 
-    selected_interval = float(interval_var.get())
+        selected_interval = float(interval_var.get())
 
     # Parse and process
-    parse_logs_to_csv_with_sampling(log_files, dbc, None, selected_interval)
+    # Optional compressed output, e.g. CSV_COMPRESSION=gzip or zstd:9 (see csv_writer.py)
+    compression, level = compression_from_env()
+    if compression == "zstd":
+        ensure_package("zstandard")
+
+    parse_logs_to_csv_with_sampling(
+        log_files, dbc, None, selected_interval, DerivedSignals.for_dbc(dbc_source),
+        compression=compression, level=level, memory_budget=memory_budget(),
+    )
 
 
 
 
 if __name__ == "__main__":
+    prefetch_dbcs(DBC_URLS.values())
     root = tk.Tk()
     main(root)
     # After main returns, destroy the hidden root so the script doesn't hang
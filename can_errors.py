@@ -0,0 +1,235 @@
+import os
+import csv
+import math
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# PCAN error frame "ID" -> error type
+ERROR_TYPES = {1: "Bit Error", 2: "Form Error", 4: "Stuff Error", 8: "Other Error"}
+UNKNOWN_TYPE = "Unknown"
+DIRECTIONS = ("Sending", "Receiving")
+WILDCARD = "*"
+
+# Timeline column slots: one per (type, direction), unknown codes share the last type slot
+_TYPE_ORDER = (1, 2, 4, 8, None)
+_TYPE_SLOT = {code: i for i, code in enumerate(_TYPE_ORDER) if code is not None}
+_UNKNOWN_SLOT = len(_TYPE_ORDER) - 1
+_SLOTS = len(_TYPE_ORDER) * len(DIRECTIONS)
+_ZERO_ROW = array("L", [0] * _SLOTS)
+
+# Most to least specific: 1 = field must match exactly, 0 = wildcard
+_SPECIFICITY = ((1, 1, 1), (1, 1, 0), (1, 0, 1), (0, 1, 1), (1, 0, 0), (0, 1, 0), (0, 0, 1), (0, 0, 0))
+
+
+def error_type_name(code: int) -> str:
+    return ERROR_TYPES.get(code, UNKNOWN_TYPE)
+
+
+# ------------------ ERROR REFERENCE ------------------
+class ErrorRule(NamedTuple):
+    message: str
+    cause: str
+    solution: str
+
+
+def _parse_key_field(token: str):
+    token = token.strip()
+    if token == WILDCARD:
+        return WILDCARD
+    return int(token, 16) if token.lower().startswith("0x") else int(token)
+
+
+class ErrorReference:
+    """
+    Precompiled index of can_error_reference.txt.
+
+    Each rule line is ``TYPE|BYTE0|BYTE1|Message|Cause|Solution`` where any of
+    the first three fields may be ``*``. Rules are stored by their exact key;
+    lookup() tries the most specific key first (no wildcards, then one, two,
+    three) and memoizes the answer, so every distinct error key is resolved
+    once per run no matter how many frames carry it.
+    """
+
+    def __init__(self, rules: Optional[Dict[Tuple, ErrorRule]] = None):
+        self.rules: Dict[Tuple, ErrorRule] = dict(rules or {})
+        self._memo: Dict[Tuple[int, int, int], Optional[ErrorRule]] = {}
+
+    def __len__(self):
+        return len(self.rules)
+
+    @classmethod
+    def from_lines(cls, lines):
+        rules = {}
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            fields = [f.strip() for f in line.split("|")]
+            if len(fields) < 4:
+                continue
+            try:
+                key = tuple(_parse_key_field(f) for f in fields[:3])
+            except ValueError:
+                continue
+            fields += [""] * (6 - len(fields))
+            # later lines override earlier ones with the same key
+            rules[key] = ErrorRule(fields[3], fields[4], "|".join(fields[5:]))
+        return cls(rules)
+
+    @classmethod
+    def from_file(cls, path: str):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return cls.from_lines(f)
+
+    def lookup(self, error_code: int, byte0: int, byte1: int) -> Optional[ErrorRule]:
+        key = (error_code, byte0, byte1)
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        rule = None
+        for mask in _SPECIFICITY:
+            candidate = tuple(v if exact else WILDCARD for v, exact in zip(key, mask))
+            rule = self.rules.get(candidate)
+            if rule is not None:
+                break
+        self._memo[key] = rule
+        return rule
+
+
+_reference_cache: Dict[str, Tuple[float, ErrorReference]] = {}
+
+
+def load_error_reference(path: str) -> ErrorReference:
+    """Compile *path* once per process; it is recompiled only if the file changes."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        print(f"❌ CAN error reference file not found: {path}")
+        return ErrorReference()
+
+    cached = _reference_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    reference = ErrorReference.from_file(path)
+    _reference_cache[path] = (mtime, reference)
+    return reference
+
+
+# ------------------ ERROR AGGREGATION ------------------
+class CanErrorStats:
+    """
+    CAN error frames aggregated during the decode pass.
+
+    Nothing is kept per frame: totals live in one small record per
+    (type, direction, bit position) key, and the timeline is a flat
+    array('L') of per-second counts per (type, direction) plus per-second
+    peak RX/TX error counters. Memory is O(distinct keys + seconds with
+    errors), so a bus-off storm costs a counter increment per frame.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self._keys: Dict[Tuple[int, int, int], List[int]] = {}  # key -> [count, max_rx, max_tx]
+        self._seconds = array("q")
+        self._row_of: Dict[int, int] = {}
+        self._counts = array("L")
+        self._peak_rx = array("B")
+        self._peak_tx = array("B")
+
+    def __len__(self):
+        return self.total
+
+    def add(self, timestamp: float, error_code: int, data: bytes):
+        """Record one error frame; *data* is (direction, bit position, RX count, TX count)."""
+        direction = 0 if data[0] == 0 else 1
+        bit_pos, rx, tx = data[1], data[2], data[3]
+        self.total += 1
+
+        key = (error_code, direction, bit_pos)
+        agg = self._keys.get(key)
+        if agg is None:
+            self._keys[key] = [1, rx, tx]
+        else:
+            agg[0] += 1
+            if rx > agg[1]:
+                agg[1] = rx
+            if tx > agg[2]:
+                agg[2] = tx
+
+        second = math.floor(timestamp)
+        row = self._row_of.get(second)
+        if row is None:
+            row = len(self._seconds)
+            self._row_of[second] = row
+            self._seconds.append(second)
+            self._counts.extend(_ZERO_ROW)
+            self._peak_rx.append(0)
+            self._peak_tx.append(0)
+        slot = _TYPE_SLOT.get(error_code, _UNKNOWN_SLOT) * 2 + direction
+        self._counts[row * _SLOTS + slot] += 1
+        if rx > self._peak_rx[row]:
+            self._peak_rx[row] = rx
+        if tx > self._peak_tx[row]:
+            self._peak_tx[row] = tx
+
+    def merge(self, other: "CanErrorStats"):
+        """Fold another file's totals into this one (timelines stay per file)."""
+        self.total += other.total
+        for key, (count, rx, tx) in other._keys.items():
+            agg = self._keys.setdefault(key, [0, 0, 0])
+            agg[0] += count
+            agg[1] = max(agg[1], rx)
+            agg[2] = max(agg[2], tx)
+        return self
+
+    def summary(self, reference: Optional[ErrorReference] = None) -> List[dict]:
+        """One entry per (type, direction, bit position), most frequent first."""
+        out = []
+        for (code, direction, bit_pos), (count, max_rx, max_tx) in self._keys.items():
+            rule = reference.lookup(code, direction, bit_pos) if reference is not None else None
+            out.append({
+                "type": error_type_name(code),
+                "direction": DIRECTIONS[direction],
+                "bit_pos": str(bit_pos),
+                "count": count,
+                "max_rx": max_rx,
+                "max_tx": max_tx,
+                "message": rule.message if rule else "",
+                "cause": rule.cause if rule else "",
+                "solution": rule.solution if rule else "",
+            })
+        out.sort(key=lambda e: (-e["count"], e["type"], e["direction"], int(e["bit_pos"])))
+        return out
+
+    def timeline_columns(self) -> List[str]:
+        names = [ERROR_TYPES[c] if c is not None else UNKNOWN_TYPE for c in _TYPE_ORDER]
+        return [f"{name} {direction}" for name in names for direction in DIRECTIONS]
+
+    def write_timeline_csv(self, path: str) -> Optional[str]:
+        """
+        Write errors per second, per type and direction, plus the peak RX/TX
+        error counters seen in that second. Seconds without errors are not
+        listed. The Unknown columns are only written if such frames occurred.
+        """
+        if not self.total:
+            return None
+
+        columns = self.timeline_columns()
+        unknown = slice(_UNKNOWN_SLOT * 2, _UNKNOWN_SLOT * 2 + 2)
+        keep_unknown = any(
+            any(self._counts[row * _SLOTS:(row + 1) * _SLOTS][unknown]) for row in range(len(self._seconds))
+        )
+        slots = list(range(_SLOTS)) if keep_unknown else list(range(_UNKNOWN_SLOT * 2))
+
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Time (s)"] + [columns[s] for s in slots] + ["Total", "Peak RX", "Peak TX"])
+            for row in sorted(range(len(self._seconds)), key=self._seconds.__getitem__):
+                counts = self._counts[row * _SLOTS:(row + 1) * _SLOTS]
+                writer.writerow(
+                    [self._seconds[row]]
+                    + [counts[s] for s in slots]
+                    + [sum(counts), self._peak_rx[row], self._peak_tx[row]]
+                )
+        return path
@@ -0,0 +1,517 @@
+import io
+import os
+import gzip
+from collections import deque
+from itertools import repeat
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# Decimals written for float values unless a column says otherwise
+DEFAULT_PRECISION = 3
+WRITE_BUFFER = 8 * 1024 * 1024
+BLOCK_ROWS = 50_000
+
+# Beyond these the vectorized float path would not match repr(round(v, p)); those values go through Python
+_FAST_MAX_PRECISION = 9
+_FAST_MAX_SCALED = 10 ** 15
+_REPR_SCI_BELOW = 1e-4   # repr() switches to exponent notation below this
+_FAST_MAX_INT = 10 ** 18
+
+_QUOTE_CHARS = (",", '"', "\r", "\n")
+
+# Optional compressed output: method -> (file extension, default level)
+COMPRESSION = {"gzip": (".gz", 6), "zstd": (".zst", 3)}
+COMPRESSION_ENV = "CSV_COMPRESSION"   # e.g. "gzip", "gzip:9", "zstd:3"
+GZIP_BLOCK = 4 * 1024 * 1024
+
+
+def quote_field(text: str) -> str:
+    """CSV-quote *text* only where needed (same rule as csv.QUOTE_MINIMAL / pandas)."""
+    if any(c in text for c in _QUOTE_CHARS):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+# ------------------ NUMBER FORMATTING ------------------
+def _ascii_digits(values, width):
+    """(n,) non-negative ints -> (n, width) uint8 matrix of zero-padded ASCII digits."""
+    import numpy as np
+
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return (values[:, None] // powers % 10 + ord("0")).astype(np.uint8)
+
+
+def _digit_count(values):
+    import numpy as np
+
+    powers = 10 ** np.arange(1, 19, dtype=np.int64)
+    return np.searchsorted(powers, values, side="right") + 1
+
+
+def _compose(negative, int_part, frac_part=None, frac_width=0, frac_len=None):
+    """
+    Build ``[-]int[.frac]`` strings from integer parts with byte matrices.
+
+    Every row is laid out in one fixed-width matrix (sign slot, zero-padded
+    integer digits, dot, zero-padded fraction) and then shifted left past its
+    leading zeros and cut to its own length, so the only per-value work is
+    done by NumPy.
+    """
+    import numpy as np
+
+    n = len(int_part)
+    if n == 0:
+        return np.empty(0, dtype=object)
+
+    int_len = _digit_count(int_part)
+    int_width = int(int_len.max())
+    parts = [np.zeros((n, 1), dtype=np.uint8), _ascii_digits(int_part, int_width)]
+    length = int_len + negative
+    if frac_width:
+        parts.append(np.full((n, 1), ord("."), dtype=np.uint8))
+        parts.append(_ascii_digits(frac_part, frac_width))
+        length = length + 1 + frac_len
+    mat = np.concatenate(parts, axis=1)
+    width = mat.shape[1]
+
+    start = 1 + int_width - int_len - negative
+    rows = np.flatnonzero(negative)
+    mat[rows, start[rows]] = ord("-")
+
+    cols = start[:, None] + np.arange(width)
+    out = np.take_along_axis(mat, np.minimum(cols, width - 1), axis=1)
+    out[np.arange(width) >= length[:, None]] = 0
+    return np.ascontiguousarray(out).view(f"S{width}").ravel().astype(f"U{width}").astype(object)
+
+
+def format_ints(values):
+    """str() of every value of an integer array, vectorized."""
+    import numpy as np
+
+    values = np.asarray(values)
+    if len(values) and (values.max() >= _FAST_MAX_INT or values.min() <= -_FAST_MAX_INT):
+        return np.array([str(v) for v in values.tolist()], dtype=object)
+    values = values.astype(np.int64, copy=False)
+    return _compose((values < 0).astype(np.int64), np.abs(values))
+
+
+def format_floats(values, precision: Optional[int] = DEFAULT_PRECISION):
+    """
+    Strings for a float64 array, exactly ``repr(round(v, precision))`` (or
+    ``repr(v)`` when *precision* is None), with NaN written as an empty field.
+
+    Values are scaled and rounded in NumPy; the few that sit within rounding
+    error of a half step, or are too large or too precise for the fixed-point
+    layout, are rounded by Python instead so every digit matches round().
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty(len(values), dtype=object)
+    finite = np.isfinite(values)
+    out[np.isnan(values)] = ""
+    out[values == np.inf] = "inf"
+    out[values == -np.inf] = "-inf"
+
+    if precision is None or precision > _FAST_MAX_PRECISION:
+        idx = np.flatnonzero(finite)
+        fmt = repr if precision is None else (lambda v: repr(round(v, precision)))
+        out[idx] = [fmt(v) for v in values[idx].tolist()]
+        return out
+
+    scale = 10 ** precision
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = values * scale
+        fast = finite & (np.abs(scaled) < _FAST_MAX_SCALED)
+        fraction = np.abs(scaled - np.trunc(scaled))
+        fast &= np.abs(fraction - 0.5) > 4 * np.spacing(np.abs(scaled))
+        if precision > 4:
+            fast &= (np.abs(values) >= _REPR_SCI_BELOW) | (values == 0)
+
+    for i in np.flatnonzero(finite & ~fast):
+        out[i] = repr(round(float(values[i]), precision))
+
+    idx = np.flatnonzero(fast)
+    q = np.abs(np.rint(scaled[idx])).astype(np.int64)
+    if precision:
+        frac = q % scale
+        frac_len = np.full(len(q), precision, dtype=np.int64)
+        for k in range(1, precision):
+            frac_len -= frac % 10 ** k == 0
+        int_part = q // scale
+    else:
+        frac, frac_len, int_part = np.zeros(len(q), dtype=np.int64), np.ones(len(q), dtype=np.int64), q
+    out[idx] = _compose(
+        np.signbit(values[idx]).astype(np.int64), int_part, frac, max(precision, 1), frac_len
+    )
+    return out
+
+
+# ------------------ COLUMN FORMATTING ------------------
+_NA_KEY = object()
+
+
+def _run_starts(values):
+    """Positions where a value differs from the one before (row 0 always starts a run)."""
+    import numpy as np
+
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+    try:
+        changed = values[1:] != values[:-1]
+    except TypeError:
+        # pd.NA (blank cells of merged tables) does not compare; runs of it are compared by identity
+        import pandas as pd
+
+        values = values.copy()
+        values[[v is pd.NA for v in values]] = _NA_KEY
+        changed = values[1:] != values[:-1]
+    if values.dtype.kind == "f":
+        changed &= ~(np.isnan(values[1:]) & np.isnan(values[:-1]))
+    return np.flatnonzero(np.concatenate(([True], changed)))
+
+
+_FLOAT, _INT, _STR, _EMPTY, _OTHER = range(5)
+
+
+def _object_kinds(values):
+    import numpy as np
+
+    kinds = {float: _FLOAT, np.float64: _FLOAT, np.float32: _FLOAT,
+             int: _INT, np.int64: _INT, np.int32: _INT, np.uint8: _INT, np.int8: _INT,
+             np.uint16: _INT, np.int16: _INT, np.uint32: _INT,
+             str: _STR, type(None): _EMPTY}
+    return np.fromiter(map(kinds.get, map(type, values), repeat(_OTHER)), dtype=np.int8, count=len(values))
+
+
+def _format_objects(values, precision):
+    import numpy as np
+    import pandas as pd
+
+    out = np.empty(len(values), dtype=object)
+    kinds = _object_kinds(values)
+
+    rows = np.flatnonzero(kinds == _FLOAT)
+    out[rows] = format_floats(values[rows].astype(np.float64), precision)
+    rows = np.flatnonzero(kinds == _INT)
+    if len(rows):
+        try:
+            out[rows] = format_ints(values[rows].astype(np.int64))
+        except OverflowError:
+            out[rows] = [str(v) for v in values[rows]]
+    out[kinds == _EMPTY] = ""
+    rows = np.flatnonzero(kinds == _STR)
+    if len(rows):
+        strings = values[rows]
+        # the same few strings ("NA", states) repeat, so each distinct one is checked once
+        quoted = {s: q for s in set(strings) if (q := quote_field(s)) is not s}
+        out[rows] = [quoted.get(s, s) for s in strings] if quoted else strings
+    for i in np.flatnonzero(kinds == _OTHER):
+        v = values[i]
+        out[i] = "" if v is pd.NA or v is pd.NaT else quote_field(str(v))
+    return out
+
+
+def format_column(values, precision: Optional[int] = DEFAULT_PRECISION):
+    """
+    CSV field strings for one column (a NumPy array).
+
+    Decoded tables are forward-filled, so a column is mostly long runs of one
+    value: only the first value of each run is formatted and the string is
+    repeated for the rest of the run.
+    """
+    import numpy as np
+
+    values = np.asarray(values)
+    n = len(values)
+    kind = values.dtype.kind
+    if kind == "M":
+        out = values.astype(str).astype(object)
+        out[np.isnat(values)] = ""
+        return out
+
+    starts = _run_starts(values)
+    heads = values[starts]
+    if kind == "f":
+        strings = format_floats(heads, precision)
+    elif kind in "iu":
+        strings = format_ints(heads)
+    elif kind == "b":
+        strings = np.array([str(v) for v in heads.tolist()], dtype=object)
+    else:
+        strings = _format_objects(heads.astype(object, copy=False), precision)
+    if len(starts) == n:
+        return strings
+    return np.repeat(strings, np.diff(np.append(starts, n)))
+
+
+def frame_to_csv_text(df, precision=DEFAULT_PRECISION, column_precision=None, lineterminator=os.linesep) -> str:
+    """The rows of *df* (no header, no index) as CSV text."""
+    column_precision = column_precision or {}
+    columns = [
+        format_column(df.iloc[:, i].to_numpy(), column_precision.get(name, precision))
+        for i, name in enumerate(df.columns)
+    ]
+    if not columns or not len(df):
+        return ""
+    return lineterminator.join(map(",".join, zip(*columns))) + lineterminator
+
+
+# ------------------ COMPRESSION ------------------
+def parse_compression(spec: Optional[str]):
+    """"zstd:9" -> ("zstd", 9); "" / "none" / None -> (None, None)."""
+    if not spec or spec.strip().lower() in ("none", "off", "csv"):
+        return None, None
+    method, _, level = spec.strip().lower().partition(":")
+    if method == "gz":
+        method = "gzip"
+    if method not in COMPRESSION:
+        raise ValueError(f"Unknown CSV compression {spec!r}; use one of {', '.join(COMPRESSION)}")
+    return method, int(level) if level else None
+
+
+def compression_from_env():
+    """(method, level) from the CSV_COMPRESSION environment variable; invalid values turn compression off."""
+    try:
+        return parse_compression(os.environ.get(COMPRESSION_ENV))
+    except ValueError as e:
+        print(f"⚠️ {e}")
+        return None, None
+
+
+def resolve_compression(method: Optional[str]) -> Optional[str]:
+    """The method that will actually be used: zstd falls back to gzip if zstandard is not installed."""
+    if method == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            print("⚠️ zstandard is not installed; writing gzip instead")
+            return "gzip"
+    return method
+
+
+def csv_extension(method: Optional[str]) -> str:
+    return ".csv" + (COMPRESSION[method][0] if method else "")
+
+
+def split_csv_path(path: str):
+    """("out/merged", ".csv.gz") for out/merged.csv.gz; compressed suffixes stay with the extension."""
+    base, ext = os.path.splitext(path)
+    if ext.lower() in {e for e, _ in COMPRESSION.values()}:
+        base, inner = os.path.splitext(base)
+        ext = inner + ext
+    return base, ext
+
+
+class _ParallelGzipWriter(io.RawIOBase):
+    """
+    Binary gzip stream compressed on a thread pool.
+
+    Input is cut into GZIP_BLOCK blocks; each block is compressed as its own
+    gzip member (zlib releases the GIL) and the members are written in order.
+    A file of concatenated members is a valid .gz file for gzip, 7-Zip and
+    pandas alike.
+    """
+
+    def __init__(self, path, level, threads=None):
+        super().__init__()
+        self._file = open(path, "wb")
+        self._level = level
+        threads = threads or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="gzip")
+        self._max_pending = 2 * threads
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._members = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= GZIP_BLOCK:
+            self._submit()
+        return len(data)
+
+    def _submit(self):
+        block = bytes(self._buffer)
+        self._buffer.clear()
+        self._members += 1
+        self._pending.append(self._pool.submit(gzip.compress, block, self._level, mtime=0))
+        while len(self._pending) > self._max_pending:
+            self._file.write(self._pending.popleft().result())
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer or not self._members:
+                self._submit()
+            while self._pending:
+                self._file.write(self._pending.popleft().result())
+        finally:
+            self._pool.shutdown(cancel_futures=True)
+            self._file.close()
+            super().close()
+
+
+def open_csv_output(path: str, compression: Optional[str] = None, level: Optional[int] = None,
+                    threads: Optional[int] = None):
+    """
+    Text stream for writing a CSV, optionally through a streaming compressor.
+    gzip blocks are compressed on *threads* threads; zstd uses its own worker
+    threads (all cores by default).
+    """
+    if compression is None:
+        return open(path, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER)
+
+    level = COMPRESSION[compression][1] if level is None else level
+    if compression == "gzip":
+        raw = _ParallelGzipWriter(path, level, threads)
+    else:
+        import zstandard
+
+        cctx = zstandard.ZstdCompressor(level=level, threads=-1 if threads is None else threads)
+        raw = cctx.stream_writer(open(path, "wb"), closefd=True)
+    return io.TextIOWrapper(io.BufferedWriter(raw, WRITE_BUFFER), encoding="utf-8", newline="")
+
+
+# ------------------ WRITERS ------------------
+def write_csv(frames, path: str, precision=DEFAULT_PRECISION, column_precision=None,
+              block_rows=BLOCK_ROWS, lineterminator=os.linesep, compression=None, level=None) -> int:
+    """
+    Write a list of DataFrames with the same columns to one CSV file, header
+    from the first frame. Rows are formatted in blocks of *block_rows* and
+    written through a large buffer (and the compressor, if one is given).
+    Returns the number of data rows.
+    """
+    rows = 0
+    with open_csv_output(path, compression, level) as f:
+        for frame in frames:
+            if rows == 0:
+                f.write(",".join(quote_field(str(c)) for c in frame.columns) + lineterminator)
+            for start in range(0, len(frame), block_rows):
+                block = frame.iloc[start:start + block_rows]
+                f.write(frame_to_csv_text(block, precision, column_precision, lineterminator))
+            rows += len(frame)
+    return rows
+
+
+def _iter_parts(frames, row_limit):
+    """Regroup a stream of DataFrames into lists holding exactly row_limit rows (the last may hold fewer)."""
+    part, rows = [], 0
+    for frame in frames:
+        pos = 0
+        while pos < len(frame):
+            take = min(row_limit - rows, len(frame) - pos)
+            part.append(frame if take == len(frame) else frame.iloc[pos:pos + take])
+            pos += take
+            rows += take
+            if rows == row_limit:
+                yield part
+                part, rows = [], 0
+    if part:
+        yield part
+
+
+def part_path(base_path: str, index: int, ext: str = ".csv") -> str:
+    """base.csv, base_part2.csv, base_part3.csv, ..."""
+    return f"{base_path}{'' if index == 0 else f'_part{index + 1}'}{ext}"
+
+
+def _write_parts_streaming(frames, base_path, row_limit, ext, precision, column_precision, block_rows,
+                           compression, level) -> List[str]:
+    """Write chunks one after another into the current part file; only the chunk being formatted is held."""
+    paths = []
+    f = None
+    columns = None
+    rows_in_part = 0
+    try:
+        for frame in frames:
+            pos = 0
+            while pos < len(frame):
+                if f is None or rows_in_part == row_limit:
+                    if f is not None:
+                        f.close()
+                        print(f"✅ Saved: {paths[-1]}")
+                    paths.append(part_path(base_path, len(paths), ext))
+                    f = open_csv_output(paths[-1], compression, level)
+                    if columns is None:
+                        columns = ",".join(quote_field(str(c)) for c in frame.columns) + os.linesep
+                    f.write(columns)
+                    rows_in_part = 0
+                take = min(row_limit - rows_in_part, block_rows, len(frame) - pos)
+                f.write(frame_to_csv_text(frame.iloc[pos:pos + take], precision, column_precision))
+                pos += take
+                rows_in_part += take
+    finally:
+        if f is not None:
+            f.close()
+    if paths:
+        print(f"✅ Saved: {paths[-1]}")
+    return paths
+
+
+def write_large_csv(df, base_path: str, row_limit: int = 1_000_000, precision: Optional[int] = DEFAULT_PRECISION,
+                    column_precision: Optional[Dict[str, int]] = None, max_workers: Optional[int] = None,
+                    compression: Optional[str] = None, level: Optional[int] = None,
+                    streaming: bool = False, block_rows: int = BLOCK_ROWS) -> List[str]:
+    """
+    Write a DataFrame (or an iterable of DataFrame chunks) to CSV, splitting
+    every *row_limit* rows into base.csv, base_part2.csv, ... With
+    *compression* ("gzip" or "zstd") the parts are base.csv.gz / .csv.zst.
+
+    Part files are written by a thread pool, at most *max_workers* at a time,
+    so formatting one part overlaps writing the others. Stream input is
+    grouped into parts as it arrives; only the parts in flight are held.
+    With *streaming*, chunks are instead written one at a time, *block_rows*
+    rows per formatting step, and nothing but the current chunk is held
+    (used under a memory budget, see spill.py).
+    Floats are rounded to *precision* decimals (per column overrides in
+    *column_precision*, None keeps full precision) when they are formatted.
+    """
+    import pandas as pd
+
+    if isinstance(df, pd.DataFrame):
+        total_parts = -(-len(df) // row_limit)
+        print(f"\n💾 Writing decoded data to CSV ({total_parts} part(s))...")
+        frames = [df]
+    else:
+        print("\n💾 Writing decoded data to CSV...")
+        frames = df
+
+    compression = resolve_compression(compression)
+    ext = csv_extension(compression)
+    if streaming:
+        return _write_parts_streaming(
+            frames, base_path, row_limit, ext, precision, column_precision, block_rows, compression, level
+        )
+
+    max_workers = max_workers or min(4, os.cpu_count() or 1)
+    paths = []
+    in_flight = deque()
+
+    def finish_oldest():
+        path, future = in_flight.popleft()
+        future.result()
+        print(f"✅ Saved: {path}")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="csv-part") as pool:
+        try:
+            for index, part in enumerate(_iter_parts(frames, row_limit)):
+                path = part_path(base_path, index, ext)
+                paths.append(path)
+                in_flight.append((path, pool.submit(
+                    write_csv, part, path, precision, column_precision,
+                    compression=compression, level=level,
+                )))
+                while len(in_flight) >= max_workers:
+                    finish_oldest()
+            while in_flight:
+                finish_oldest()
+        except BaseException:
+            for _, future in in_flight:
+                future.cancel()
+            raise
+
+    return paths
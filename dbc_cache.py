@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import Future
+
+import dbc_compiled
+from dbc_compiled import CompiledDbc
+
+# ------------------ CACHE LOCATION ------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("TRC_DBC_CACHE_DIR") or os.path.join(BASE_DIR, "dbc_cache")
+
+# Within the TTL a cached entry is used without touching the network; after
+# it the entry is revalidated with If-None-Match / If-Modified-Since.
+DBC_CACHE_TTL = 15 * 60
+
+_session = None
+_session_lock = threading.Lock()
+
+# In-memory DBCs by URL, filled by prefetch_dbcs and fetch_and_load_dbc_from_url
+_prefetch_lock = threading.Lock()
+_prefetched: dict[str, Future] = {}
+
+
+def get_session():
+    """Shared, pooled HTTP session for every cached download."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+        return _session
+
+
+# ------------------ DBC TEXT HELPERS ------------------
+def _looks_like_html(text: str) -> bool:
+    head = (text or "").lstrip()[:200].lower()
+    return head.startswith("<!doctype html") or head.startswith("<html") or "<head" in head
+
+
+def _unwrap_semicolon_terminated_statements(text: str) -> str:
+    """Fixes DBC files that were hard-wrapped mid-line."""
+    if not text:
+        return text
+
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = text.split("\n")
+
+    starters = {
+        "VAL_",
+        "CM_",
+        "BA_",
+        "BA_DEF_",
+        "BA_DEF_DEF_",
+        "VAL_TABLE_",
+        "SIG_VALTYPE_",
+    }
+
+    out: list[str] = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.lstrip()
+        keyword = stripped.split(None, 1)[0] if stripped else ""
+
+        if keyword in starters:
+            buf = line.rstrip()
+            while i + 1 < len(lines):
+                if buf.strip().endswith(";") and (buf.count('"') % 2 == 0):
+                    break
+
+                i += 1
+                cont = lines[i].strip()
+                buf = f"{buf} {cont}" if cont else f"{buf} "
+
+            out.append(buf)
+        else:
+            out.append(line)
+
+        i += 1
+
+    return "\n".join(out)
+
+
+# ------------------ CACHE FILES ------------------
+def _entry_paths(url: str):
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+    base = os.path.join(CACHE_DIR, key)
+    return base + ".txt", base + ".json", base + dbc_compiled.ARTIFACT_SUFFIX
+
+
+def _atomic_write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _read_meta(meta_path: str) -> dict:
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _write_meta(meta_path: str, meta: dict):
+    _atomic_write(meta_path, json.dumps(meta, indent=1).encode("utf-8"))
+
+
+def _read_cached_text(text_path: str):
+    try:
+        with open(text_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+# ------------------ CACHED DOWNLOAD ------------------
+def fetch_text_cached(url: str, ttl: float = DBC_CACHE_TTL, timeout: float = 15, validate=None) -> str:
+    """
+    Return the text at *url*, served from the on-disk cache when possible.
+
+    Fresh entries (younger than *ttl*) are returned without a request. Stale
+    entries are revalidated with a conditional GET; a 304 only refreshes the
+    timestamp. When the network is unavailable the last cached copy is used,
+    and the error is only raised if nothing was ever cached.
+    """
+    import requests
+
+    text_path, meta_path, _ = _entry_paths(url)
+    meta = _read_meta(meta_path)
+    cached = _read_cached_text(text_path) if meta else None
+
+    if cached is not None and (time.time() - meta.get("fetched_at", 0)) < ttl:
+        return cached
+
+    headers = {}
+    if cached is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        resp = get_session().get(url, headers=headers, timeout=timeout)
+        if resp.status_code == 304 and cached is not None:
+            meta["fetched_at"] = time.time()
+            _write_meta(meta_path, meta)
+            return cached
+
+        resp.raise_for_status()
+        if not resp.encoding:
+            try:
+                resp.encoding = resp.apparent_encoding
+            except Exception:
+                pass
+
+        text = (resp.text or "").lstrip("\ufeff")
+        if validate is not None:
+            validate(text)
+
+    except (requests.RequestException, OSError, ValueError) as e:
+        if cached is not None:
+            print(f"⚠️ Network unavailable, using cached copy of {url} ({e.__class__.__name__})")
+            return cached
+        raise
+
+    try:
+        _atomic_write(text_path, text.encode("utf-8"))
+        _write_meta(meta_path, {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+            "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        })
+    except OSError as e:
+        print(f"⚠️ Could not write DBC cache: {e}")
+
+    return text
+
+
+def _validate_dbc_text(text: str):
+    if _looks_like_html(text):
+        raise ValueError("Downloaded HTML instead of a DBC. The GitHub URL likely isn't a raw .dbc file.")
+
+
+def _load_dbc_from_url(dbc_url: str, ttl: float = DBC_CACHE_TTL) -> CompiledDbc:
+    import cantools
+
+    text = fetch_text_cached(dbc_url, ttl=ttl, timeout=15, validate=_validate_dbc_text)
+    text_sha = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    _, _, artifact_path = _entry_paths(dbc_url)
+    compiled = dbc_compiled.load_artifact(artifact_path, text_sha)
+    if compiled is not None:
+        return compiled
+
+    db = cantools.database.load_string(_unwrap_semicolon_terminated_statements(text), strict=False)
+    compiled = CompiledDbc(db, text_sha)
+    try:
+        dbc_compiled.save_artifact(artifact_path, compiled)
+    except Exception as e:
+        print(f"⚠️ Could not cache compiled DBC: {e}")
+    return compiled
+
+
+def fetch_and_load_dbc_from_url(dbc_url: str, ttl: float = DBC_CACHE_TTL) -> CompiledDbc:
+    """
+    Download (or reuse) a DBC and return its compiled database.
+
+    If the URL was handed to prefetch_dbcs this waits for (or immediately
+    returns) the background result; a failed prefetch is retried here so the
+    caller sees the real error.
+    """
+    with _prefetch_lock:
+        fut = _prefetched.get(dbc_url)
+    if fut is not None:
+        try:
+            return fut.result()
+        except Exception:
+            pass
+
+    compiled = _load_dbc_from_url(dbc_url, ttl)
+    done = Future()
+    done.set_result(compiled)
+    with _prefetch_lock:
+        _prefetched[dbc_url] = done
+    return compiled
+
+
+# ------------------ BACKGROUND PREFETCH ------------------
+
+def prefetch_dbcs(urls, max_workers: int = 4):
+    """
+    Start downloading and compiling every URL in *urls* and return at once.
+
+    Work runs on daemon threads so a slow network never delays the first
+    window or keeps the process alive on exit. Results are kept in memory
+    for fetch_and_load_dbc_from_url.
+    """
+    pending = []
+    with _prefetch_lock:
+        for url in urls:
+            if url not in _prefetched:
+                fut = Future()
+                _prefetched[url] = fut
+                pending.append((url, fut))
+    if not pending:
+        return
+
+    def worker():
+        while True:
+            with _prefetch_lock:
+                if not pending:
+                    return
+                url, fut = pending.pop(0)
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(_load_dbc_from_url(url))
+            except BaseException as e:
+                fut.set_exception(e)
+
+    for _ in range(min(max_workers, len(pending))):
+        threading.Thread(target=worker, name="dbc-prefetch", daemon=True).start()
+
+
+def load_dbc_file(path: str) -> CompiledDbc:
+    """Load a local DBC through its compiled artifact in the cache dir."""
+    return dbc_compiled.load_dbc_file(path, CACHE_DIR)
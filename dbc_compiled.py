@@ -0,0 +1,120 @@
+import os
+import json
+import pickle
+import hashlib
+from typing import Dict, Optional
+
+# Bump when the layout of CompiledDbc changes so old artifacts are rebuilt.
+ARTIFACT_FORMAT = 2
+ARTIFACT_MAGIC = b"TRCDBC"
+ARTIFACT_SUFFIX = ".compiled"
+
+
+class CompiledDbc:
+    """
+    A cantools database plus the lookups the converters need on every run:
+    the frame-ID index, signal units and the resolved CSV_ORDER ranks.
+    Pickled as one artifact so neither the DBC nor these are parsed again on
+    startup; decoding still goes through the cantools messages. Unknown
+    attributes are forwarded to the wrapped database.
+    """
+
+    def __init__(self, db, sha256: str):
+        self.db = db
+        self.sha256 = sha256
+        self.message_index = {}
+        self.units: Dict[str, str] = {}
+        self.csv_order: Dict[str, int] = {}
+
+        for msg in db.messages:
+            self.message_index[msg.frame_id] = msg
+            for sig in msg.signals:
+                self.units[sig.name] = sig.unit or ""
+                try:
+                    attr = sig.dbc.attributes.get("CSV_ORDER")
+                    if attr is not None:
+                        self.csv_order[sig.name] = attr.value
+                except Exception:
+                    pass
+
+    @property
+    def messages(self):
+        return self.db.messages
+
+    def get_message_by_frame_id(self, frame_id):
+        # Same contract as cantools: KeyError for unknown IDs
+        return self.message_index[frame_id]
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name == "db":
+            raise AttributeError(name)
+        return getattr(self.db, name)
+
+
+# ------------------ ARTIFACT I/O ------------------
+# Artifacts are pickles, so they are only ever read from and written to the
+# app's own cache dir (dbc_cache/), never next to a DBC in a user folder.
+_cantools_version = None
+
+
+def _header(sha256: str) -> bytes:
+    global _cantools_version
+    if _cantools_version is None:
+        import cantools
+
+        _cantools_version = str(getattr(cantools, "__version__", ""))
+
+    meta = {
+        "format": ARTIFACT_FORMAT,
+        "sha256": sha256,
+        "cantools": _cantools_version,
+    }
+    return ARTIFACT_MAGIC + json.dumps(meta).encode("ascii") + b"\n"
+
+
+def save_artifact(path: str, compiled: CompiledDbc):
+    """Write *compiled* atomically (temp file + rename)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_header(compiled.sha256))
+        pickle.dump(compiled, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_artifact(path: str, sha256: str) -> Optional[CompiledDbc]:
+    """Return the artifact at *path* if it was built from a DBC with this hash."""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(ARTIFACT_MAGIC)) != ARTIFACT_MAGIC:
+                return None
+            if f.readline() != _header(sha256)[len(ARTIFACT_MAGIC):]:
+                return None
+            compiled = pickle.load(f)
+    except Exception:
+        return None
+    return compiled if isinstance(compiled, CompiledDbc) else None
+
+
+def load_dbc_file(path: str, cache_dir: str) -> CompiledDbc:
+    """
+    Load a DBC from disk through its compiled artifact in *cache_dir*, keyed
+    by the DBC's SHA-256, so an edited DBC is compiled again. Nothing is
+    written next to the DBC itself.
+    """
+    import cantools
+
+    with open(path, "rb") as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+
+    artifact_path = os.path.join(cache_dir, sha256 + ARTIFACT_SUFFIX)
+    compiled = load_artifact(artifact_path, sha256)
+    if compiled is not None:
+        return compiled
+
+    compiled = CompiledDbc(cantools.database.load_file(path), sha256)
+    try:
+        save_artifact(artifact_path, compiled)
+    except Exception as e:
+        print(f"⚠️ Could not cache compiled DBC: {e}")
+    return compiled
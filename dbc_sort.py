@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
-import cantools
 import re
+from dbc_cache import load_dbc_file
 
 class DragListbox(tk.Listbox):
 
@@ -76,7 +76,7 @@ class DBCEditor:
         with open(path,"r",encoding="utf8") as f:
             self.dbc_text = f.read()
 
-        self.dbc = cantools.database.load_file(path)
+        self.dbc = load_dbc_file(path)
 
         self.left.delete(0,tk.END)
         self.right.delete(0,tk.END)
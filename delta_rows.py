@@ -0,0 +1,120 @@
+"""
+Change-only ("delta") rows for the wide CSV.
+
+With CSV_DELTA=1 set, a wide row is only written when at least one watched
+signal changed since the last written row, or when CSV_DELTA_HOLD seconds
+(default 1) have passed without one. Forward-filling the result gives back
+the full table, within the deadbands:
+
+    CSV_DELTA=1
+    CSV_DELTA_HOLD=5                                   # 0 = never repeat an unchanged row
+    CSV_DELTA_SIGNALS=PackVoltage,PackCurrent,CMU_*    # watched signals (default: all)
+    CSV_DELTA_DEADBAND=PackVoltage=0.05,CMU_*_CV*=2    # ignore smaller changes
+
+Signal patterns are globs, as in derived_signals.py.
+"""
+import os
+import fnmatch
+from typing import Dict, List, Optional
+
+DELTA_ENV = "CSV_DELTA"
+HOLD_ENV = "CSV_DELTA_HOLD"
+SIGNALS_ENV = "CSV_DELTA_SIGNALS"
+DEADBAND_ENV = "CSV_DELTA_DEADBAND"
+
+DEFAULT_HOLD_S = 1.0
+
+_UNSEEN = object()
+_NUMBER = (int, float)
+
+
+def parse_deadbands(spec: Optional[str]) -> Dict[str, float]:
+    """"PackVoltage=0.05,CMU_*=2" -> {"PackVoltage": 0.05, "CMU_*": 2.0}"""
+    deadbands = {}
+    for item in (spec or "").split(","):
+        if not item.strip():
+            continue
+        pattern, sep, value = item.rpartition("=")
+        if not sep or not pattern.strip():
+            raise ValueError(f"Deadband {item!r} is not <signal>=<value>")
+        deadbands[pattern.strip()] = abs(float(value))
+    return deadbands
+
+
+class ChangeFilter:
+    """
+    Decides, frame by frame, whether the wide row for that frame is written.
+
+    update() is given the signals a frame just decoded. Each watched signal
+    is compared with the value in the last written row (so a slow drift is
+    still caught once it exceeds the deadband); unwatched signals are carried
+    along and appear in the next written row. Only the signals of the frame
+    are looked at, so a skipped frame costs a few dict lookups and no row.
+    """
+
+    def __init__(self, hold: Optional[float] = DEFAULT_HOLD_S, deadbands: Optional[Dict[str, float]] = None,
+                 signals: Optional[List[str]] = None):
+        self.hold = hold or None
+        self.deadbands = list((deadbands or {}).items())
+        self.signals = list(signals) if signals else None
+        self.frames = 0
+        self.rows = 0
+        self._watch: Dict[str, Optional[float]] = {}   # signal -> deadband, None if not watched
+        self._written: Dict[str, object] = {}
+        self._pending: Dict[str, object] = {}
+        self._last_row_time = None
+
+    @classmethod
+    def from_env(cls) -> Optional["ChangeFilter"]:
+        """A new filter from the CSV_DELTA* environment variables, or None if CSV_DELTA is not set."""
+        if os.environ.get(DELTA_ENV, "").strip().lower() not in ("1", "true", "yes", "on"):
+            return None
+        try:
+            hold = float(os.environ.get(HOLD_ENV) or DEFAULT_HOLD_S)
+            deadbands = parse_deadbands(os.environ.get(DEADBAND_ENV))
+        except ValueError as e:
+            print(f"⚠️ Ignoring change-only settings: {e}")
+            return None
+        signals = [s.strip() for s in os.environ.get(SIGNALS_ENV, "").split(",") if s.strip()]
+        return cls(hold, deadbands, signals)
+
+    def _deadband(self, sig) -> Optional[float]:
+        if self.signals is not None and not any(fnmatch.fnmatchcase(sig, p) for p in self.signals):
+            band = None
+        else:
+            band = next((b for p, b in self.deadbands if fnmatch.fnmatchcase(sig, p)), 0.0)
+        self._watch[sig] = band
+        return band
+
+    def update(self, timestamp: float, values: dict) -> bool:
+        """Record the signals of one frame; True if the frame's row is to be written."""
+        self.frames += 1
+        self._pending.update(values)
+
+        emit = self._last_row_time is None or (
+            self.hold is not None and timestamp - self._last_row_time >= self.hold
+        )
+        if not emit:
+            watch, written = self._watch, self._written
+            for sig, val in values.items():
+                band = watch[sig] if sig in watch else self._deadband(sig)
+                if band is None:
+                    continue
+                last = written.get(sig, _UNSEEN)
+                if val == last:
+                    continue
+                if band and type(val) in _NUMBER and type(last) in _NUMBER and abs(val - last) <= band:
+                    continue
+                emit = True
+                break
+
+        if emit:
+            self._written.update(self._pending)
+            self._pending.clear()
+            self._last_row_time = timestamp
+            self.rows += 1
+        return emit
+
+    def summary(self) -> str:
+        share = 100.0 * self.rows / self.frames if self.frames else 0.0
+        return f"🔻 Change-only rows: kept {self.rows:,} of {self.frames:,} ({share:.1f} %)"
@@ -0,0 +1,268 @@
+import os
+import ast
+import json
+import fnmatch
+from functools import reduce
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+AGGREGATES = ("max", "min", "mean", "sum", "delta")
+EXPRESSION = "expr"
+
+# Derived values per DBC preset (the names in DBC_URLS). An entry is either an
+# aggregate across every column matching one of the glob patterns in "columns"
+# (delta = max - min, e.g. cell imbalance), or an arithmetic "expr" over signal
+# names and derived values defined above it. A custom DBC can ship the same
+# list as JSON next to it: "My BMS.dbc" -> "My BMS.derived.json".
+PRESETS = {
+    "CIP BMS-24X": [
+        {"name": " Max. Cell Voltage [mV]", "op": "max", "columns": ["CMU_[12]_CV[1-9]"], "unit": "mV"},
+        {"name": " Min. Cell Voltage [mV]", "op": "min", "columns": ["CMU_[12]_CV[1-9]"], "unit": "mV"},
+        {"name": "Temp_Max_degC", "op": "max", "columns": ["Temperature_[1-6]"], "unit": "degC"},
+        {"name": "Temp_Min_degC", "op": "min", "columns": ["Temperature_[1-6]"], "unit": "degC"},
+    ],
+}
+
+SIDECAR_SUFFIX = ".derived.json"
+
+
+class DerivedSignal(NamedTuple):
+    name: str
+    op: str
+    columns: tuple = ()
+    expr: str = ""
+    unit: str = ""
+
+
+def _spec_to_signal(spec: dict) -> DerivedSignal:
+    name = spec.get("name")
+    if not name:
+        raise ValueError(f"Derived signal without a name: {spec}")
+    if "expr" in spec:
+        return DerivedSignal(name, EXPRESSION, expr=str(spec["expr"]), unit=spec.get("unit", ""))
+    op = spec.get("op")
+    if op not in AGGREGATES:
+        raise ValueError(f"Derived signal {name!r}: op must be one of {', '.join(AGGREGATES)} or an expr")
+    columns = spec.get("columns")
+    if isinstance(columns, str):
+        columns = [columns]
+    if not columns:
+        raise ValueError(f"Derived signal {name!r}: no columns given")
+    return DerivedSignal(name, op, columns=tuple(columns), unit=spec.get("unit", ""))
+
+
+# ------------------ EXPRESSIONS ------------------
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod, ast.USub, ast.UAdd,
+)
+_FUNCTIONS = ("abs", "sqrt", "min", "max", "col")
+
+
+class _Inputs(ast.NodeTransformer):
+    """Replace signal references (bare names or col("any name")) by _v[i]."""
+
+    def __init__(self):
+        self.names: List[str] = []
+
+    def _ref(self, name, node):
+        if name not in self.names:
+            self.names.append(name)
+        ref = ast.Subscript(
+            value=ast.Name(id="_v", ctx=ast.Load()),
+            slice=ast.Constant(self.names.index(name)),
+            ctx=ast.Load(),
+        )
+        return ast.copy_location(ref, node)
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS or node.keywords:
+            raise ValueError(f"Unsupported function in derived expression: {ast.dump(node.func)}")
+        if node.func.id == "col":
+            if len(node.args) != 1 or not isinstance(node.args[0], ast.Constant) or not isinstance(node.args[0].value, str):
+                raise ValueError('col() takes one quoted signal name, e.g. col("Max. Cell Voltage [mV]")')
+            return self._ref(node.args[0].value, node)
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def visit_Name(self, node):
+        return self._ref(node.id, node)
+
+
+def compile_expression(expr: str):
+    """
+    Compile an arithmetic expression over signal names into a code object
+    evaluated on whole NumPy columns. Returns (code, input signal names).
+    """
+    tree = ast.parse(expr, mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in derived expression {expr!r}: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, str)):
+            raise ValueError(f"Unsupported constant in derived expression {expr!r}")
+    inputs = _Inputs()
+    tree = ast.fix_missing_locations(inputs.visit(tree))
+    return compile(tree, f"<derived: {expr}>", "eval"), inputs.names
+
+
+def _expression_env():
+    import numpy as np
+
+    return {
+        "__builtins__": {},
+        "abs": np.abs,
+        "sqrt": np.sqrt,
+        "min": lambda *a: reduce(np.fmin, a),
+        "max": lambda *a: reduce(np.fmax, a),
+    }
+
+
+# ------------------ AGGREGATES ------------------
+def _aggregate(op, arrays):
+    """Row-wise aggregate across columns, skipping NaN like DataFrame.max(axis=1)."""
+    import numpy as np
+
+    if all(a.dtype.kind in "iu" for a in arrays):
+        stacked = np.vstack(arrays)
+        if op == "max":
+            return stacked.max(axis=0)
+        if op == "min":
+            return stacked.min(axis=0)
+        if op == "sum":
+            return stacked.sum(axis=0)
+        if op == "mean":
+            return stacked.mean(axis=0)
+        return stacked.max(axis=0) - stacked.min(axis=0)
+
+    stacked = np.vstack([a.astype(np.float64, copy=False) for a in arrays])
+    if op == "max":
+        return np.fmax.reduce(stacked, axis=0)
+    if op == "min":
+        return np.fmin.reduce(stacked, axis=0)
+    if op == "delta":
+        return np.fmax.reduce(stacked, axis=0) - np.fmin.reduce(stacked, axis=0)
+    total = np.nansum(stacked, axis=0)
+    if op == "sum":
+        return total
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return total / np.count_nonzero(~np.isnan(stacked), axis=0)
+
+
+# ------------------ ENGINE ------------------
+class DerivedSignals:
+    """
+    Derived columns for one DBC, compiled once.
+
+    The column globs and expressions are resolved against a table's columns
+    the first time that column set is seen; apply() then adds every derived
+    column to a frame with vectorized NumPy operations, converting only the
+    input columns it needs. Derived values only depend on their own row, so
+    apply() can be called on each chunk of a streamed table as it is produced.
+    """
+
+    def __init__(self, specs=()):
+        self.signals = [s if isinstance(s, DerivedSignal) else _spec_to_signal(s) for s in specs]
+        self._code = {
+            s.name: compile_expression(s.expr) for s in self.signals if s.op == EXPRESSION
+        }
+        self._plans: Dict[tuple, list] = {}
+        self._env = None
+
+    def __len__(self):
+        return len(self.signals)
+
+    @property
+    def units(self) -> Dict[str, str]:
+        return {s.name: s.unit for s in self.signals}
+
+    @classmethod
+    def for_dbc(cls, dbc_source: str) -> "DerivedSignals":
+        """Derived signals for a preset name, or from the JSON next to a custom DBC file."""
+        if dbc_source in PRESETS:
+            return cls(PRESETS[dbc_source])
+        sidecar = os.path.splitext(dbc_source)[0] + SIDECAR_SUFFIX
+        if os.path.isfile(sidecar):
+            try:
+                with open(sidecar, "r", encoding="utf-8") as f:
+                    derived = cls(json.load(f))
+                print(f"🧮 Loaded {len(derived)} derived signal(s) from {os.path.basename(sidecar)}")
+                return derived
+            except (OSError, ValueError, SyntaxError) as e:
+                print(f"⚠️ Ignoring derived signal config {sidecar}: {e}")
+        return cls()
+
+    def plan(self, columns) -> list:
+        """(signal, input columns) for every derived signal computable from *columns*."""
+        key = tuple(columns)
+        plan = self._plans.get(key)
+        if plan is not None:
+            return plan
+
+        plan = []
+        available = set(key)
+        for sig in self.signals:
+            if sig.op == EXPRESSION:
+                inputs = self._code[sig.name][1]
+                if not all(name in available for name in inputs):
+                    continue
+            else:
+                inputs = [c for c in key if any(fnmatch.fnmatchcase(c, p) for p in sig.columns)]
+                if not inputs:
+                    continue
+            plan.append((sig, inputs))
+            available.add(sig.name)
+        self._plans[key] = plan
+        return plan
+
+    def apply(self, df: "pd.DataFrame", float_columns=()) -> "pd.DataFrame":
+        """
+        Return *df* with the derived columns appended (the input columns are
+        not copied). Inputs named in *float_columns* are taken as float even
+        if this chunk holds only integers, as they would be in the whole table.
+        """
+        import numpy as np
+        import pandas as pd
+
+        plan = self.plan(df.columns) if self.signals else []
+        if not plan:
+            return df
+
+        df = df.copy(deep=False)
+        numeric = {}
+
+        def values(col):
+            arr = numeric.get(col)
+            if arr is None:
+                arr = pd.to_numeric(df[col], errors="coerce").to_numpy()
+                if arr.dtype.kind == "b":
+                    arr = arr.astype(np.int64)
+                if col in float_columns and arr.dtype.kind in "iu":
+                    arr = arr.astype(np.float64)
+                numeric[col] = arr
+            return arr
+
+        for sig, inputs in plan:
+            arrays = [values(c) for c in inputs]
+            if sig.op == EXPRESSION:
+                if self._env is None:
+                    self._env = _expression_env()
+                with np.errstate(all="ignore"):
+                    result = eval(self._code[sig.name][0], self._env, {"_v": arrays})
+                if np.ndim(result) == 0:  # expression of constants only
+                    result = np.full(len(df), result)
+            else:
+                result = _aggregate(sig.op, arrays)
+            df[sig.name] = result
+            numeric[sig.name] = np.asarray(result)
+        return df
+
+
+def unit_row(columns, unit_map: Dict[str, str], derived: Optional[DerivedSignals] = None) -> List[str]:
+    """Units for *columns*: "s" for the time column, derived units, then the DBC's."""
+    derived_units = derived.units if derived is not None else {}
+    return [
+        "s" if c == "Time (s)" else derived_units[c] if c in derived_units else unit_map.get(c, "")
+        for c in columns
+    ]
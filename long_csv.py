@@ -0,0 +1,359 @@
+"""
+Long ("tidy") CSV layout: one row per decoded sample instead of one wide,
+forward-filled row per frame.
+
+With CSV_LAYOUT=long set, the converters write <input>_long.csv with the
+columns Time (s), CAN ID, Signal, Value, Unit. A frame only adds rows for
+the signals it carries, so for wide DBCs the file is a small fraction of the
+wide table. The wide export's column order is saved next to it in
+<input>_long.columns.json, and the wide layout can be rebuilt when needed:
+
+    python long_csv.py pivot run_long.csv.gz -o run_wide.csv
+    python long_csv.py pivot run_long.csv -s PackVoltage,PackCurrent --start 120 --end 180 --resample 100
+"""
+import os
+import sys
+import json
+import argparse
+from itertools import repeat
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from csv_writer import (
+    csv_extension, format_column, open_csv_output, quote_field, resolve_compression, split_csv_path,
+    write_large_csv,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+LAYOUT_ENV = "CSV_LAYOUT"   # "wide" (default) or "long"
+COLUMNS = ("Time (s)", "CAN ID", "Signal", "Value", "Unit")
+COLUMN_ORDER_SUFFIX = ".columns.json"
+BLOCK_ROWS = 100_000
+
+# Same rounding as the wide TRC export
+TIME_PRECISION = 6
+VALUE_PRECISION = 3
+
+# The wide table shows "NA" once a signal's message has not been seen for this long
+STALE_AFTER_S = 1.0
+MISSING = "NA"
+
+
+def long_layout_enabled() -> bool:
+    return os.environ.get(LAYOUT_ENV, "").strip().lower() == "long"
+
+
+def long_csv_path(source_path: str, compression: Optional[str] = None) -> str:
+    return os.path.splitext(source_path)[0] + "_long" + csv_extension(compression)
+
+
+def column_order_path(long_path: str) -> str:
+    """<base>_long.columns.json for <base>_long.csv[.gz|.zst]."""
+    return split_csv_path(long_path)[0] + COLUMN_ORDER_SUFFIX
+
+
+def read_column_order(long_path: str):
+    """(signal columns in wide export order, {signal: unit}) saved with a long CSV, or (None, {})."""
+    try:
+        with open(column_order_path(long_path), "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        return list(saved["columns"]), dict(saved.get("units") or {})
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, {}
+
+
+def format_can_id(can_id: Optional[int]) -> str:
+    if can_id is None:
+        return ""
+    return f"0x{can_id:08X}" if can_id > 0x7FF else f"0x{can_id:03X}"
+
+
+# ------------------ WRITER ------------------
+class LongCsvWriter:
+    """
+    Streaming writer for the long layout.
+
+    Samples are buffered column-wise and formatted BLOCK_ROWS at a time with
+    the vectorized formatters of csv_writer.py; the CAN ID, signal and unit
+    fields are formatted once per signal. Like SignalDatabaseWriter it can be
+    passed to parse_trc_file() as a sample sink. Float values are rounded to
+    *precision* decimals (None keeps full precision). If *column_order* (the
+    wide export's signal columns) is set by the time of close(), it is saved
+    to the column order file for pivot_long_csv().
+    """
+
+    def __init__(self, path: str, units: Optional[Dict[str, str]] = None, compression: Optional[str] = None,
+                 level: Optional[int] = None, precision: Optional[int] = VALUE_PRECISION,
+                 lineterminator: str = os.linesep):
+        self.path = path
+        self.units = units or {}
+        self.precision = precision
+        self.rows = 0
+        self.column_order: Optional[List[str]] = None
+        self._eol = lineterminator
+        if os.path.exists(column_order_path(path)):
+            os.remove(column_order_path(path))   # belongs to an earlier file at this path
+        self._file = open_csv_output(path, compression, level)
+        self._file.write(",".join(COLUMNS) + lineterminator)
+        self._keys: Dict[str, int] = {}
+        self._message_keys: Dict[tuple, List[int]] = {}   # signal names of a decoded message -> keys
+        self._middles: List[str] = []   # "CAN ID,Signal" per key
+        self._tails: List[str] = []     # "Unit" + line terminator per key
+        self._times: List[float] = []
+        self._sample_keys: List[int] = []
+        self._values: list = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
+
+    def _key(self, sig, can_id):
+        key = self._keys[sig] = len(self._middles)
+        self._middles.append(f"{format_can_id(can_id)},{quote_field(sig)}")
+        self._tails.append(quote_field(self.units.get(sig, "") or "") + self._eol)
+        return key
+
+    def _keys_of(self, names, can_id):
+        keys = self._message_keys[names] = [
+            self._keys[sig] if sig in self._keys else self._key(sig, can_id) for sig in names
+        ]
+        return keys
+
+    def add(self, timestamp: float, can_id: Optional[int], decoded: dict):
+        """Record every signal of one decoded message."""
+        names = tuple(decoded)
+        keys = self._message_keys.get(names) or self._keys_of(names, can_id)
+        self._times.extend(repeat(timestamp, len(keys)))
+        self._sample_keys.extend(keys)
+        self._values.extend(decoded.values())
+        if len(self._times) >= BLOCK_ROWS:
+            self._flush()
+
+    def add_samples(self, times, signals, values, can_ids: Optional[Dict[str, int]] = None):
+        """Record samples given as parallel sequences, written in the order given."""
+        keys = self._keys
+        can_ids = can_ids or {}
+        self._times.extend(times)
+        self._sample_keys.extend([keys[s] if s in keys else self._key(s, can_ids.get(s)) for s in signals])
+        self._values.extend(values)
+        if len(self._times) >= BLOCK_ROWS:
+            self._flush()
+
+    def _flush(self):
+        import numpy as np
+
+        middles, tails = self._middles, self._tails
+        for start in range(0, len(self._times), BLOCK_ROWS):
+            stop = start + BLOCK_ROWS
+            times = format_column(np.array(self._times[start:stop], dtype=np.float64), TIME_PRECISION)
+            values = np.empty(len(times), dtype=object)
+            values[:] = self._values[start:stop]
+            values = format_column(values, self.precision)
+            self._file.write("".join([
+                f"{t},{middles[k]},{v},{tails[k]}" for t, k, v in zip(times, self._sample_keys[start:stop], values)
+            ]))
+        self.rows += len(self._times)
+        self._times, self._sample_keys, self._values = [], [], []
+
+    def close(self) -> str:
+        self._flush()
+        self._file.close()
+        if self.column_order:
+            with open(column_order_path(self.path), "w", encoding="utf-8") as f:
+                json.dump({
+                    "columns": list(self.column_order),
+                    "units": {sig: self.units.get(sig, "") or "" for sig in self.column_order},
+                }, f, indent=1)
+        size_mb = os.path.getsize(self.path) / 1e6
+        print(f"✅ Saved long CSV: {self.path} ({self.rows:,} samples, {len(self._keys)} signals, {size_mb:.1f} MB)")
+        return self.path
+
+    def discard(self):
+        """Close without finishing and delete the partial file (after a failed decode)."""
+        self._times, self._sample_keys, self._values = [], [], []
+        self._file.close()
+        for path in (self.path, column_order_path(self.path)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def open_long_csv(source_path: str, units: Optional[Dict[str, str]] = None, compression: Optional[str] = None,
+                  level: Optional[int] = None, precision: Optional[int] = VALUE_PRECISION) -> LongCsvWriter:
+    compression = resolve_compression(compression)
+    return LongCsvWriter(long_csv_path(source_path, compression), units, compression, level, precision)
+
+
+# ------------------ PIVOT ------------------
+def read_long_csv(path: str, signals=None, start: Optional[float] = None, end: Optional[float] = None,
+                  chunksize: int = 1_000_000):
+    """
+    Read a long CSV in chunks, keeping only *signals* (all if None) between
+    *start* and *end*. Returns ({signal: (times, values)}, {signal: unit}),
+    signals in order of first appearance and values as written.
+    """
+    import numpy as np
+    import pandas as pd
+
+    wanted = set(signals) if signals else None
+    parts: Dict[str, list] = {}
+    units: Dict[str, str] = {}
+    reader = pd.read_csv(
+        path, usecols=["Time (s)", "Signal", "Value", "Unit"], chunksize=chunksize,
+        dtype={"Signal": str, "Value": str, "Unit": str}, keep_default_na=False,
+    )
+    for chunk in reader:
+        if wanted is not None:
+            chunk = chunk[chunk["Signal"].isin(wanted)]
+        if start is not None:
+            chunk = chunk[chunk["Time (s)"] >= start]
+        if end is not None:
+            chunk = chunk[chunk["Time (s)"] <= end]
+        for sig, group in chunk.groupby("Signal", sort=False):
+            parts.setdefault(sig, []).append((group["Time (s)"].to_numpy(np.float64), group["Value"].to_numpy(object)))
+            if sig not in units:
+                units[sig] = group["Unit"].iat[0]
+
+    series = {}
+    for sig, chunks in parts.items():
+        times = np.concatenate([t for t, _ in chunks])
+        values = np.concatenate([v for _, v in chunks])
+        order = np.argsort(times, kind="stable")
+        series[sig] = (times[order], _as_numbers(values[order]))
+    return series, units
+
+
+def _as_numbers(values):
+    """Numeric array if every value parses as a number, else the strings unchanged."""
+    import pandas as pd
+
+    numbers = pd.to_numeric(values, errors="coerce")
+    if len(values) and not pd.isna(numbers).any():
+        return numbers
+    return values
+
+
+def long_to_wide(series: Dict[str, tuple], signals=None, resample_ms: Optional[float] = None,
+                 start: Optional[float] = None, end: Optional[float] = None,
+                 stale_after: Optional[float] = STALE_AFTER_S, column_order=None) -> "pd.DataFrame":
+    """
+    Wide table from per-signal (times, values): one row per distinct sample
+    time (or every *resample_ms* milliseconds), each signal holding its
+    latest value at that time, and "NA" before its first sample or once it is
+    older than *stale_after* seconds, like the wide export.
+
+    Columns are *signals* in the order given, else *column_order* (the wide
+    export's order, see read_column_order; its signals without samples are
+    all "NA", as in the export) followed by any other signals in order of
+    first appearance.
+
+    Values match the wide export at the times both have, but the rows do
+    not always: the export writes one row per frame, this one per sample
+    time. Frames that carry samples but give no export row (a 0x7A1 BMS
+    firmware frame the DBC cannot decode adds only BMS_Firmware) get a row
+    here, and frames without samples (IDs not in the DBC) get none.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if signals:
+        names = list(signals)
+        missing = [n for n in names if n not in series]
+        if missing:
+            raise KeyError(f"Not in the long CSV: {', '.join(missing)}")
+    else:
+        names = list(column_order or ())
+        ordered = set(names)
+        names += [n for n in series if n not in ordered]
+    sampled = [n for n in names if n in series]
+
+    if resample_ms:
+        lo = start if start is not None else min((series[n][0][0] for n in sampled if len(series[n][0])), default=0.0)
+        hi = end if end is not None else max((series[n][0][-1] for n in sampled if len(series[n][0])), default=lo)
+        step = resample_ms / 1000
+        grid = lo + step * np.arange(int(np.floor((hi - lo) / step + 1e-9)) + 1)
+    else:
+        grid = np.unique(np.concatenate([series[n][0] for n in sampled])) if sampled else np.empty(0)
+        if start is not None:
+            grid = grid[grid >= start]
+        if end is not None:
+            grid = grid[grid <= end]
+
+    columns = {"Time (s)": grid}
+    for name in names:
+        if name not in series:
+            columns[name] = np.full(len(grid), MISSING, dtype=object)
+            continue
+        times, values = series[name]
+        pos = np.searchsorted(times, grid, side="right") - 1
+        valid = pos >= 0
+        if stale_after is not None:
+            valid &= grid - times[np.maximum(pos, 0)] <= stale_after + 1e-9
+        col = np.full(len(grid), MISSING, dtype=object)
+        col[valid] = np.asarray(values, dtype=object)[pos[valid]]
+        columns[name] = col
+    return pd.DataFrame(columns)
+
+
+def pivot_long_csv(path: str, output_base: Optional[str] = None, signals=None, start: Optional[float] = None,
+                   end: Optional[float] = None, resample_ms: Optional[float] = None,
+                   compression: Optional[str] = None, level: Optional[int] = None) -> List[str]:
+    """
+    Rebuild the wide CSV (unit row on top, split every 1M rows) from a long
+    CSV, with the export's column order if it was saved alongside. Derived
+    signals are not part of the long layout and are not rebuilt.
+    """
+    import pandas as pd
+
+    # samples shortly before *start* still give the value at *start*
+    lookback = start - STALE_AFTER_S if start is not None else None
+    series, units = read_long_csv(path, signals, lookback, end)
+    column_order, saved_units = read_column_order(path)
+    df = long_to_wide(series, signals, resample_ms, start, end, column_order=column_order)
+    units = {**saved_units, **units}
+    unit_row = pd.DataFrame([["s"] + [units.get(c, "") for c in df.columns[1:]]], columns=df.columns)
+    if output_base is None:
+        base = split_csv_path(path)[0]
+        output_base = (base[:-len("_long")] if base.endswith("_long") else base) + "_wide"
+    return write_large_csv(
+        [unit_row, df], output_base, precision=None, column_precision={"Time (s)": TIME_PRECISION},
+        compression=compression, level=level,
+    )
+
+
+# ------------------ CLI ------------------
+def main(argv=None):
+    from csv_writer import compression_from_env
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p_pivot = sub.add_parser("pivot", help="rebuild the wide, forward-filled CSV")
+    p_pivot.add_argument("csv")
+    p_pivot.add_argument("-o", "--output", help="output base name (default: <input>_wide)")
+    p_pivot.add_argument("-s", "--signals", help="comma-separated signal names (default: all)")
+    p_pivot.add_argument("--start", type=float, help="seconds")
+    p_pivot.add_argument("--end", type=float, help="seconds")
+    p_pivot.add_argument("--resample", type=float, metavar="MS", help="one row every MS milliseconds")
+    args = ap.parse_args(argv)
+
+    names = [n.strip() for n in args.signals.split(",") if n.strip()] if args.signals else None
+    output = split_csv_path(args.output)[0] if args.output else None
+    compression, level = compression_from_env()
+    try:
+        paths = pivot_long_csv(args.csv, output, names, args.start, args.end, args.resample, compression, level)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        return 1
+    print(f"✅ Saved wide CSV: {paths[0]}" + (f" (+{len(paths) - 1} part(s))" if len(paths) > 1 else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
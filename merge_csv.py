@@ -3,8 +3,18 @@ import math
 from typing import Iterable, List
 import pandas as pd
 
+from csv_writer import csv_extension, part_path, resolve_compression, split_csv_path, write_csv, write_large_csv
+
 OUTPUT_FILE = "merged.csv"
 
+# Rough memory taken by the in-memory merge per byte of input CSV (string
+# cells, then the concatenated and cleaned copies); compressed inputs
+# inflate about COMPRESSED_RATIO times when read
+MERGE_BYTES_PER_CSV_BYTE = 10
+COMPRESSED_RATIO = 5
+SKIP_ROWS = 25
+STREAM_CHUNK_ROWS = 200_000
+
 def _detect_and_strip_unit_row(df: pd.DataFrame):
     """Detect unit row and remove it."""
 
@@ -39,18 +49,162 @@ def _detect_and_strip_unit_row(df: pd.DataFrame):
     return units, df
 
 
+def _order_columns(all_columns: List[str], seen) -> List[str]:
+    """Time column first; Time (s) dropped when DATE + TIME exist."""
+    if "DATE" in seen and "TIME" in seen:
+        return [c for c in all_columns if c != "Time (s)"]
+    if "Time (s)" in seen:
+        return ["Time (s)"] + [c for c in all_columns if c != "Time (s)"]
+    if "Time" in seen:
+        return ["Time"] + [c for c in all_columns if c != "Time"]
+    return all_columns
+
+
+def _estimated_merge_bytes(paths: List[str]) -> int:
+    total = 0
+    for path in paths:
+        if os.path.exists(path):
+            size = os.path.getsize(path)
+            if path.lower().endswith((".gz", ".zst")):
+                size *= COMPRESSED_RATIO
+            total += size * MERGE_BYTES_PER_CSV_BYTE
+    return total
+
+
+def _read_data_chunks(path: str, columns: List[str]):
+    """
+    Data rows of one decoded CSV in chunks, cleaned as the in-memory merge
+    does: unit row and first SKIP_ROWS rows dropped, reindexed to *columns*,
+    blank cells as NA and empty rows removed.
+    """
+    skip = SKIP_ROWS
+    first = True
+    for chunk in pd.read_csv(path, dtype=str, chunksize=STREAM_CHUNK_ROWS):
+        if first:
+            _, chunk = _detect_and_strip_unit_row(chunk)
+            first = False
+        if skip:
+            dropped = min(skip, len(chunk))
+            chunk = chunk.iloc[dropped:]
+            skip -= dropped
+        chunk = chunk.reindex(columns=columns).replace(r"^\s*$", pd.NA, regex=True).dropna(how="all")
+        if len(chunk):
+            yield chunk.reset_index(drop=True)
+
+
+def _merge_streaming(csv_list: List[str], output_file: str, open_after: bool, row_limit: int | None,
+                     compression: str | None, level: int | None):
+    """
+    merge_csv_files() for inputs that would not fit the memory budget: the
+    same output, built in three passes over the files (headers and units,
+    then which columns hold data, then the rows) holding one chunk at a time.
+    """
+    paths = []
+    all_units = {}
+    all_columns = []
+    seen = set()
+
+    for path in csv_list:
+        if not os.path.exists(path):
+            print(f"Warning: CSV file not found, skipping: {path}")
+            continue
+        head = pd.read_csv(path, dtype=str, nrows=1)
+        if head.empty:
+            continue
+        units, _ = _detect_and_strip_unit_row(head)
+        all_units.update({k: v for k, v in units.items() if v is not None})
+        for col in head.columns:
+            if col not in seen:
+                seen.add(col)
+                all_columns.append(col)
+        paths.append(path)
+
+    if not paths:
+        raise RuntimeError("No non-empty CSV data to merge")
+
+    all_columns = _order_columns(all_columns, seen)
+
+    units_df = None
+    if all_units:
+        unit_row = [all_units.get(col, "") for col in all_columns]
+        units_df = pd.DataFrame([unit_row], columns=all_columns).replace(r"^\s*$", pd.NA, regex=True)
+        if units_df.isna().all().all():
+            units_df = None
+
+    # columns with data, not counting the first row (the unit row, if there is one)
+    has_data = pd.Series(False, index=all_columns)
+    rows = 0 if units_df is None else 1
+    for path in paths:
+        for chunk in _read_data_chunks(path, all_columns):
+            data = chunk if rows else chunk.iloc[1:]
+            has_data |= data.notna().any(axis=0)
+            rows += len(chunk)
+
+    cols_to_keep = all_columns
+    if rows > 1:
+        for col in ("DATE", "TIME", "Time (s)"):
+            if col in has_data.index:
+                has_data[col] = True
+        cols_to_keep = [c for c in all_columns if has_data[c]]
+
+    def frames():
+        if units_df is not None:
+            yield units_df[cols_to_keep]
+        for path in paths:
+            for chunk in _read_data_chunks(path, all_columns):
+                yield chunk[cols_to_keep]
+        yield pd.DataFrame(columns=cols_to_keep)   # the header, when there are no rows at all
+
+    compression = resolve_compression(compression)
+    base, ext = split_csv_path(output_file)
+    if compression:
+        ext = csv_extension(compression)
+        output_file = base + ext
+
+    if row_limit is not None and row_limit > 0:
+        output_paths = write_large_csv(
+            frames(), base, row_limit, precision=None, compression=compression, level=level, streaming=True,
+        )
+    else:
+        write_csv(frames(), output_file, precision=None, compression=compression, level=level)
+        output_paths = [output_file]
+
+    if open_after and output_paths:
+        try:
+            os.startfile(output_paths[0])
+        except Exception as e:
+            print(f"Could not open file: {e}")
+
+    print(f"Merged {len(csv_list)} CSV files into {len(output_paths)} output file(s).")
+    return output_paths
+
+
 def merge_csv_files(
     csv_files: Iterable[str],
     output_file: str = OUTPUT_FILE,
     open_after: bool = False,
     row_limit: int | None = None,
+    compression: str | None = None,
+    level: int | None = None,
+    memory_budget: int | None = None,
 ):
+    """
+    Merge decoded CSVs into *output_file* (split every *row_limit* rows).
+    Inputs may be plain, .csv.gz or .csv.zst; with *compression* ("gzip" or
+    "zstd") the output is streamed through that compressor at *level*.
+    With *memory_budget* (bytes) inputs too large to merge in memory are
+    streamed instead.
+    """
 
     csv_list: List[str] = list(csv_files)
 
     if not csv_list:
         raise RuntimeError("No CSV files provided for merge")
 
+    if memory_budget and _estimated_merge_bytes(csv_list) > memory_budget:
+        print("💽 Merging in chunks to stay within the memory budget...")
+        return _merge_streaming(csv_list, output_file, open_after, row_limit, compression, level)
+
     dataframes: List[pd.DataFrame] = []
     all_units = {}
 
@@ -60,6 +214,7 @@ def merge_csv_files(
             print(f"Warning: CSV file not found, skipping: {path}")
             continue
 
+        # compression is inferred from the extension (.gz / .zst)
         df = pd.read_csv(path, dtype=str)
 
         if df.empty:
@@ -95,14 +250,7 @@ def merge_csv_files(
                 all_columns.append(col)
 
     # Remove Time(s) if DATE + TIME exist
-    if "DATE" in seen and "TIME" in seen:
-        all_columns = [c for c in all_columns if c != "Time (s)"]
-
-    elif "Time (s)" in seen:
-        all_columns = ["Time (s)"] + [c for c in all_columns if c != "Time (s)"]
-
-    elif "Time" in seen:
-        all_columns = ["Time"] + [c for c in all_columns if c != "Time"]
+    all_columns = _order_columns(all_columns, seen)
 
     normalized = [df.reindex(columns=all_columns) for df in dataframes]
 
@@ -147,6 +295,12 @@ def merge_csv_files(
 
         final_df = final_df.loc[:, cols_to_keep]
 
+    compression = resolve_compression(compression)
+    base, ext = split_csv_path(output_file)
+    if compression:
+        ext = csv_extension(compression)
+        output_file = base + ext
+
     # -----------------------------
     # Split large files
     # -----------------------------
@@ -155,7 +309,6 @@ def merge_csv_files(
 
         total_rows = len(final_df)
         total_parts = math.ceil(total_rows / row_limit)
-        base, ext = os.path.splitext(output_file)
         output_paths: List[str] = []
 
         print(
@@ -168,9 +321,8 @@ def merge_csv_files(
             start = i * row_limit
             end = (i + 1) * row_limit
             chunk = final_df.iloc[start:end]
-            suffix = "" if i == 0 else f"_part{i+1}"
-            path = f"{base}{suffix}{ext}"
-            chunk.to_csv(path, index=False)
+            path = part_path(base, i, ext)
+            write_csv([chunk], path, precision=None, compression=compression, level=level)
             output_paths.append(path)
             print(f"✔ Saved: {path} ({len(chunk)} rows)")
 
@@ -187,7 +339,7 @@ def merge_csv_files(
     # Write single CSV
     # -----------------------------
 
-    final_df.to_csv(output_file, index=False)
+    write_csv([final_df], output_file, precision=None, compression=compression, level=level)
 
     print(f"Merged {len(csv_list)} CSV files into {output_file}")
 
@@ -197,6 +349,8 @@ def merge_csv_files(
         except Exception as e:
             print(f"Could not open file: {e}")
 
+    return [output_file]
+
 
 if __name__ == "__main__":
 
@@ -209,11 +363,16 @@ if __name__ == "__main__":
 
     csv_files = filedialog.askopenfilenames(
         title="Select CSV files to merge",
-        filetypes=[("CSV files", "*.csv")]
+        filetypes=[("CSV files", "*.csv;*.csv.gz;*.csv.zst"), ("All files", "*.*")]
     )
 
     root.destroy()
     csv_files = list(csv_files)
     if not csv_files:
         raise RuntimeError("No CSV files selected")
-    merge_csv_files(csv_files, OUTPUT_FILE, open_after=True)
+    from csv_writer import compression_from_env
+    from spill import memory_budget
+
+    compression, level = compression_from_env()
+    merge_csv_files(csv_files, OUTPUT_FILE, open_after=True, compression=compression, level=level,
+                    memory_budget=memory_budget())
@@ -0,0 +1,383 @@
+"""
+Overlapped reading, decoding and writing of large log files.
+
+    reader thread --> line batches --> decoder processes --> row build --> writer thread
+                 (bounded queue)      (bounded window,      (in file     (bounded queue)
+                                       results in order)     order)
+
+The reader does large sequential reads (mmap where the file allows it) and
+cuts them into batches of whole lines. DECODE_WORKERS processes parse and
+decode the batches (default: one per spare CPU, up to MAX_WORKERS, for files
+over PARALLEL_MIN_BYTES; DECODE_WORKERS=0 decodes in-process), and their
+results come back in file order, so the stateful row build sees exactly the
+sequence a serial run would. Sample sinks (long CSV, SQLite) are fed from a
+writer thread. Every queue is bounded: a slow stage holds the others back
+instead of letting batches pile up in memory. When the file is done, the
+busy share of each stage is printed, which names the bottleneck.
+"""
+import os
+import mmap
+import time
+import pickle
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional
+
+WORKERS_ENV = "DECODE_WORKERS"
+
+READ_BLOCK = 1024 * 1024        # bytes per read, and so per batch of lines
+QUEUE_DEPTH = 8                 # batches buffered between two stages
+SINK_BATCH = 20_000             # sink calls handed to the writer thread at once
+WINDOW_PER_WORKER = 2           # batches in flight per decoder process
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+MAX_WORKERS = 4
+PROGRESS_MIN_INTERVAL = 0.25
+
+_DONE = object()
+
+
+def decode_workers(total_bytes: int) -> int:
+    """Decoder processes for a file of *total_bytes*: DECODE_WORKERS if set, else one per spare CPU for big files."""
+    value = os.environ.get(WORKERS_ENV, "").strip()
+    if value:
+        try:
+            return max(0, int(value))
+        except ValueError:
+            print(f"⚠️ Ignoring {WORKERS_ENV}={value!r}: not a number of processes")
+    cpus = os.cpu_count() or 1
+    if cpus <= 2 or total_bytes < PARALLEL_MIN_BYTES:
+        return 0
+    return min(cpus - 1, MAX_WORKERS)
+
+
+# ------------------ STAGE TIMING ------------------
+class StageClock:
+    """Time one pipeline stage spent working, and waiting for its input or for room downstream."""
+
+    def __init__(self, name: str, lanes: int = 1):
+        self.name = name
+        self.lanes = lanes      # parallel workers sharing the stage
+        self.busy = 0.0
+        self.starved = 0.0      # waiting for input
+        self.blocked = 0.0      # waiting for a full queue to drain (backpressure)
+
+
+class PipelineStats:
+    """The clocks of a pipeline's stages, reported in the order *names* gives."""
+
+    def __init__(self, names=("read", "decode", "build rows", "write")):
+        self.start = time.perf_counter()
+        self.stages: List[StageClock] = [StageClock(name) for name in names]
+
+    def stage(self, name: str, lanes: Optional[int] = None) -> StageClock:
+        clock = next((s for s in self.stages if s.name == name), None)
+        if clock is None:
+            clock = StageClock(name)
+            self.stages.append(clock)
+        if lanes is not None:
+            clock.lanes = lanes
+        return clock
+
+    def summary(self) -> str:
+        wall = max(time.perf_counter() - self.start, 1e-9)
+        parts = []
+        for s in self.stages:
+            if not (s.busy or s.starved or s.blocked):
+                continue
+            share = 100.0 * s.busy / (wall * s.lanes)
+            lanes = f" x{s.lanes}" if s.lanes > 1 else ""
+            waits = []
+            if s.starved >= 0.05:
+                waits.append(f"starved {s.starved:.1f} s")
+            if s.blocked >= 0.05:
+                waits.append(f"blocked {s.blocked:.1f} s")
+            parts.append(f"{s.name}{lanes} {share:.0f}% busy" + (f" ({', '.join(waits)})" if waits else ""))
+        busiest = max(self.stages, key=lambda s: s.busy / s.lanes, default=None)
+        if busiest is not None and not busiest.busy:
+            busiest = None
+        tail = f" — bottleneck: {busiest.name}" if busiest is not None else ""
+        return f"📊 Pipeline {wall:.1f} s: " + " | ".join(parts) + tail
+
+
+def _put(q: queue.Queue, item, clock: StageClock):
+    t = time.perf_counter()
+    q.put(item)
+    clock.blocked += time.perf_counter() - t
+
+
+def _get(q: queue.Queue, clock: StageClock):
+    t = time.perf_counter()
+    item = q.get()
+    clock.starved += time.perf_counter() - t
+    return item
+
+
+# ------------------ READER ------------------
+def _read_batches(path: str, out: queue.Queue, clock: StageClock, stop: threading.Event):
+    """Reader thread: put (bytes of whole lines, line count) batches on *out*, then _DONE (or the error)."""
+    try:
+        with open(path, "rb") as f:
+            try:
+                view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):   # empty file, or one that cannot be mapped
+                view = None
+            try:
+                pos = 0
+                tail = b""
+                while not stop.is_set():
+                    t = time.perf_counter()
+                    block = view[pos:pos + READ_BLOCK] if view is not None else f.read(READ_BLOCK)
+                    pos += len(block)
+                    if not block:
+                        break
+                    data = tail + block
+                    cut = data.rfind(b"\n") + 1
+                    batch, tail = data[:cut], data[cut:]
+                    clock.busy += time.perf_counter() - t
+                    if batch:
+                        _put(out, (batch, batch.count(b"\n")), clock)
+                if tail and not stop.is_set():
+                    _put(out, (tail, 1), clock)
+            finally:
+                if view is not None:
+                    view.close()
+        out.put(_DONE)
+    except BaseException as e:   # handed to the consumer, which raises it
+        out.put(e)
+
+
+def batch_lines(batch: bytes, encoding: str = "utf-8", errors: str = "ignore") -> List[str]:
+    """The text lines of one batch, without their line breaks."""
+    lines = batch.decode(encoding, errors).split("\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    return lines
+
+
+# ------------------ DECODER PROCESSES ------------------
+_worker_context = None
+
+
+def _init_worker(context):
+    global _worker_context
+    _worker_context = context
+
+
+def _decode_in_worker(decode, batch):
+    t = time.perf_counter()
+    records = decode(batch_lines(batch), _worker_context)
+    return records, time.perf_counter() - t
+
+
+def iter_decoded_batches(
+    path: str,
+    decode: Callable[[List[str], object], list],
+    context=None,
+    workers: Optional[int] = None,
+    desc: str = "",
+    listeners=None,
+    stats: Optional[PipelineStats] = None,
+) -> Iterator[list]:
+    """
+    Yield decode(lines, context) for every batch of lines of *path*, in file
+    order. With worker processes, *decode* must be a module-level function
+    and *context* picklable (it is sent to each worker once). Progress events
+    are those of progress.iter_file_lines(); the time the caller spends on a
+    batch is counted as the "build rows" stage.
+    """
+    from progress import ConsoleProgress, ProgressEvent
+
+    if listeners is None:
+        listeners = [ConsoleProgress()]
+    stats = stats if stats is not None else PipelineStats()
+    total = os.path.getsize(path)
+    workers = decode_workers(total) if workers is None else workers
+
+    read_clock = stats.stage("read")
+    decode_clock = stats.stage("decode", max(workers, 1))
+    build_clock = stats.stage("build rows")
+
+    batches: queue.Queue = queue.Queue(maxsize=QUEUE_DEPTH)
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=_read_batches, args=(path, batches, read_clock, stop), name="trc-reader", daemon=True,
+    )
+    reader.start()
+
+    pool = None
+    if workers > 0:
+        try:
+            # A call that cannot be pickled fails on the pool's feeder thread and
+            # leaves the pool unable to shut down, so check it before starting one
+            pickle.dumps((decode, context), protocol=pickle.HIGHEST_PROTOCOL)
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,))
+            print(f"⚡ Decoding with {workers} worker processes...")
+        except Exception as e:
+            print(f"⚠️ Parallel decoding unavailable ({e}); decoding in this process")
+            pool = None
+
+    start = time.perf_counter()
+    last_emit = start
+    done_bytes = 0
+    lines = 0
+
+    def emit(done):
+        ev = ProgressEvent(desc, done_bytes, total, lines, time.perf_counter() - start, done)
+        for listener in listeners:
+            try:
+                listener(ev)
+            except Exception:
+                pass
+
+    pending = deque()   # (batch, line count, future or None), in file order
+    eof = False
+    try:
+        while True:
+            window = workers * WINDOW_PER_WORKER if pool is not None else 1
+            while not eof and len(pending) < window:
+                item = _get(batches, decode_clock)
+                if item is _DONE:
+                    eof = True
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    batch, count = item
+                    future = None
+                    if pool is not None:
+                        try:
+                            future = pool.submit(_decode_in_worker, decode, batch)
+                        except Exception as e:   # the pool broke since the last batch
+                            print(f"⚠️ Decoder processes stopped ({e}); decoding the rest in this process")
+                            pool.shutdown(wait=True, cancel_futures=True)
+                            pool = None
+                            pending = deque((b, c, None) for b, c, _ in pending)
+                    pending.append((batch, count, future))
+            if not pending:
+                break
+
+            batch, count, future = pending.popleft()
+            records = None
+            if future is not None:
+                t = time.perf_counter()
+                try:
+                    records, busy = future.result()
+                    decode_clock.busy += busy
+                except Exception as e:
+                    print(f"⚠️ Decoder process failed ({e}); decoding the rest in this process")
+                    # wait=True: a broken pool left behind can hang interpreter exit
+                    pool.shutdown(wait=True, cancel_futures=True)
+                    pool = None
+                    pending = deque((b, c, None) for b, c, _ in pending)
+                build_clock.starved += time.perf_counter() - t
+            if records is None:
+                t = time.perf_counter()
+                records = decode(batch_lines(batch), context)
+                decode_clock.busy += time.perf_counter() - t
+
+            done_bytes += len(batch)
+            lines += count
+            now = time.perf_counter()
+            if now - last_emit >= PROGRESS_MIN_INTERVAL:
+                last_emit = now
+                emit(False)
+
+            t = time.perf_counter()
+            yield records
+            build_clock.busy += time.perf_counter() - t
+    finally:
+        stop.set()
+        while reader.is_alive():   # unblock a reader waiting on a full queue
+            try:
+                batches.get_nowait()
+            except queue.Empty:
+                reader.join(0.05)
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    emit(True)
+
+
+# ------------------ WRITER THREAD ------------------
+class SinkError(RuntimeError):
+    """A sample sink failed on the writer thread."""
+
+
+class SinkWriter:
+    """
+    Stands in for a list of sample sinks (objects with .add(timestamp,
+    can_id, decoded), see long_csv.py and signal_db.py): calls are collected
+    SINK_BATCH at a time and replayed, in order, on a writer thread. Handing
+    a batch over blocks while QUEUE_DEPTH batches are waiting. Once a sink
+    has failed, the next add() raises SinkError, so the producer stops
+    instead of decoding the rest of the file; close() drains the queue and
+    raises it too. abort() stops the writer without replaying what is left,
+    for a producer that failed itself.
+    """
+
+    def __init__(self, sinks, stats: Optional[PipelineStats] = None, depth: int = QUEUE_DEPTH):
+        stats = stats if stats is not None else PipelineStats()
+        self.sinks = list(sinks)
+        self.clock = stats.stage("write")
+        self._upstream = stats.stage("build rows")   # the stage held back when the queue is full
+        self._batch = []
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._error = None
+        self._aborted = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="sink-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, timestamp, can_id, decoded):
+        if self._error is not None:
+            self._raise_error()
+        self._batch.append((timestamp, can_id, decoded))
+        if len(self._batch) >= SINK_BATCH:
+            self.flush()
+
+    def flush(self):
+        if self._error is not None:
+            self._raise_error()
+        if self._batch:
+            _put(self._queue, self._batch, self._upstream)
+            self._batch = []
+
+    def _stop(self):
+        if not self._stopped:
+            self._stopped = True
+            self._queue.put(_DONE)   # batches after a failure are only drained, so this never waits long
+            self._thread.join()
+
+    def _raise_error(self):
+        self._stop()
+        error = self._error
+        raise SinkError(f"{type(error).__name__}: {error}") from error
+
+    def _run(self):
+        while True:
+            batch = _get(self._queue, self.clock)
+            if batch is _DONE:
+                return
+            if self._error is not None or self._aborted:
+                continue
+            t = time.perf_counter()
+            try:
+                for sink in self.sinks:
+                    add = sink.add
+                    for timestamp, can_id, decoded in batch:
+                        add(timestamp, can_id, decoded)
+            except BaseException as e:
+                self._error = e
+            self.clock.busy += time.perf_counter() - t
+
+    def close(self):
+        self.flush()
+        self._stop()
+        if self._error is not None:
+            self._raise_error()
+
+    def abort(self):
+        self._batch = []
+        self._aborted = True
+        self._stop()
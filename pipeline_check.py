@@ -0,0 +1,93 @@
+"""
+Regression checks for the writer thread of pipeline.py.
+
+Feeds synthetic samples through SinkWriter into the real sinks, in a
+temporary directory, and exits non-zero if a check fails:
+
+  * more than signal_db.BATCH_ROWS samples into a SignalDatabaseWriter, so
+    its batch flush runs on the writer thread and not only in close();
+  * a sink that fails early stops the producer at once (SinkError from
+    add()) instead of after the whole input.
+
+    python pipeline_check.py
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+
+from pipeline import SINK_BATCH, QUEUE_DEPTH, SinkError, SinkWriter
+from signal_db import BATCH_ROWS, SignalDatabaseWriter
+
+SIGNALS = ("PackVoltage", "PackCurrent", "SOC")
+
+
+def check_signal_db_flush_on_writer_thread(tmpdir):
+    path = os.path.join(tmpdir, "check_signals.db")
+    frames = BATCH_ROWS // len(SIGNALS) + SINK_BATCH   # well past one flush of pending samples
+    db = SignalDatabaseWriter(path, {"PackVoltage": "V", "PackCurrent": "A", "SOC": "%"}, source="synthetic")
+    writer = SinkWriter([db])
+    for i in range(frames):
+        writer.add(i * 0.001, 0x100, {"PackVoltage": 400.0 + i % 7, "PackCurrent": i % 50, "SOC": 80})
+    writer.close()
+    db.close()
+
+    expected = frames * len(SIGNALS)
+    with sqlite3.connect(path) as conn:
+        stored = conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+    if stored != expected:
+        return f"{stored:,} samples in the database, expected {expected:,}"
+    return None
+
+
+class FailingSink:
+    def __init__(self, fail_after):
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def add(self, timestamp, can_id, decoded):
+        self.calls += 1
+        if self.calls > self.fail_after:
+            raise OSError("disk full")
+
+
+def check_failing_sink_stops_producer():
+    total = SINK_BATCH * 200
+    writer = SinkWriter([FailingSink(fail_after=10)])
+    sent = 0
+    try:
+        for i in range(total):
+            writer.add(i * 0.001, 0x100, {"SOC": 80})
+            sent += 1
+        writer.close()
+    except SinkError:
+        # the producer may run ahead by the queued batches, never to the end of the input
+        limit = SINK_BATCH * (QUEUE_DEPTH + 3)
+        if sent > limit:
+            return f"the producer sent {sent:,} samples before stopping (limit {limit:,})"
+        return None
+    return "no SinkError although the sink failed"
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix="pipeline_check_") as tmpdir:
+        checks = [
+            ("signal database flushes on the writer thread", lambda: check_signal_db_flush_on_writer_thread(tmpdir)),
+            ("a failing sink stops the producer", check_failing_sink_stops_producer),
+        ]
+        for name, check in checks:
+            try:
+                problem = check()
+            except Exception as e:
+                problem = f"{type(e).__name__}: {e}"
+            if problem:
+                failures += 1
+                print(f"❌ {name}: {problem}")
+            else:
+                print(f"✅ {name}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+# How often the line loop looks at the clock, and how often listeners fire.
+PROGRESS_EVERY_LINES = 20_000
+PROGRESS_MIN_INTERVAL = 0.25
+
+
+class ProgressEvent(NamedTuple):
+    desc: str
+    bytes_done: int
+    total_bytes: int
+    lines: int
+    elapsed: float
+    done: bool
+
+    @property
+    def fraction(self) -> float:
+        if self.total_bytes <= 0:
+            return 1.0 if self.done else 0.0
+        return min(self.bytes_done / self.total_bytes, 1.0)
+
+    @property
+    def rate(self) -> float:
+        """Bytes per second since the start of the read."""
+        return self.bytes_done / self.elapsed if self.elapsed > 0 else 0.0
+
+
+ProgressListener = Callable[[ProgressEvent], None]
+
+
+# ------------------ LISTENERS ------------------
+class ConsoleProgress:
+    """Single-line progress display for the terminal (replaces tqdm)."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+
+    def __call__(self, ev: ProgressEvent):
+        mb_done = ev.bytes_done / 1_048_576
+        mb_total = ev.total_bytes / 1_048_576
+        rate = ev.rate / 1_048_576
+        if ev.rate > 0 and not ev.done:
+            eta = int((ev.total_bytes - ev.bytes_done) / ev.rate)
+            eta_str = f"ETA {eta // 60}:{eta % 60:02d}"
+        else:
+            eta_str = f"{ev.elapsed:.1f}s"
+        self.stream.write(
+            f"\r{ev.desc} {ev.fraction * 100:5.1f}% "
+            f"{mb_done:,.1f}/{mb_total:,.1f} MB  {ev.lines:,} lines  "
+            f"{rate:,.1f} MB/s  {eta_str}   "
+        )
+        if ev.done:
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+class ProgressLog:
+    """Keeps every event so a profiler or test can inspect throughput over time."""
+
+    def __init__(self):
+        self.events: List[ProgressEvent] = []
+
+    def __call__(self, ev: ProgressEvent):
+        self.events.append(ev)
+
+
+# ------------------ STREAMING READ ------------------
+def iter_file_lines(
+    path: str,
+    desc: str = "",
+    listeners: Optional[List[ProgressListener]] = None,
+    encoding: str = "utf-8",
+    errors: str = "ignore",
+    every_lines: int = PROGRESS_EVERY_LINES,
+    min_interval: float = PROGRESS_MIN_INTERVAL,
+) -> Iterator[str]:
+    """
+    Yield the decoded lines of *path* without reading the whole file first.
+
+    Progress is measured in bytes read against the file size, so no line
+    count is needed up front. The clock is only consulted every
+    *every_lines* lines and listeners fire at most every *min_interval*
+    seconds (plus once at the end), which keeps the per-line cost to a
+    counter increment.
+    """
+    if listeners is None:
+        listeners = [ConsoleProgress()]
+
+    total = os.path.getsize(path)
+    start = time.perf_counter()
+    last_emit = start
+    done_bytes = 0
+    lines = 0
+    next_check = every_lines
+
+    def emit(now, done):
+        ev = ProgressEvent(desc, done_bytes, total, lines, now - start, done)
+        for listener in listeners:
+            try:
+                listener(ev)
+            except Exception:
+                pass
+
+    with open(path, "rb") as f:
+        for raw in f:
+            done_bytes += len(raw)
+            lines += 1
+            if lines >= next_check:
+                next_check = lines + every_lines
+                now = time.perf_counter()
+                if now - last_emit >= min_interval:
+                    last_emit = now
+                    emit(now, False)
+            yield raw.decode(encoding, errors)
+
+    emit(time.perf_counter(), True)
+
+
+# ------------------ OVERHEAD BENCHMARK ------------------
+def _benchmark(path: str, repeats: int = 3):
+    """Compare a bare binary line loop with iter_file_lines on the same file."""
+
+    def bare():
+        n = 0
+        with open(path, "rb") as f:
+            for raw in f:
+                raw.decode("utf-8", "ignore")
+                n += 1
+        return n
+
+    def reported():
+        n = 0
+        for _ in iter_file_lines(path, "bench", listeners=[ProgressLog()]):
+            n += 1
+        return n
+
+    best = {}
+    for name, fn in (("bare", bare), ("progress", reported)):
+        times = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            n = fn()
+            times.append(time.perf_counter() - t0)
+        best[name] = min(times)
+        print(f"{name:9s} {n:,} lines in {best[name]:.3f}s")
+
+    per_line_ns = (best["progress"] - best["bare"]) / max(n, 1) * 1e9
+    print(f"overhead  {per_line_ns:.0f} ns/line (a decoded TRC line costs several µs)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python progress.py <log or trc file>")
+        sys.exit(1)
+    _benchmark(sys.argv[1])
@@ -1,105 +1,193 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import os
 import json
-import gspread
-from google.oauth2.service_account import Credentials
+import time
+import atexit
+import threading
+from server_storage import SQLiteClientStore, SheetsMirror
+from server_metrics import Registry, Counter, Histogram, Gauge, TimedProxy
 
 app = Flask(__name__)
 
 TIMEOUT = 60
 THIRTY_DAYS = 30 * 24 * 60 * 60
 
-# -------- Google Sheets setup --------
-SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
-
-creds = Credentials.from_service_account_info(
-    json.loads(os.environ["GOOGLE_CREDS"]),
-    scopes=SCOPES
-)
-
-client = gspread.authorize(creds)
-sheet = client.open_by_url(
-    "https://docs.google.com/spreadsheets/d/1nDkL93epR1RQfFvCrzAVeiu5a9TpaU2484sOaVkQAQw/edit#gid=974404348"
-).get_worksheet(5)
+# SQLite is the system of record; the Google Sheet (when GOOGLE_CREDS is set)
+# is an asynchronous mirror flushed every FLUSH_INTERVAL seconds.
+DB_PATH = os.environ.get("HEARTBEAT_DB") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "heartbeat.db")
+FLUSH_INTERVAL = int(os.environ.get("FLUSH_INTERVAL", 15))
+MAX_FLUSH_BACKOFF = 300
+
+# Stale clients are purged by a background janitor instead of inside /clients
+JANITOR_INTERVAL = int(os.environ.get("JANITOR_INTERVAL", 3600))
+# /clients is rendered at most once per second unless the data changes
+SNAPSHOT_TTL = 1.0
+
+# -------- Metrics --------
+metrics = Registry()
+REQUESTS = metrics.register(Counter(
+    "heartbeat_http_requests_total", "HTTP requests handled, by route, method and status.",
+    labels=("route", "method", "status"),
+))
+REQUEST_SECONDS = metrics.register(Histogram(
+    "heartbeat_http_request_duration_seconds", "HTTP request latency, by route.",
+    labels=("route",),
+))
+STORAGE_SECONDS = metrics.register(Histogram(
+    "heartbeat_storage_call_duration_seconds", "Time spent in storage calls, by backend and operation.",
+    labels=("backend", "op"),
+))
+
+# -------- Storage setup --------
+store = TimedProxy(SQLiteClientStore(DB_PATH), STORAGE_SECONDS, "sqlite")
+
+# The sheet is opened by the mirror's own threads; startup never waits on Google
+try:
+    mirror = SheetsMirror.from_env(
+        interval=FLUSH_INTERVAL, max_backoff=MAX_FLUSH_BACKOFF,
+        wrap_sheet=lambda sheet: TimedProxy(sheet, STORAGE_SECONDS, "sheets"),
+    )
+except Exception as e:
+    print(f"Google Sheets mirror disabled: {e}")
+    mirror = None
 
 # -------- Load existing data --------
+# clients is only read or written while holding state_lock; every change
+# bumps clients_version so the cached /clients response is rebuilt.
 clients = {}
+clients_version = 0
+state_lock = threading.Lock()
 
 def load_clients():
     global clients
-    clients = {}
     try:
-        rows = sheet.get_all_records()
-        for row in rows:
-            device = row["DEVISE NAME"]
-            clients[device] = {
-                "name": row["USER INFO"],
-                "login_time": datetime.fromisoformat(row["LOGIN"]),
-                "last_seen": datetime.fromisoformat(row["LOGOUT"]),
-            }
-    except:
+        clients = store.load_all()
+    except Exception as e:
+        print(f"Could not load clients from {DB_PATH}: {e}")
         clients = {}
 
+def _seed_from_sheet():
+    """First run on a fresh database: copy the sheet's rows into SQLite, retrying with the flush backoff."""
+    delay = FLUSH_INTERVAL
+    while True:
+        try:
+            seeded = mirror.load_all()
+            break
+        except Exception as e:
+            delay = min(delay * 2, MAX_FLUSH_BACKOFF)
+            print(f"Could not seed clients from the sheet ({e}); retrying in {delay}s")
+            time.sleep(delay)
+    global clients_version
+    with state_lock:
+        new = {device: v for device, v in seeded.items() if device not in clients}
+        clients.update(new)
+        clients_version += 1
+    store.upsert_many(new)
+
 load_clients()
 
-# -------- Save (update or append) --------
-def save_clients():
-    rows = sheet.get_all_records()
-    row_map = {row["DEVISE NAME"]: idx + 2 for idx, row in enumerate(rows)}
-
-    for device, v in clients.items():
-        row_data = [
-            device,
-            v["name"],
-            v["login_time"].isoformat(),
-            v["last_seen"].isoformat()
+# -------- Janitor --------
+def purge_stale_clients(now=None):
+    """Drop clients not seen for THIRTY_DAYS from memory and storage."""
+    global clients_version
+    now = now or datetime.now(ZoneInfo("Asia/Kolkata"))
+    with state_lock:
+        to_delete = [
+            device for device, data in clients.items()
+            if (now - data["last_seen"]).total_seconds() > THIRTY_DAYS
         ]
-
-        if device in row_map:
-            sheet.update(f"A{row_map[device]}:D{row_map[device]}", [row_data])
-        else:
-            sheet.append_row(row_data)
+        for device in to_delete:
+            del clients[device]
+        if to_delete:
+            clients_version += 1
+    if to_delete:
+        store.delete_many(to_delete)
+    return to_delete
+
+def _janitor(stop):
+    while True:
+        try:
+            purge_stale_clients()
+        except Exception as e:
+            print(f"Client purge failed: {e}")
+        if stop.wait(JANITOR_INTERVAL):
+            return
+
+_stop_janitor = threading.Event()
+threading.Thread(target=_janitor, args=(_stop_janitor,), name="janitor", daemon=True).start()
+atexit.register(_stop_janitor.set)
+
+if mirror is not None:
+    if not clients:
+        threading.Thread(target=_seed_from_sheet, name="sheet-seed", daemon=True).start()
+    mirror.start()
+    atexit.register(mirror.stop)
+atexit.register(store.close)
+
+# -------- Request instrumentation --------
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    started = g.pop("request_started", None)
+    # the rule pattern, not the raw path, so unknown URLs can't blow up label cardinality
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route)
+    REQUESTS.inc(route, request.method, str(response.status_code))
+    return response
+
+def _client_status_counts():
+    now = datetime.now(ZoneInfo("Asia/Kolkata"))
+    with state_lock:
+        last_seen = [data["last_seen"] for data in clients.values()]
+    online = sum(1 for ts in last_seen if (now - ts).total_seconds() <= TIMEOUT)
+    return {("online",): online, ("offline",): len(last_seen) - online}
+
+metrics.register(Gauge(
+    "heartbeat_clients", "Known clients by status (online = heartbeat within TIMEOUT seconds).",
+    _client_status_counts, labels=("status",),
+))
+metrics.register(Gauge(
+    "heartbeat_sheet_flush_backlog", "Client rows waiting to be flushed to the Google Sheet.",
+    lambda: {(): mirror.backlog if mirror is not None else 0},
+))
 
 # -------- Routes --------
 @app.route("/heartbeat", methods=["POST"])
 def heartbeat():
+    global clients_version
     data = request.json or {}
     device = data.get("device", "unknown")
     name = data.get("name", device)
 
     now = datetime.now(ZoneInfo("Asia/Kolkata"))
 
-    if device not in clients:
-        clients[device] = {
-            "name": name,
-            "login_time": now,
-            "last_seen": now
-        }
-    else:
-        clients[device]["last_seen"] = now
+    with state_lock:
+        clients_version += 1
+        if device not in clients:
+            clients[device] = {
+                "name": name,
+                "login_time": now,
+                "last_seen": now
+            }
+        else:
+            clients[device]["last_seen"] = now
+        record = dict(clients[device])
+
+    store.upsert(device, record)
+    if mirror is not None:
+        mirror.mark(device, record)
 
-    save_clients()
     return jsonify({"ok": True})
 
-@app.route("/clients", methods=["GET"])
-def get_clients():
-    now = datetime.now(ZoneInfo("Asia/Kolkata"))
+def _render_clients(snapshot, now):
     result = {}
-
-    to_delete = []
-    for device, data in clients.items():
-        if (now - data["last_seen"]).total_seconds() > THIRTY_DAYS:
-            to_delete.append(device)
-
-    for device in to_delete:
-        del clients[device]
-
-    if to_delete:
-        save_clients()
-
-    for device, data in clients.items():
+    for device, data in snapshot:
         last_seen = data["last_seen"]
         login_time = data["login_time"]
 
@@ -115,12 +203,37 @@ def get_clients():
             "name": data["name"],
             "status": status_text
         }
+    return result
 
-    return jsonify(result)
+_clients_cache = {"version": None, "built_at": 0.0, "body": None}
+_cache_lock = threading.Lock()
+
+@app.route("/clients", methods=["GET"])
+def get_clients():
+    with _cache_lock:
+        cached_at = time.monotonic()
+        if (
+            _clients_cache["version"] != clients_version
+            or cached_at - _clients_cache["built_at"] > SNAPSHOT_TTL
+        ):
+            with state_lock:
+                version = clients_version
+                snapshot = [(device, dict(data)) for device, data in clients.items()]
+            now = datetime.now(ZoneInfo("Asia/Kolkata"))
+            _clients_cache["body"] = json.dumps(_render_clients(snapshot, now))
+            _clients_cache["version"] = version
+            _clients_cache["built_at"] = cached_at
+        body = _clients_cache["body"]
+
+    return app.response_class(body, mimetype="application/json")
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/")
 def home():
     return "Server running"
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 10000)))
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 10000)), threaded=True)
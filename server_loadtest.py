@@ -0,0 +1,141 @@
+"""
+Local load generator for server.py.
+
+Starts the Flask app on a threaded WSGI server backed by a temporary SQLite
+database and an in-memory stand-in for the Google Sheet, hammers /heartbeat
+from many client threads and reports throughput and latency percentiles.
+
+    python server_loadtest.py --threads 32 --seconds 10 --devices 500
+"""
+import os
+import sys
+import time
+import json
+import logging
+import argparse
+import tempfile
+import threading
+import http.client
+
+
+class FakeSheet:
+    """Just enough of a gspread worksheet for SheetsMirror, with API-like latency."""
+
+    def __init__(self, latency=0.15):
+        self.latency = latency
+        self.rows = []
+        self.calls = {"get_all_records": 0, "batch_update": 0, "append_rows": 0}
+        self._lock = threading.Lock()
+
+    def get_all_records(self):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls["get_all_records"] += 1
+            return [dict(r) for r in self.rows]
+
+    def batch_update(self, data):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls["batch_update"] += 1
+
+    def append_rows(self, values):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls["append_rows"] += 1
+            first = len(self.rows) + 2
+            for device, name, login, logout in values:
+                self.rows.append({"DEVISE NAME": device, "USER INFO": name, "LOGIN": login, "LOGOUT": logout})
+            return {"updates": {"updatedRange": f"'Fake'!A{first}:D{first + len(values) - 1}"}}
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def _client(port, device_ids, deadline, latencies, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": "application/json"}
+    i = 0
+    local = []
+    while time.perf_counter() < deadline:
+        device = device_ids[i % len(device_ids)]
+        i += 1
+        body = json.dumps({"device": device, "name": f"user-{device}"})
+        t0 = time.perf_counter()
+        try:
+            conn.request("POST", "/heartbeat", body, headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+        except Exception as e:
+            errors.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            continue
+        local.append(time.perf_counter() - t0)
+    conn.close()
+    latencies.extend(local)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--devices", type=int, default=200)
+    ap.add_argument("--sheet-latency", type=float, default=0.15)
+    args = ap.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="hb-load-")
+    os.environ["HEARTBEAT_DB"] = os.path.join(tmpdir, "heartbeat.db")
+    os.environ.pop("GOOGLE_CREDS", None)
+    os.environ.setdefault("FLUSH_INTERVAL", "1")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    import server
+    from server_storage import SheetsMirror
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"  # keep-alive like a real proxy
+
+    sheet = FakeSheet(latency=args.sheet_latency)
+    server.mirror = SheetsMirror(sheet, interval=server.FLUSH_INTERVAL)
+    server.mirror.start()
+
+    httpd = make_server("127.0.0.1", 0, server.app, threaded=True, request_handler=WSGIRequestHandler)
+    port = httpd.server_port
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    devices = [f"PC-{n:05d}" for n in range(args.devices)]
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.seconds
+    workers = [
+        threading.Thread(target=_client, args=(port, devices[t::args.threads] or devices, deadline, latencies, errors))
+        for t in range(args.threads)
+    ]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    server.mirror.stop()
+    httpd.shutdown()
+
+    latencies.sort()
+    ms = lambda s: s * 1000
+    print(f"/heartbeat: {len(latencies):,} requests in {elapsed:.1f}s with {args.threads} threads")
+    print(f"  throughput  {len(latencies) / elapsed:,.0f} req/s")
+    print(f"  latency     p50 {ms(_percentile(latencies, 50)):.2f} ms | "
+          f"p99 {ms(_percentile(latencies, 99)):.2f} ms | max {ms(latencies[-1]) if latencies else 0:.2f} ms")
+    print(f"  errors      {len(errors)}")
+    print(f"  fake sheet  {sheet.calls} ({len(sheet.rows)} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import time
+import bisect
+import threading
+
+# Latency buckets in seconds (Prometheus style, upper bounds)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# -------- Metric types --------
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, v in items:
+            lines.append(f"{self.name}{_label_str(self.labels, values)} {_fmt(v)}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect plus two adds under a lock."""
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *label_values):
+        idx = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[idx] += 1
+            series[-1] += seconds
+
+    def time(self, *label_values):
+        return _Timer(self, label_values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_fmt(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_str(self.labels, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, values)} {_fmt(series[-1])}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, values)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose samples are computed by *collect* at scrape time."""
+
+    def __init__(self, name, help_text, collect, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.collect = collect   # () -> {label values tuple: value}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            samples = self.collect()
+        except Exception:
+            samples = {}
+        for values, v in sorted(samples.items()):
+            lines.append(f"{self.name}{_label_str(self.labels, values)} {_fmt(v)}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("hist", "labels", "start")
+
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+# -------- Registry --------
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class TimedProxy:
+    """
+    Wrap a storage object so every public method call is timed into *hist*
+    with labels (backend, method). Attribute reads pass straight through.
+    """
+
+    def __init__(self, target, hist, backend):
+        self._target = target
+        self._hist = hist
+        self._backend = backend
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        hist, backend = self._hist, self._backend
+
+        def timed(*args, **kwargs):
+            with hist.time(backend, name):
+                return attr(*args, **kwargs)
+
+        return timed
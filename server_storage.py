@@ -0,0 +1,271 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+
+SHEET_URL = "https://docs.google.com/spreadsheets/d/1nDkL93epR1RQfFvCrzAVeiu5a9TpaU2484sOaVkQAQw/edit#gid=974404348"
+SHEET_INDEX = 5
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+
+# -------- Storage interface --------
+class ClientStore:
+    """
+    System of record for client heartbeats.
+
+    A client record is {"name": str, "login_time": datetime, "last_seen": datetime}
+    keyed by device name.
+    """
+
+    def load_all(self):
+        raise NotImplementedError
+
+    def upsert(self, device, record):
+        self.upsert_many({device: record})
+
+    def upsert_many(self, records):
+        raise NotImplementedError
+
+    def delete_many(self, devices):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# -------- SQLite backend --------
+class SQLiteClientStore(ClientStore):
+    """Local SQLite store, indexed by device (primary key) and last_seen."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS clients ("
+            " device TEXT PRIMARY KEY,"
+            " name TEXT NOT NULL,"
+            " login_time TEXT NOT NULL,"
+            " last_seen TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_clients_last_seen ON clients(last_seen)")
+
+    def load_all(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT device, name, login_time, last_seen FROM clients").fetchall()
+        return {
+            device: {
+                "name": name,
+                "login_time": datetime.fromisoformat(login_time),
+                "last_seen": datetime.fromisoformat(last_seen),
+            }
+            for device, name, login_time, last_seen in rows
+        }
+
+    def upsert_many(self, records):
+        params = [
+            (device, v["name"], v["login_time"].isoformat(), v["last_seen"].isoformat())
+            for device, v in records.items()
+        ]
+        if not params:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # concurrent heartbeats may commit out of order; keep the newest last_seen
+                self._conn.executemany(
+                    "INSERT INTO clients (device, name, login_time, last_seen) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(device) DO UPDATE SET last_seen = "
+                    "MAX(clients.last_seen, excluded.last_seen)",
+                    params,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete_many(self, devices):
+        devices = list(devices)
+        if not devices:
+            return
+        with self._lock:
+            self._conn.executemany("DELETE FROM clients WHERE device = ?", [(d,) for d in devices])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# -------- Google Sheets mirror --------
+_APPENDED_RANGE_RE = re.compile(r"![A-Z]+(\d+)")
+
+
+def _row_data(device, v):
+    return [
+        device,
+        v["name"],
+        v["login_time"].isoformat(),
+        v["last_seen"].isoformat()
+    ]
+
+
+def _first_appended_row(resp):
+    try:
+        m = _APPENDED_RANGE_RE.search(resp["updates"]["updatedRange"])
+        return int(m.group(1)) if m else None
+    except Exception:
+        return None
+
+
+class SheetsMirror:
+    """
+    Optional, asynchronous copy of the client table in the Google Sheet.
+
+    mark() only records the latest row for a device. A background thread
+    writes pending rows every *interval* seconds: one batch_update for rows
+    the sheet already has and one append_rows for new devices, backing off
+    up to *max_backoff* on errors. Nothing on the request path waits on it.
+
+    The worksheet may be given as *sheet*, or opened on first use by
+    *open_sheet*; opening then happens on the flusher (or seed) thread, and
+    a failure is retried with the flush backoff.
+    """
+
+    def __init__(self, sheet=None, interval=15, max_backoff=300, open_sheet=None):
+        self.sheet = sheet
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.row_index = None   # device -> sheet row, loaded by the flusher
+        self._open_sheet = open_sheet
+        self._open_lock = threading.Lock()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, interval=15, max_backoff=300, wrap_sheet=None):
+        """
+        Build the mirror from GOOGLE_CREDS, or return None when it is not
+        configured. No request is made here: the sheet is opened on first use.
+        *wrap_sheet*, if given, is applied to the worksheet once it is open.
+        """
+        creds_json = os.environ.get("GOOGLE_CREDS")
+        if not creds_json:
+            return None
+        creds_info = json.loads(creds_json)
+
+        def open_sheet():
+            import gspread
+            from google.oauth2.service_account import Credentials
+
+            creds = Credentials.from_service_account_info(creds_info, scopes=SCOPES)
+            sheet = gspread.authorize(creds).open_by_url(SHEET_URL).get_worksheet(SHEET_INDEX)
+            return wrap_sheet(sheet) if wrap_sheet is not None else sheet
+
+        return cls(interval=interval, max_backoff=max_backoff, open_sheet=open_sheet)
+
+    def _worksheet(self):
+        if self.sheet is None:
+            with self._open_lock:
+                if self.sheet is None:
+                    self.sheet = self._open_sheet()
+        return self.sheet
+
+    @property
+    def backlog(self):
+        return len(self._pending)
+
+    def mark(self, device, record):
+        with self._lock:
+            prev = self._pending.get(device)
+            if prev is None or prev["last_seen"] <= record["last_seen"]:
+                self._pending[device] = dict(record)
+
+    def load_all(self):
+        """Read every client row from the sheet (used to seed an empty local store)."""
+        self.row_index, rows = self._read_rows()
+        clients = {}
+        for row in rows:
+            try:
+                clients[row["DEVISE NAME"]] = {
+                    "name": row["USER INFO"],
+                    "login_time": datetime.fromisoformat(row["LOGIN"]),
+                    "last_seen": datetime.fromisoformat(row["LOGOUT"]),
+                }
+            except Exception:
+                continue
+        return clients
+
+    def _read_rows(self):
+        rows = self._worksheet().get_all_records()
+        return {row["DEVISE NAME"]: idx + 2 for idx, row in enumerate(rows)}, rows
+
+    def flush(self):
+        """Write the pending rows; on failure they are queued again. Returns rows written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            if self.row_index is None:
+                self.row_index, _ = self._read_rows()
+
+            updates = [
+                {"range": f"A{self.row_index[device]}:D{self.row_index[device]}", "values": [_row_data(device, v)]}
+                for device, v in pending.items()
+                if device in self.row_index
+            ]
+            new_rows = [(device, v) for device, v in pending.items() if device not in self.row_index]
+
+            sheet = self._worksheet()
+            if updates:
+                sheet.batch_update(updates)
+            if new_rows:
+                resp = sheet.append_rows([_row_data(device, v) for device, v in new_rows])
+                first = _first_appended_row(resp)
+                if first is None:
+                    self.row_index = None
+                else:
+                    for offset, (device, _) in enumerate(new_rows):
+                        self.row_index[device] = first + offset
+        except Exception:
+            with self._lock:
+                # newer heartbeats that arrived meanwhile win
+                for device, v in pending.items():
+                    self._pending.setdefault(device, v)
+            raise
+
+        return len(pending)
+
+    def _run(self):
+        delay = self.interval
+        while not self._stop.wait(delay):
+            try:
+                self.flush()
+                delay = self.interval
+            except Exception as e:
+                delay = min(delay * 2, self.max_backoff)
+                print(f"Sheet flush failed ({e}); retrying in {delay}s")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sheet-mirror", daemon=True)
+            self._thread.start()
+
+    def stop(self, retries=3):
+        """Stop the flusher and push whatever is still pending."""
+        self._stop.set()
+        for _ in range(retries):
+            try:
+                self.flush()
+                return
+            except Exception as e:
+                print(f"Final sheet flush failed: {e}")
+                time.sleep(1)
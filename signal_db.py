@@ -0,0 +1,309 @@
+"""
+SQLite export of decoded signals, and queries against it.
+
+With SIGNAL_DB=1 set, the converters write <input>_signals.db next to every
+decoded file: one row per decoded sample (time, signal, value) in a long
+table indexed by (signal, time). A few signals over a short window can then
+be read back in milliseconds instead of decoding the log again:
+
+    python signal_db.py list  run_signals.db
+    python signal_db.py query run_signals.db -s PackVoltage,PackCurrent --start 120 --end 180 --resample 100
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+EXPORT_ENV = "SIGNAL_DB"
+BATCH_ROWS = 250_000
+
+_SCHEMA = (
+    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE signals ("
+    " id INTEGER PRIMARY KEY,"
+    " name TEXT UNIQUE NOT NULL,"
+    " unit TEXT,"
+    " can_id INTEGER,"
+    " samples INTEGER,"
+    " first_t REAL,"
+    " last_t REAL)",
+    # value has no declared type so integers stay integers; label holds choice names and text values
+    "CREATE TABLE samples (t REAL NOT NULL, signal_id INTEGER NOT NULL, value, label TEXT)",
+)
+_INDEX = "CREATE INDEX idx_samples_signal_t ON samples(signal_id, t)"
+
+
+def export_enabled() -> bool:
+    return os.environ.get(EXPORT_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def database_path(source_path: str) -> str:
+    return os.path.splitext(source_path)[0] + "_signals.db"
+
+
+def _split_value(val):
+    """Decoded value -> (number or None, label or None)."""
+    if isinstance(val, (int, float)):
+        return val, None
+    number = getattr(val, "value", None)   # cantools NamedSignalValue
+    if isinstance(number, (int, float)):
+        return number, str(getattr(val, "name", val))
+    return None, str(val)
+
+
+# ------------------ EXPORT ------------------
+class SignalDatabaseWriter:
+    """
+    Bulk loader for one decoded file.
+
+    Samples are buffered and inserted with executemany in transactions of
+    BATCH_ROWS rows. The database is a fresh file, so it is loaded without a
+    journal or fsyncs, and the (signal, time) index is built once at close().
+    """
+
+    def __init__(self, path: str, units: Optional[Dict[str, str]] = None, source: str = "",
+                 time_origin: str = ""):
+        self.path = path
+        self.units = units or {}
+        self.rows = 0
+        if os.path.exists(path):
+            os.remove(path)
+        # add() may run on pipeline.py's writer thread; only one thread uses the connection at a time
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._meta = {"source": source, "time_origin": time_origin}
+        self._ids: Dict[str, int] = {}
+        self._can_ids: Dict[str, Optional[int]] = {}
+        self._pending: List[tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
+
+    def _signal_id(self, name, can_id):
+        sid = self._ids[name] = len(self._ids) + 1
+        self._can_ids[name] = can_id
+        return sid
+
+    def add(self, timestamp: float, can_id: Optional[int], decoded: dict):
+        """Record every signal of one decoded message."""
+        ids = self._ids
+        pending = self._pending
+        for sig, val in decoded.items():
+            sid = ids.get(sig) or self._signal_id(sig, can_id)
+            if type(val) is float or type(val) is int:
+                pending.append((timestamp, sid, val, None))
+            else:
+                pending.append((timestamp, sid, *_split_value(val)))
+        if len(pending) >= BATCH_ROWS:
+            self._flush()
+
+    def add_series(self, name: str, times, values, can_id: Optional[int] = None):
+        """Record one signal's samples at once (parallel sequences of times and values)."""
+        sid = self._ids.get(name) or self._signal_id(name, can_id)
+        self._pending.extend(
+            (t, sid, val, None) if type(val) is float or type(val) is int else (t, sid, *_split_value(val))
+            for t, val in zip(times, values)
+        )
+        if len(self._pending) >= BATCH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        self._conn.execute("BEGIN")
+        self._conn.executemany("INSERT INTO samples (t, signal_id, value, label) VALUES (?, ?, ?, ?)", self._pending)
+        self._conn.execute("COMMIT")
+        self.rows += len(self._pending)
+        self._pending = []
+
+    def close(self) -> str:
+        self._flush()
+        conn = self._conn
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO signals (id, name, unit, can_id) VALUES (?, ?, ?, ?)",
+            [(sid, name, self.units.get(name, ""), self._can_ids[name]) for name, sid in self._ids.items()],
+        )
+        conn.execute(_INDEX)
+        conn.execute(
+            "UPDATE signals SET (samples, first_t, last_t) = "
+            "(SELECT COUNT(*), MIN(t), MAX(t) FROM samples WHERE signal_id = signals.id)"
+        )
+        self._meta["rows"] = str(self.rows)
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", list(self._meta.items()))
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+        conn.close()
+        print(f"🗄️ Saved signal database: {self.path} ({self.rows:,} samples, {len(self._ids)} signals)")
+        return self.path
+
+    def discard(self):
+        """Close without the index or meta and delete the partial database (after a failed decode)."""
+        self._pending = []
+        self._conn.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# ------------------ QUERIES ------------------
+class SignalDatabase:
+    """Read-only access to a database written by SignalDatabaseWriter. Times are seconds."""
+
+    def __init__(self, path: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        self._ids = {name: sid for sid, name in self._conn.execute("SELECT id, name FROM signals")}
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def meta(self) -> Dict[str, str]:
+        return dict(self._conn.execute("SELECT key, value FROM meta"))
+
+    def signals(self) -> List[dict]:
+        cols = ("name", "unit", "can_id", "samples", "first_t", "last_t")
+        rows = self._conn.execute(f"SELECT {', '.join(cols)} FROM signals ORDER BY name")
+        return [dict(zip(cols, row)) for row in rows]
+
+    def _signal_id(self, name):
+        try:
+            return self._ids[name]
+        except KeyError:
+            close = [n for n in self._ids if name.lower() in n.lower()][:10]
+            hint = f" Did you mean: {', '.join(close)}?" if close else ""
+            raise KeyError(f"Signal {name!r} is not in {os.path.basename(self.path)}.{hint}") from None
+
+    def series(self, name: str, start: Optional[float] = None, end: Optional[float] = None,
+               with_previous: bool = True):
+        """
+        (times, values) of one signal between *start* and *end* (inclusive).
+        With *with_previous*, the last sample before *start* is included too,
+        so the value at *start* is known.
+        """
+        sid = self._signal_id(name)
+        lo = -float("inf") if start is None else start
+        hi = float("inf") if end is None else end
+        rows = self._conn.execute(
+            "SELECT t, value, label FROM samples WHERE signal_id = ? AND t BETWEEN ? AND ? ORDER BY t",
+            (sid, lo, hi),
+        ).fetchall()
+        if with_previous and start is not None:
+            prev = self._conn.execute(
+                "SELECT t, value, label FROM samples WHERE signal_id = ? AND t < ? ORDER BY t DESC LIMIT 1",
+                (sid, start),
+            ).fetchone()
+            if prev is not None:
+                rows.insert(0, prev)
+        return [r[0] for r in rows], [r[1] if r[2] is None else r[2] for r in rows]
+
+    def query(self, names, start: Optional[float] = None, end: Optional[float] = None,
+              resample_ms: Optional[float] = None) -> "pd.DataFrame":
+        """
+        Wide table of *names* between *start* and *end*, forward-filled like
+        the CSV export: one row per sample time, or one row every
+        *resample_ms* milliseconds holding each signal's latest value.
+        """
+        import numpy as np
+        import pandas as pd
+
+        series = {}
+        for name in names:
+            times, values = self.series(name, start, end)
+            s = pd.Series(values, index=pd.Index(times, dtype="float64"), dtype=object)
+            series[name] = s[~s.index.duplicated(keep="last")]
+
+        if not resample_ms:
+            df = pd.concat(series, axis=1).sort_index().ffill()
+            if start is not None:
+                df = df[df.index >= start]
+        else:
+            first = [s.index[0] for s in series.values() if len(s)]
+            last = [s.index[-1] for s in series.values() if len(s)]
+            lo = start if start is not None else min(first, default=0.0)
+            hi = end if end is not None else max(last, default=lo)
+            step = resample_ms / 1000
+            grid = lo + step * np.arange(int(np.floor((hi - lo) / step + 1e-9)) + 1)
+            df = pd.DataFrame(index=pd.Index(grid, dtype="float64"))
+            for name, s in series.items():
+                pos = np.searchsorted(s.index.to_numpy(), grid, side="right") - 1
+                col = np.full(len(grid), np.nan, dtype=object)
+                col[pos >= 0] = s.to_numpy()[pos[pos >= 0]]
+                df[name] = col
+        df.index.name = "Time (s)"
+        return df.reset_index()
+
+
+# ------------------ CLI ------------------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p_list = sub.add_parser("list", help="list the signals in a database")
+    p_list.add_argument("db")
+
+    p_query = sub.add_parser("query", help="print or save signals over a time window")
+    p_query.add_argument("db")
+    p_query.add_argument("-s", "--signals", required=True, help="comma-separated signal names")
+    p_query.add_argument("--start", type=float, help="seconds")
+    p_query.add_argument("--end", type=float, help="seconds")
+    p_query.add_argument("--resample", type=float, metavar="MS", help="one row every MS milliseconds")
+    p_query.add_argument("--csv", help="write the result to this CSV instead of printing it")
+    args = ap.parse_args(argv)
+
+    with SignalDatabase(args.db) as db:
+        if args.command == "list":
+            meta = db.meta()
+            print(f"{args.db}: {int(meta.get('rows', 0)):,} samples from {meta.get('source', '?')}")
+            if meta.get("time_origin"):
+                print(f"t = 0 s at {meta['time_origin']}")
+            for s in db.signals():
+                unit = f" [{s['unit']}]" if s["unit"] else ""
+                print(f"  {s['name']}{unit}: {s['samples']:,} samples, {s['first_t']:.3f}–{s['last_t']:.3f} s")
+            return 0
+
+        import pandas  # noqa: F401  (loaded first so the timing below is the query alone)
+
+        names = [n.strip() for n in args.signals.split(",") if n.strip()]
+        t0 = time.perf_counter()
+        try:
+            df = db.query(names, args.start, args.end, args.resample)
+        except KeyError as e:
+            print(f"❌ {e.args[0]}")
+            return 1
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+
+    if args.csv:
+        df.to_csv(args.csv, index=False)
+        print(f"✅ Saved {len(df):,} rows to {args.csv} ({elapsed_ms:.1f} ms query)")
+    else:
+        print(df.to_string(index=False))
+        print(f"\n{len(df):,} rows in {elapsed_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Memory budget for large conversions, and spilling decoded rows to disk.
+
+With MEMORY_BUDGET_MB set (e.g. MEMORY_BUDGET_MB=2048), the decoded table
+no longer has to fit in RAM: once the buffered TRC rows would take more than
+a quarter of the budget they are written to a temporary file as one
+columnar chunk, and the derive, resample and write stages then run chunk by
+chunk. merge_csv.py streams its inputs the same way when they would not fit.
+Without the setting everything is kept in memory, as before.
+"""
+import os
+import sys
+import shutil
+import tempfile
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Set
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MEMORY_BUDGET_ENV = "MEMORY_BUDGET_MB"
+
+# Buffered rows may use this share of the budget; the chunk being derived,
+# resampled and formatted uses the rest
+SPILL_SHARE = 0.25
+CHECK_EVERY_ROWS = 5_000
+# Rough in-memory size of one formatted CSV cell (string object + pointer)
+CELL_BYTES = 64
+
+
+def memory_budget() -> Optional[int]:
+    """The MEMORY_BUDGET_MB setting in bytes, or None when unset or invalid."""
+    value = os.environ.get(MEMORY_BUDGET_ENV, "").strip()
+    if not value:
+        return None
+    try:
+        budget = int(float(value) * 1024 * 1024)
+    except ValueError:
+        print(f"⚠️ Ignoring {MEMORY_BUDGET_ENV}={value!r}: not a number of megabytes")
+        return None
+    return budget if budget > 0 else None
+
+
+def rows_within(budget: int, columns: int, share: float = SPILL_SHARE) -> int:
+    """How many rows of *columns* formatted cells fit in *share* of *budget*."""
+    return max(1_000, int(budget * share) // (max(columns, 1) * CELL_BYTES))
+
+
+# ------------------ SPILLING ROWS ------------------
+class SpillingRows:
+    """
+    List-like store for the decoded row dicts of one file.
+
+    Rows are appended in memory. Every CHECK_EVERY_ROWS rows the buffer's
+    size is estimated from one row; past SPILL_SHARE of the budget the
+    buffer becomes a DataFrame chunk, is pickled to a temporary directory
+    and freed. iter_frames() reads the chunks back one at a time. If nothing
+    was spilled the rows are used exactly as a plain list would be.
+    """
+
+    def __init__(self, budget: int, check_every: int = CHECK_EVERY_ROWS):
+        self.budget = budget
+        self.check_every = check_every
+        self.rows: List[dict] = []
+        self.spilled_rows = 0
+        self._chunks: List[str] = []
+        self._dir = None
+        self._row_bytes = None
+        self._object_columns: Set[str] = set()
+
+    def __len__(self):
+        return self.spilled_rows + len(self.rows)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    @property
+    def spilled(self) -> bool:
+        return bool(self._chunks)
+
+    @property
+    def float_columns(self) -> Set[str]:
+        """
+        Columns that were not purely numeric in some chunk ("NA", text). Taken
+        as a whole these convert to float, so derived values computed chunk by
+        chunk have to treat them as float too (see DerivedSignals.apply).
+        """
+        return set(self._object_columns)
+
+    def append(self, row: dict):
+        self.rows.append(row)
+        if len(self.rows) % self.check_every == 0:
+            if self._row_bytes is None:
+                # a row is a dict of mostly shared value objects; count the dict and one new object per cell
+                self._row_bytes = sys.getsizeof(row) + 8 * len(row)
+            if len(self.rows) * self._row_bytes > self.budget * SPILL_SHARE:
+                self._spill()
+
+    def _spill(self):
+        import pandas as pd
+
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="trc_spill_")
+            print(f"💽 Decoded rows exceed the memory budget; spilling chunks to {self._dir}")
+        df = pd.DataFrame(self.rows)
+        self._object_columns.update(c for c in df.columns if df[c].dtype == object)
+        path = os.path.join(self._dir, f"chunk_{len(self._chunks):05d}.pkl")
+        df.to_pickle(path)
+        self._chunks.append(path)
+        self.spilled_rows += len(self.rows)
+        self.rows = []
+
+    def iter_frames(self, columns) -> Iterator["pd.DataFrame"]:
+        """The rows as DataFrame chunks with *columns*, spilled chunks first."""
+        import pandas as pd
+
+        for path in self._chunks:
+            yield pd.read_pickle(path).reindex(columns=columns)
+        if self.rows:
+            df = pd.DataFrame(self.rows)
+            self._object_columns.update(c for c in df.columns if df[c].dtype == object)
+            yield df.reindex(columns=columns)
+
+    def close(self):
+        self.rows = []
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+        self._chunks = []
+
+
+def new_row_store(budget: Optional[int] = None):
+    """A SpillingRows under the memory budget, or a plain list when there is none."""
+    budget = memory_budget() if budget is None else budget
+    return SpillingRows(budget) if budget else []
+
+
+# ------------------ CHUNKED RESAMPLE ------------------
+def resample_frames(frames: Iterable["pd.DataFrame"], interval_sec: float, time_column: str = "Time (s)",
+                    limit: int = 2) -> Iterator["pd.DataFrame"]:
+    """
+    Chunk-by-chunk equivalent of resampling the concatenated *frames* with
+    df.resample(interval).ffill(limit) on their time column, as the TRC
+    export does: one row every *interval_sec* from the first timestamp to the
+    last, holding the latest row at or before it, or empty once that row has
+    already been used for *limit* steps. Duplicate timestamps keep the first
+    row. The last row of each chunk is carried into the next one, so only one
+    chunk is held at a time. Frames must be sorted by time.
+    """
+    import numpy as np
+    import pandas as pd
+
+    step = int(interval_sec * 1000) * 1_000_000   # ns, as in f"{int(interval_sec*1000)}ms"
+    carry = None
+    carry_ns = None
+    next_label = None
+
+    for frame in frames:
+        if not len(frame):
+            continue
+        frame = frame.astype(object)
+        ns = pd.to_timedelta(frame[time_column].astype(float), unit="s").to_numpy().astype(np.int64)
+        first = ~pd.Index(ns).duplicated(keep="first")
+        if carry_ns is not None:
+            first &= ns != carry_ns
+        frame, ns = frame[first], ns[first]
+        if not len(frame):
+            continue
+
+        if carry is not None:
+            frame = pd.concat([carry, frame], ignore_index=True)
+            ns = np.concatenate(([carry_ns], ns))
+        if next_label is None:
+            next_label = ns[0]
+
+        # labels up to this chunk's last row; later labels may take rows of the next chunk
+        labels = np.arange(next_label, ns[-1] + 1, step, dtype=np.int64)
+        if len(labels):
+            pos = np.searchsorted(ns, labels, side="right") - 1
+            exact = ns[pos] == labels
+            # an exact match does not count towards the fill limit of its row
+            group_start = np.flatnonzero(np.concatenate(([True], pos[1:] != pos[:-1])))
+            starts = np.repeat(group_start, np.diff(np.append(group_start, len(pos))))
+            rank = np.arange(len(pos)) - starts - exact[starts]
+            valid = exact | (rank < limit)
+
+            out = frame.iloc[pos].reset_index(drop=True)
+            if not valid.all():
+                out.loc[~valid, :] = np.nan
+            out[time_column] = pd.Series(pd.to_timedelta(labels, unit="ns")).dt.total_seconds()
+            yield out
+            next_label = labels[-1] + step
+
+        carry = frame.iloc[-1:]
+        carry_ns = ns[-1]
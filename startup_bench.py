@@ -0,0 +1,90 @@
+"""
+Startup budget check for trc to csv.py.
+
+Runs the script's module-level code (without the __main__ network steps) in
+a fresh interpreter under ``-X importtime``, opens the choice menu and
+reports how long it took from process start until the menu was drawn, plus
+the slowest top-level imports.
+
+    python startup_bench.py            # single run
+    python startup_bench.py 5          # best of 5
+"""
+import os
+import re
+import sys
+import time
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(BASE_DIR, "trc to csv.py")
+
+# Time from launch to the choice menu being on screen
+BUDGET_MS = 300
+
+_PROBE = r"""
+import runpy, sys, time
+import tkinter as tk
+sys.path.insert(0, {base!r})
+mod = runpy.run_path({script!r}, run_name="startup_probe")
+root = tk.Tk()
+root.withdraw()
+
+def probe():
+    for w in root.winfo_children():
+        if isinstance(w, tk.Toplevel):
+            w.update_idletasks()
+            print("FIRST_WINDOW_AT", time.time(), flush=True)
+            w.destroy()
+            return
+    root.after(1, probe)
+
+root.after(1, probe)
+mod["show_choice_menu"](root)
+root.destroy()
+"""
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def run_once():
+    code = _PROBE.format(base=BASE_DIR, script=MAIN_SCRIPT)
+    t0 = time.time()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    first_window = None
+    for line in proc.stdout.splitlines():
+        if line.startswith("FIRST_WINDOW_AT"):
+            first_window = (float(line.split()[1]) - t0) * 1000
+
+    top_level = []
+    for line in proc.stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m and len(m.group(3)) == 1:
+            top_level.append((int(m.group(2)) / 1000, m.group(4)))
+
+    if first_window is None:
+        tail = "\n".join(proc.stderr.splitlines()[-5:])
+        raise RuntimeError(f"Choice menu was never drawn (exit {proc.returncode}):\n{tail}")
+    return first_window, top_level
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    runs = [run_once() for _ in range(repeats)]
+    best_ms, imports = min(runs, key=lambda r: r[0])
+
+    print("Slowest top-level imports (cumulative):")
+    for ms, name in sorted(imports, reverse=True)[:10]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    status = "✅ within" if best_ms <= BUDGET_MS else "❌ over"
+    print(f"\nTime to choice menu: {best_ms:.0f} ms ({status} {BUDGET_MS} ms budget)")
+    return 0 if best_ms <= BUDGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
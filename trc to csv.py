@@ -1,25 +1,31 @@
 import os
 import re
-import math
+import importlib
+import importlib.util
+import socket
 import subprocess
 import sys
-from collections import defaultdict
 import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # ------------------ AUTO PACKAGE INSTALL ------------------
 def ensure_package(pkg_name, import_name=None):
+    # find_spec only locates the package; the import itself happens where it is used
     import_name = import_name or pkg_name
-    try:
-        __import__(import_name)
-    except ImportError:
+    if importlib.util.find_spec(import_name) is None:
         print(f"⚡ Installing {pkg_name}...")
         subprocess.check_call([sys.executable, "-m", "pip", "install", pkg_name])
+        importlib.invalidate_caches()
 
-for pkg, imp in [("pandas", None), ("cantools", None), ("tqdm", None), ("requests", None)]:
+for pkg, imp in [("pandas", None), ("cantools", None), ("requests", None)]:
     ensure_package(pkg, imp)
 
 # ------------------ IMPORTS ------------------
-import pandas as pd
+# pandas, requests and merge_csv are imported lazily where they are used so the
+# choice menu appears without paying for them (see startup_bench.py).
 _TRC_LINE_RE_OLD = re.compile(
     r'^\s*\d+\)?\s+'
     r'([\d.]+)\s+'
@@ -74,13 +80,10 @@ def _parse_trc_line(line: str):
 
     return None
 
-import cantools
-from tqdm import tqdm
-import requests
 SERVER_URL = "https://trc-to-csv.onrender.com/heartbeat"
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
-from merge_csv import merge_csv_files
+from concurrent.futures import Future
 
 # ------------------ PATHS & URLS ------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -92,11 +95,28 @@ REMOTE_VERSION_URL = "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CS
 URLS = {
     "trc to csv.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/trc%20to%20csv.py",
     "merge_csv.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/merge_csv.py",
+    "busmaster_to_csv.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/busmaster_to_csv.py",
     "updater.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/updater.py",
     "version.txt": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/version.txt",
-    "can_error_reference.txt": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/can_error_reference.txt"
+    "can_error_reference.txt": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/can_error_reference.txt",
+    "progress.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/progress.py",
+    "dbc_cache.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/dbc_cache.py",
+    "dbc_compiled.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/dbc_compiled.py",
+    "can_errors.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/can_errors.py",
+    "bus_stats.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/bus_stats.py",
+    "derived_signals.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/derived_signals.py",
+    "csv_writer.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/csv_writer.py",
+    "signal_db.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/signal_db.py",
+    "long_csv.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/long_csv.py",
+    "delta_rows.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/delta_rows.py",
+    "spill.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/spill.py",
+    "pipeline.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/pipeline.py",
 }
 
+# Modules the app imports; if one is missing startup waits for its download.
+# Everything else in URLS is fetched in the background.
+REQUIRED_FILES = ("merge_csv.py", "busmaster_to_csv.py", "progress.py", "dbc_cache.py", "dbc_compiled.py", "can_errors.py", "bus_stats.py", "derived_signals.py", "csv_writer.py", "signal_db.py", "long_csv.py", "delta_rows.py", "spill.py", "pipeline.py")
+
 # ------------------ DBC SOURCES ------------------
 DBC_URLS = {
     "CIP BMS-24X": "https://raw.githubusercontent.com/itssatishkumar/CAN-SCRIPT-LOGGER/main/CIP%20BMS-24X.dbc",
@@ -106,79 +126,19 @@ DBC_URLS = {
     "Marvel 3W (all variants)": "https://raw.githubusercontent.com/itssatishkumar/CAN-SCRIPT-LOGGER/main/Marvel_3W_all_variant.dbc",
     "Athena 4 / 5": "https://raw.githubusercontent.com/itssatishkumar/CAN-SCRIPT-LOGGER/main/Athena%204%265.dbc",
 }
+RUNNER_LIST_URL = "https://raw.githubusercontent.com/itssatishkumar/Runner/main/PC_List"
+# Marvel DBC for PCs that are not in the runner list
+MARVEL_DEFAULT_DBC_URL = "https://raw.githubusercontent.com/itssatishkumar/Runner/main/00.0A.12_dbc_File.dbc"
 
 
-def _looks_like_html(text: str) -> bool:
-    head = (text or "").lstrip()[:200].lower()
-    return head.startswith("<!doctype html") or head.startswith("<html") or "<head" in head
-
-def _unwrap_semicolon_terminated_statements(text: str) -> str:
-
-    if not text:
-        return text
-
-    text = text.replace("\r\n", "\n").replace("\r", "\n")
-    lines = text.split("\n")
-
-    starters = {
-        "VAL_",
-        "CM_",
-        "BA_",
-        "BA_DEF_",
-        "BA_DEF_DEF_",
-        "VAL_TABLE_",
-        "SIG_VALTYPE_",
-    }
-
-    out: list[str] = []
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        stripped = line.lstrip()
-        keyword = stripped.split(None, 1)[0] if stripped else ""
-
-        if keyword in starters:
-            buf = line.rstrip()
-            while i + 1 < len(lines):
-                if buf.strip().endswith(";") and (buf.count('"') % 2 == 0):
-                    break
-
-                i += 1
-                cont = lines[i].strip()
-                buf = f"{buf} {cont}" if cont else f"{buf} "
-
-            out.append(buf)
-        else:
-            out.append(line)
-
-        i += 1
-
-    return "\n".join(out)
-
-def fetch_and_load_dbc_from_url(dbc_url: str):
-    resp = requests.get(dbc_url, timeout=15)
-    resp.raise_for_status()
-    if not resp.encoding:
-        try:
-            resp.encoding = resp.apparent_encoding
-        except Exception:
-            pass
-
-    text = (resp.text or "").lstrip("\ufeff")
-    if _looks_like_html(text):
-        raise ValueError("Downloaded HTML instead of a DBC. The GitHub URL likely isn't a raw .dbc file.")
-
-    text = _unwrap_semicolon_terminated_statements(text)
-    return cantools.database.load_string(text, strict=False)
-
 def is_host_in_runner_list():
+    """True if this PC's hostname starts with an entry of the runner PC list; blank lines match nothing."""
+    from dbc_cache import fetch_text_cached
+
     try:
-        hostname = subprocess.check_output("hostname", shell=True).decode().strip()
-        url = "https://raw.githubusercontent.com/itssatishkumar/Runner/main/PC_List"
-        r = requests.get(url, timeout=10)
-        if r.status_code != 200:
-            return False
-        return any(hostname.startswith(pc.strip()) for pc in r.text.splitlines())
+        hostname = socket.gethostname()
+        text = fetch_text_cached(RUNNER_LIST_URL, timeout=10)
+        return any(hostname.startswith(pc.strip()) for pc in text.splitlines() if pc.strip())
     except Exception:
         return False
 
@@ -282,12 +242,17 @@ def select_dbc_file(root):
 def select_dbc_dialog(root):
     return select_dbc_file(root)
 # ------------------ HELPER FUNCTIONS ------------------
-def download_file(url, local):
+def download_file(url, local, session=None, timeout=10):
     try:
-        r = requests.get(url, timeout=10)
+        if session is None:
+            import requests as session
+        r = session.get(url, timeout=timeout)
         if r.status_code == 200:
-            with open(local, "wb") as f:
+            # temp file + rename so a reader never sees a half-written file
+            tmp = f"{local}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
                 f.write(r.content)
+            os.replace(tmp, local)
             print(f"✅ Downloaded {local}")
             return True
         else:
@@ -302,9 +267,11 @@ def get_local_version():
     with open(LOCAL_VERSION_FILE, "r") as f:
         return f.read().strip()
 
-def get_remote_version():
+def get_remote_version(session=None, timeout=5):
     try:
-        r = requests.get(REMOTE_VERSION_URL, timeout=5)
+        if session is None:
+            import requests as session
+        r = session.get(REMOTE_VERSION_URL, timeout=timeout)
         if r.status_code == 200:
             return r.text.strip()
     except Exception:
@@ -318,34 +285,113 @@ def version_newer(remote, local):
     except Exception:
         return False
 
-def check_for_update():
+def check_for_update(session=None):
+    """Return the remote version if it is newer than the local one, else None."""
     local = get_local_version()
-    remote = get_remote_version()
+    remote = get_remote_version(session, timeout=VERSION_CHECK_TIMEOUT)
     if remote and version_newer(remote, local):
         print(f"⚡ Update available: {local} → {remote}")
-        print("➡️  Running updater...")
-        subprocess.run([sys.executable, os.path.join(BASE_DIR, "updater.py")])
-        sys.exit(0)
-    else:
-        print("✅ You are running the latest version.")
+        return remote
+    print("✅ You are running the latest version.")
+    return None
+
+def run_updater():
+    print("➡️  Running updater...")
+    subprocess.run([sys.executable, os.path.join(BASE_DIR, "updater.py")])
+    sys.exit(0)
+
+# ------------------ STARTUP NETWORK TASKS ------------------
+HEARTBEAT_TIMEOUT = 2
+VERSION_CHECK_TIMEOUT = (3, 5)
+DOWNLOAD_TIMEOUT = 10
+
+def run_in_background(fn, *args):
+    """Run fn(*args) on a daemon thread and return a Future for its result."""
+    fut = Future()
+
+    def runner():
+        try:
+            fut.set_result(fn(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+
+    threading.Thread(target=runner, daemon=True).start()
+    return fut
+
+def send_heartbeat(session):
+    import getpass
+
+    try:
+        session.post(
+            SERVER_URL,
+            json={
+                "device": socket.gethostname(),
+                "name": getpass.getuser()
+            },
+            timeout=HEARTBEAT_TIMEOUT
+        )
+    except Exception:
+        pass
+
+def download_missing_files(names, session=None):
+    """Download every file in *names* concurrently and wait for all of them."""
+    futures = [
+        run_in_background(download_file, URLS[fname], os.path.join(BASE_DIR, fname), session, DOWNLOAD_TIMEOUT)
+        for fname in names
+    ]
+    for fut in futures:
+        try:
+            fut.result(timeout=DOWNLOAD_TIMEOUT + 5)
+        except Exception:
+            pass
+
+def start_startup_tasks():
+    """
+    Restore missing files and start the heartbeat and version check.
+
+    Only a missing module from REQUIRED_FILES is waited for; everything else
+    runs concurrently on daemon threads over one pooled session. Returns a
+    Future that resolves to the newer remote version (or None).
+    """
+    missing = [fname for fname in URLS if not os.path.exists(os.path.join(BASE_DIR, fname))]
+    required = [fname for fname in missing if fname in REQUIRED_FILES]
+    if required:
+        print(f"⚡ Missing required file(s): {', '.join(required)}, downloading...")
+        download_missing_files(required)
+        importlib.invalidate_caches()
+
+    optional = [fname for fname in missing if fname not in REQUIRED_FILES]
+
+    def background():
+        # requests is imported here, off the UI thread
+        from dbc_cache import get_session
+
+        session = get_session()
+        if optional:
+            print(f"⚡ Missing file(s) detected: {', '.join(optional)}, downloading in background...")
+            run_in_background(download_missing_files, optional, session)
+        run_in_background(send_heartbeat, session)
+        return check_for_update(session)
+
+    return run_in_background(background)
 
 # ------------------ CAN ERROR REFERENCE ------------------
-def load_can_errors(ref_file):
-    errors = {}
-    if not os.path.exists(ref_file):
-        print(f"❌ CAN error reference file not found: {ref_file}")
-        return errors
-    with open(ref_file, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            if "|" in line:
-                code, msg = line.split("|", 1)
-                errors[code.strip()] = msg.strip()
-    return errors
+def get_can_errors():
+    """Compile can_error_reference.txt (with * wildcards) on first use instead of at startup."""
+    from can_errors import load_error_reference
 
-CAN_ERRORS = load_can_errors(os.path.join(BASE_DIR, "can_error_reference.txt"))
+    return load_error_reference(os.path.join(BASE_DIR, "can_error_reference.txt"))
+
+def write_error_timeline(error_stats, source_path):
+    """Write <source>_error_timeline.csv next to the input; returns the path or None."""
+    path = os.path.splitext(source_path)[0] + "_error_timeline.csv"
+    try:
+        if error_stats.write_timeline_csv(path):
+            print(f"✅ Saved CAN error timeline: {path}")
+            return path
+    except OSError as e:
+        print(f"⚠️ Could not write CAN error timeline {path}: {e}")
+    return None
 
 # ------------------ TRC PROCESSING ------------------
 def extract_trc_info(filepath):
@@ -449,22 +495,12 @@ def merge_in_forced_order(trc_files):
     print(f"\n✅ Merged TRC saved at: {output_path}")
     return output_path
 
-# ------------------ ERROR AGGREGATION ------------------
-def aggregate_can_errors(error_frames):
-    agg = defaultdict(lambda: {"count":0, "max_rx":0, "max_tx":0})
-    for err in error_frames:
-        key = (err["type"], err["direction"], err["bit_pos"])
-        agg[key]["count"] += 1
-        agg[key]["max_rx"] = max(agg[key]["max_rx"], err["rx"])
-        agg[key]["max_tx"] = max(agg[key]["max_tx"], err["tx"])
-    return agg
-
 # ------------------ NON-BLOCKING ALERT ------------------
-def show_error_alert(root, error_frames):
-    if not error_frames:
+def show_error_alert(root, error_stats):
+    if not error_stats:
         return
     def _show():
-        agg = aggregate_can_errors(error_frames)
+        summary = error_stats.summary(get_can_errors())
         alert = tk.Toplevel(root)
         alert.title("⚠️ CAN BUS Error Summary")
         alert.geometry("800x600")
@@ -476,26 +512,27 @@ def show_error_alert(root, error_frames):
         text_area = scrolledtext.ScrolledText(alert, wrap=tk.WORD, bg="#252526", fg="white",
                                               font=("Consolas", 11), insertbackground="white")
         text_area.pack(fill="both", expand=True, padx=10, pady=10)
-        text_area.insert(tk.END, "Detected CAN BUS errors:\n\n")
-
-        for (etype, direction, bit_pos), info in agg.items():
-            color = {
-                "Bit Error": "#ff4d4d",
-                "Form Error": "#ff884d",
-                "Stuff Error": "#ffcc00",
-                "Other Error": "#00b3b3",
-            }.get(etype, "white")
+        text_area.insert(tk.END, f"Detected {error_stats.total} CAN BUS error frame(s):\n\n")
 
+        for info in summary:
+            etype = info["type"]
             text_area.insert(tk.END, f"• Error Type: {etype}\n", (etype,))
-            text_area.insert(tk.END, f"  Direction: {direction}\n", "blue")
-            text_area.insert(tk.END, f"  Bit Position: {bit_pos}\n")
+            if info["message"]:
+                text_area.insert(tk.END, f"  {info['message']}\n")
+            text_area.insert(tk.END, f"  Direction: {info['direction']}\n", "blue")
+            text_area.insert(tk.END, f"  Bit Position: {info['bit_pos']}\n")
             text_area.insert(tk.END, f"  Occurrences: {info['count']}\n", "orange")
             text_area.insert(tk.END, f"  Max RX: {info['max_rx']} | Max TX: {info['max_tx']}\n")
+            if info["cause"]:
+                text_area.insert(tk.END, f"  Possible cause: {info['cause']}\n", "dim")
+            if info["solution"]:
+                text_area.insert(tk.END, f"  Possible solution: {info['solution']}\n", "green")
             text_area.insert(tk.END, "-" * 70 + "\n", "dim")
 
         text_area.tag_configure("dim", foreground="#888")
         text_area.tag_configure("blue", foreground="#4da6ff")
         text_area.tag_configure("orange", foreground="#ffb84d")
+        text_area.tag_configure("green", foreground="#99ff99")
         for err_type, color in {
             "Bit Error": "#ff4d4d",
             "Form Error": "#ff884d",
@@ -519,17 +556,20 @@ SPECIAL_TIME_CAN_ID = 0x405
 
 def get_signal_order(dbc, signal_names):
 
-    order_map = {}
+    # compiled DBCs carry the resolved CSV_ORDER ranks already
+    order_map = getattr(dbc, "csv_order", None)
 
-    # read CSV_ORDER attribute from dbc signals
-    for msg in dbc.messages:
-        for sig in msg.signals:
-            try:
-                attr = sig.dbc.attributes.get("CSV_ORDER")
-                if attr is not None:
-                    order_map[sig.name] = attr.value
-            except Exception:
-                pass
+    if order_map is None:
+        order_map = {}
+        # read CSV_ORDER attribute from dbc signals
+        for msg in dbc.messages:
+            for sig in msg.signals:
+                try:
+                    attr = sig.dbc.attributes.get("CSV_ORDER")
+                    if attr is not None:
+                        order_map[sig.name] = attr.value
+                except Exception:
+                    pass
 
     priority = []
     remaining = []
@@ -546,7 +586,60 @@ def get_signal_order(dbc, signal_names):
     return ordered
 
 # ------------------ TRC DECODING ------------------
-def parse_trc_file(trc_file, dbc):
+_NO_VALUES = {}
+# Marks a record whose decode raised. A string, so it compares equal after
+# pickling from the decoder processes and is never mistaken for an empty decode
+_DECODE_FAILED = "<decode failed>"
+
+
+def _decode_trc_lines(lines, dbc):
+    """
+    Parse and decode a batch of TRC lines into (timestamp, frame_type,
+    can_id, data_bytes, decoded) records; lines that are not frames are left
+    out. decoded is None for the TIME/DATE frame and for IDs without a
+    message, and _DECODE_FAILED if looking up or decoding the message raised.
+    Runs in the decoder processes of pipeline.py, or in-process.
+    """
+    records = []
+    for line in lines:
+        try:
+            parsed = _parse_trc_line(line)
+        except Exception:
+            continue
+        if not parsed:
+            continue
+        timestamp, frame_type, can_id, data_bytes = parsed
+        decoded = None
+        if not (can_id == SPECIAL_TIME_CAN_ID and len(data_bytes) >= 6):
+            try:
+                message = dbc.get_message_by_frame_id(can_id)
+                if message:
+                    decoded = message.decode(data_bytes)
+            except Exception:
+                decoded = _DECODE_FAILED
+        records.append((timestamp, frame_type, can_id, data_bytes, decoded))
+    return records
+
+
+def parse_trc_file(trc_file, dbc, progress_listeners=None, bus_stats=None, sample_sinks=(), build_rows=True,
+                   change_filter=None, row_store=None, workers=None):
+    """
+    Decode a TRC file into rows. CAN error frames are aggregated into a
+    CanErrorStats; if *bus_stats* is given, every data frame is also counted
+    into it in the same pass, and every decoded message is passed to
+    .add(timestamp, can_id, decoded) of each of *sample_sinks* (see
+    signal_db.py and long_csv.py). Without *build_rows* no wide rows are
+    built and only the sinks receive the data. With a *change_filter* (see
+    delta_rows.py) a row is only built for frames it lets through. Rows are
+    appended to *row_store* if given (e.g. spill.SpillingRows), else a list.
+
+    The file is read, decoded (in *workers* processes, see pipeline.py) and
+    handed to the sinks by overlapping stages; rows are built in file order.
+    """
+    from itertools import chain
+    from pipeline import PipelineStats, SinkError, SinkWriter, iter_decoded_batches
+    from can_errors import CanErrorStats
+
     signal_names = set()
     signal_to_can_id = {}
 
@@ -565,105 +658,119 @@ def parse_trc_file(trc_file, dbc):
         signal_names = set()
         signal_to_can_id = {}
 
-    decoded_rows = []
+    decoded_rows = row_store if row_store is not None else []
     last_known_values = {}
     last_seen_time = {}
-    error_frames = []
-
-    with open(trc_file, 'r', encoding='utf-8', errors='ignore') as f:
-        lines = f.readlines()
+    error_stats = CanErrorStats()
+    stats = PipelineStats()
+    writer = SinkWriter(sample_sinks, stats) if sample_sinks else None
+    sample_sinks = [writer] if writer else ()
+    batches = iter_decoded_batches(
+        trc_file, _decode_trc_lines, dbc, workers, "🔍 Decoding", progress_listeners, stats,
+    )
 
-    for line in tqdm(lines, desc="🔍 Decoding", unit="lines"):
-        try:
-            parsed = _parse_trc_line(line)
-            if not parsed:
-                continue
+    try:
+        for timestamp, frame_type, can_id, data_bytes, decoded in chain.from_iterable(batches):
+            try:
+                frame_values = _NO_VALUES
+
+                if bus_stats is not None and frame_type != "Error":
+                    bus_stats.add(timestamp, can_id, len(data_bytes))
+
+                # ------------------ BMS FIRMWARE ------------------
+                if can_id == 0x7A1 and len(data_bytes) >= 4:
+                    if data_bytes[0] == 0x02:
+                        major = data_bytes[1]
+                        minor = data_bytes[2]
+                        patch = data_bytes[3]
+                        fw_str = f"{major:02d}.{minor:02d}.{patch:02d}"
+                        last_known_values["BMS_Firmware"] = fw_str
+                        frame_values = {"BMS_Firmware": fw_str}
+                        for sink in sample_sinks:
+                            sink.add(timestamp, can_id, frame_values)
+                        signal_names.add("BMS_Firmware")
+                        signal_to_can_id["BMS_Firmware"] = can_id
+                        last_seen_time[can_id] = timestamp
+
+                # ------------------ ERROR FRAME ------------------
+                if frame_type == "Error":
+                    if len(data_bytes) < 4:
+                        continue
+                    # aggregated in place; no per-frame record is kept
+                    error_stats.add(timestamp, can_id, data_bytes)
+
+                # ------------------ TIME/DATE FRAME ------------------
+                if can_id == SPECIAL_TIME_CAN_ID and len(data_bytes) >= 6:
+                    hex_bytes = [f"{b:02X}" for b in data_bytes]
+
+                    time_str = f"{hex_bytes[0]}:{hex_bytes[1]}:{hex_bytes[2]}"
+                    date_str = f"{hex_bytes[3]}:{hex_bytes[4]}:{hex_bytes[5]}"
+
+                    last_known_values["TIME"] = time_str
+                    last_known_values["DATE"] = date_str
+                    frame_values = {"DATE": date_str, "TIME": time_str}
+                    for sink in sample_sinks:
+                        sink.add(timestamp, can_id, frame_values)
+
+                    signal_names.add("TIME")
+                    signal_names.add("DATE")
+
+                    signal_to_can_id["TIME"] = can_id
+                    signal_to_can_id["DATE"] = can_id
 
-            timestamp, frame_type, can_id, data_bytes = parsed
-
-            # ------------------ BMS FIRMWARE ------------------
-            if can_id == 0x7A1 and len(data_bytes) >= 4:
-                if data_bytes[0] == 0x02:
-                    major = data_bytes[1]
-                    minor = data_bytes[2]
-                    patch = data_bytes[3]
-                    fw_str = f"{major:02d}.{minor:02d}.{patch:02d}"
-                    last_known_values["BMS_Firmware"] = fw_str
-                    signal_names.add("BMS_Firmware")
-                    signal_to_can_id["BMS_Firmware"] = can_id
                     last_seen_time[can_id] = timestamp
 
-            # ------------------ ERROR FRAME ------------------
-            if frame_type == "Error":
-                if len(data_bytes) < 4:
-                    continue
-                direction = "Sending" if data_bytes[0] == 0 else "Receiving"
-                bit_pos = str(data_bytes[1])
-                rx = data_bytes[2]
-                tx = data_bytes[3]
-                etype = {1:"Bit Error",2:"Form Error",4:"Stuff Error",8:"Other Error"}.get(can_id,"Unknown")
-                error_frames.append({
-                    "type": etype,
-                    "direction": direction,
-                    "bit_pos": bit_pos,
-                    "rx": rx,
-                    "tx": tx
-                })
-
-            # ------------------ TIME/DATE FRAME ------------------
-            if can_id == SPECIAL_TIME_CAN_ID and len(data_bytes) >= 6:
-                hex_bytes = [f"{b:02X}" for b in data_bytes]
-
-                time_str = f"{hex_bytes[0]}:{hex_bytes[1]}:{hex_bytes[2]}"
-                date_str = f"{hex_bytes[3]}:{hex_bytes[4]}:{hex_bytes[5]}"
-
-                last_known_values["TIME"] = time_str
-                last_known_values["DATE"] = date_str
+                elif decoded == _DECODE_FAILED:
+                    continue   # the message lookup or decode raised: no row, as before
 
-                signal_names.add("TIME")
-                signal_names.add("DATE")
-
-                signal_to_can_id["TIME"] = can_id
-                signal_to_can_id["DATE"] = can_id
-
-                last_seen_time[can_id] = timestamp
-
-            else:
-                message = dbc.get_message_by_frame_id(can_id)
-                if message:
-                    decoded = message.decode(data_bytes)
+                elif decoded is not None:
                     last_seen_time[can_id] = timestamp
+                    frame_values = {**frame_values, **decoded} if frame_values else decoded
+                    for sink in sample_sinks:
+                        sink.add(timestamp, can_id, decoded)
 
+                    # floats are kept as decoded and rounded once, when the CSV is written
                     for sig, val in decoded.items():
-                        if isinstance(val, float):
-                            val = round(val, 3)
                         last_known_values[sig] = val
                         signal_names.add(sig)
                         signal_to_can_id.setdefault(sig, can_id)
 
-            # ------------------ ROW BUILD ------------------
-            row = {"Time (s)": round(timestamp, 6)}
+                # ------------------ ROW BUILD ------------------
+                if not build_rows:
+                    continue
+                if change_filter is not None and not change_filter.update(timestamp, frame_values):
+                    continue
 
-            for sig in signal_names:
-                sig_can_id = signal_to_can_id.get(sig)
-                seen_time = last_seen_time.get(sig_can_id)
+                row = {"Time (s)": round(timestamp, 6)}
 
-                if (
-                    seen_time is not None
-                    and (timestamp - seen_time) <= 1.0
-                    and sig in last_known_values
-                ):
-                    val = last_known_values[sig]
-                    if isinstance(val, float):
-                        val = round(val, 3)
-                    row[sig] = val
-                else:
-                    row[sig] = "NA"
+                for sig in signal_names:
+                    sig_can_id = signal_to_can_id.get(sig)
+                    seen_time = last_seen_time.get(sig_can_id)
 
-            decoded_rows.append(row)
+                    if (
+                        seen_time is not None
+                        and (timestamp - seen_time) <= 1.0
+                        and sig in last_known_values
+                    ):
+                        row[sig] = last_known_values[sig]
+                    else:
+                        row[sig] = "NA"
 
-        except Exception:
-            continue
+                decoded_rows.append(row)
+
+            except SinkError:
+                raise
+            except Exception:
+                continue
+    except BaseException:
+        batches.close()   # stops the reader and the decoder processes
+        if writer:
+            writer.abort()   # the caller discards the sinks
+        raise
+
+    if writer:
+        writer.close()
+    print(stats.summary())
 
     ordered_signals = get_signal_order(dbc, signal_names)
 
@@ -680,7 +787,7 @@ def parse_trc_file(trc_file, dbc):
     if "BMS_Firmware" in signal_names:
         ordered_signals.append("BMS_Firmware")
 
-    return decoded_rows, ["Time (s)"] + ordered_signals, error_frames
+    return decoded_rows, ["Time (s)"] + ordered_signals, error_stats
 
     # ------------------ COLUMN ORDER FIX ------------------
     ordered_signals = get_signal_order(dbc, signal_names)
@@ -699,28 +806,28 @@ def parse_trc_file(trc_file, dbc):
     # Add firmware LAST
     if "BMS_Firmware" in signal_names:
         ordered_signals.append("BMS_Firmware")
-    return decoded_rows, ["Time (s)"] + ordered_signals, error_frames
+    return decoded_rows, ["Time (s)"] + ordered_signals, error_stats
 
 # ------------------ CSV WRITER ------------------
-def write_large_csv(df, base_path):
-    row_limit = 1_000_000
-    total_rows = len(df)
-    total_parts = math.ceil(total_rows / row_limit)
-    paths = []
-
-    print(f"\n💾 Writing decoded data to CSV ({total_parts} part(s))...")
-    for i in range(total_parts):
-        chunk = df.iloc[i * row_limit : (i + 1) * row_limit]
-        suffix = "" if i == 0 else f"_part{i+1}"
-        path = f"{base_path}{suffix}.csv"
-        chunk.to_csv(path, index=False)
-        paths.append(path)
-        print(f"✅ Saved: {path}")
-
-    return paths
+# Decimals written for signal values; the time column keeps microseconds
+CSV_PRECISION = 3
+CSV_COLUMN_PRECISION = {"Time (s)": 6}
+
+
+def write_large_csv(df, base_path, row_limit=1_000_000, precision=CSV_PRECISION, compression=None, level=None,
+                    streaming=False, block_rows=None):
+    """Write *df* as base.csv, base_part2.csv, ... (see csv_writer.py); floats are rounded here, once."""
+    from csv_writer import BLOCK_ROWS, write_large_csv as write_csv_parts
+
+    return write_csv_parts(
+        df, base_path, row_limit, precision, CSV_COLUMN_PRECISION, compression=compression, level=level,
+        streaming=streaming, block_rows=block_rows or BLOCK_ROWS,
+    )
 
 # ------------------ RESAMPLE FUNCTION (FIXED) ------------------
 def resample_dataframe(df, interval_sec):
+    import pandas as pd
+
     df = df.copy()
     unit_row = df.iloc[0:1]
     df_numeric = df.iloc[1:].copy()
@@ -736,37 +843,156 @@ def resample_dataframe(df, interval_sec):
     return df_final
 
 
-def _add_cip_derived_values(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
+def add_derived_and_units(df: "pd.DataFrame", dbc, derived=None) -> "pd.DataFrame":
+    """Append the DBC preset's derived columns (see derived_signals.py) and put the unit row on top."""
+    import pandas as pd
+    from derived_signals import unit_row
 
-    cell_cols = [
-        "CMU_1_CV1","CMU_1_CV2","CMU_1_CV3","CMU_1_CV4",
-        "CMU_1_CV5","CMU_1_CV6","CMU_1_CV7","CMU_1_CV8",
-        "CMU_1_CV9",
-        "CMU_2_CV1","CMU_2_CV2","CMU_2_CV3","CMU_2_CV4",
-        "CMU_2_CV5","CMU_2_CV6","CMU_2_CV7","CMU_2_CV8",
-        "CMU_2_CV9",
-    ]
+    if derived:
+        df = derived.apply(df)
 
-    temp_cols = [
-        "Temperature_1","Temperature_2","Temperature_3",
-        "Temperature_4","Temperature_5","Temperature_6",
-    ]
+    df_units = pd.DataFrame([unit_row(df.columns, dbc_unit_map(dbc), derived)], columns=df.columns)
+    return pd.concat([df_units, df], ignore_index=True)
+
+
+def dbc_unit_map(dbc):
+    return getattr(dbc, "units", None) or {sig.name: sig.unit or "" for msg in dbc.messages for sig in msg.signals}
+
+
+def open_signal_db(source_path, dbc):
+    """A SignalDatabaseWriter for <source>_signals.db when SIGNAL_DB is set, else None."""
+    from signal_db import SignalDatabaseWriter, database_path, export_enabled
+
+    if not export_enabled():
+        return None
+    return SignalDatabaseWriter(database_path(source_path), dbc_unit_map(dbc), source=os.path.basename(source_path))
+
+
+def open_sample_sinks(source_path, dbc, long_layout=False, compression=None, level=None):
+    """Sample sinks for parse_trc_file(): the signal database (SIGNAL_DB) and the long CSV (CSV_LAYOUT=long)."""
+    from long_csv import open_long_csv
+
+    sinks = []
+    signal_db = open_signal_db(source_path, dbc)
+    if signal_db is not None:
+        sinks.append(signal_db)
+    if long_layout:
+        try:
+            sinks.append(open_long_csv(source_path, dbc_unit_map(dbc), compression, level))
+        except BaseException:
+            discard_sample_sinks(sinks)
+            raise
+    return sinks
+
+
+def discard_sample_sinks(sinks):
+    """Close *sinks* after a failed decode and delete their partial output."""
+    for sink in sinks:
+        try:
+            sink.discard()
+        except Exception as e:
+            print(f"⚠️ Could not remove partial output {getattr(sink, 'path', sink)}: {e}")
+
+
+def parse_trc_file_to_sinks(trc_path, dbc, sinks, **kwargs):
+    """
+    parse_trc_file() feeding *sinks*, which are closed once the file is done
+    (a long CSV gets the wide export's column order for pivoting back).
+    If the decode or a sink fails, the sinks are discarded (no half-written
+    long CSV or signal database is left behind), the row store is released,
+    and the error is raised.
+    """
+    from long_csv import LongCsvWriter
+
+    try:
+        result = parse_trc_file(trc_path, dbc, sample_sinks=sinks, **kwargs)
+        for sink in sinks:
+            if isinstance(sink, LongCsvWriter):
+                sink.column_order = result[1][1:]   # the wide export's columns, without Time (s)
+            sink.close()
+    except BaseException:
+        discard_sample_sinks(sinks)
+        row_store = kwargs.get("row_store")
+        if hasattr(row_store, "close"):
+            row_store.close()
+        raise
+    return result
+
+
+def new_change_filter(selected_interval):
+    """A fresh ChangeFilter (see delta_rows.py) when CSV_DELTA is set and the output is not resampled."""
+    from delta_rows import ChangeFilter
+
+    change_filter = ChangeFilter.from_env()
+    if change_filter is not None and selected_interval > 0:
+        print("ℹ️ Change-only rows (CSV_DELTA) apply to unresampled output only; writing every resampled row")
+        return None
+    return change_filter
+
+
+def decode_trc_to_long_csv(root, trc_paths, dbc, compression=None, level=None):
+    """Long layout: stream every decoded sample to <trc>_long.csv; no wide rows are built."""
+    from bus_stats import BusStats, write_bus_reports
+    from can_errors import CanErrorStats
+
+    all_errors = CanErrorStats()
+    for trc_path in trc_paths:
+        print(f"\n▶ Processing {os.path.basename(trc_path)}")
+        try:
+            bus_stats = BusStats()
+            sinks = open_sample_sinks(trc_path, dbc, True, compression, level)
+            _, _, errors = parse_trc_file_to_sinks(trc_path, dbc, sinks, bus_stats=bus_stats, build_rows=False)
+        except Exception as e:
+            print(f"❌ Failed to decode {trc_path}: {e}")
+            continue
 
-    existing_cell_cols = [c for c in cell_cols if c in df.columns]
-    existing_temp_cols = [c for c in temp_cols if c in df.columns]
+        write_bus_reports(bus_stats, trc_path)
+        if errors:
+            write_error_timeline(errors, trc_path)
+            all_errors.merge(errors)
+
+    if all_errors:
+        show_error_alert(root, all_errors)
+    print("💡 Rebuild the wide table with: python long_csv.py pivot <file>_long.csv")
+
+def write_decoded_csv(rows, columns, dbc, derived, selected_interval, base_path, compression=None, level=None):
+    """
+    Add derived values and units, resample and write one decoded table.
+    Rows spilled to disk under a memory budget (see spill.py) go through the
+    same steps one chunk at a time and are streamed to the CSV.
+    """
+    import pandas as pd
+    from itertools import chain
+    from derived_signals import unit_row
+    from spill import SpillingRows, resample_frames, rows_within
+
+    if not (isinstance(rows, SpillingRows) and rows.spilled):
+        df = pd.DataFrame(rows.rows if isinstance(rows, SpillingRows) else rows)
+        df = df.reindex(columns=columns)
 
-    if existing_cell_cols:
-        cell_vals = df[existing_cell_cols].apply(pd.to_numeric, errors="coerce")
-        df[" Max. Cell Voltage [mV]"] = cell_vals.max(axis=1)
-        df[" Min. Cell Voltage [mV]"] = cell_vals.min(axis=1)
+        # ----------------- Derived values + units -----------------
+        df = add_derived_and_units(df, dbc, derived)
 
-    if existing_temp_cols:
-        temp_vals = df[existing_temp_cols].apply(pd.to_numeric, errors="coerce")
-        df["Temp_Max_degC"] = temp_vals.max(axis=1)
-        df["Temp_Min_degC"] = temp_vals.min(axis=1)
+        # ----------------- Resample -----------------
+        if selected_interval > 0:
+            df = resample_dataframe(df, selected_interval)
 
-    return df
+        return write_large_csv(df, base_path, compression=compression, level=level)
+
+    print(f"💽 Processing {len(rows):,} spilled rows chunk by chunk...")
+    frames = rows.iter_frames(columns)
+    if derived:
+        frames = (derived.apply(chunk, rows.float_columns) for chunk in frames)
+    first = next(frames)
+    units = pd.DataFrame([unit_row(first.columns, dbc_unit_map(dbc), derived)], columns=first.columns)
+    frames = chain([first], frames)
+    if selected_interval > 0:
+        frames = resample_frames(frames, selected_interval)
+
+    return write_large_csv(
+        chain([units], frames), base_path, compression=compression, level=level, streaming=True,
+        block_rows=rows_within(rows.budget, len(first.columns)),
+    )
 
 # ------------------ THREADED DECODE ------------------
 def decode_trc_in_thread(root, merged_path, dbc, callback):
@@ -778,6 +1004,14 @@ def decode_trc_in_thread(root, merged_path, dbc, callback):
 # ------------------ MAIN ------------------
 
 def main(root):
+    from merge_csv import merge_csv_files
+    from dbc_cache import fetch_and_load_dbc_from_url, load_dbc_file
+    from bus_stats import BusStats, write_bus_reports
+    from derived_signals import DerivedSignals
+    from csv_writer import compression_from_env
+    from long_csv import long_layout_enabled
+    from spill import memory_budget, new_row_store
+
     root.withdraw()
     print("📂 Please select one or more .trc files")
     trc_files = list(filedialog.askopenfilenames(filetypes=[("TRC files", "*.trc")]))
@@ -794,14 +1028,14 @@ def main(root):
         print("❌ No DBC source selected.")
         return
 
-    is_cip_dbc = (dbc_source == "CIP BMS-24X")
+    derived = DerivedSignals.for_dbc(dbc_source)
 
     try:
         if dbc_source == "Marvel 3W (all variants)":
             if is_host_in_runner_list():
                 dbc_url = DBC_URLS[dbc_source]
             else:
-                dbc_url = "https://raw.githubusercontent.com/itssatishkumar/Runner/main/00.0A.12_dbc_File.dbc"
+                dbc_url = MARVEL_DEFAULT_DBC_URL
 
             dbc = fetch_and_load_dbc_from_url(dbc_url)
 
@@ -812,30 +1046,44 @@ def main(root):
 
         else:
             print(f"📁 Loading your DBC file: {dbc_source}")
-            dbc = cantools.database.load_file(dbc_source)
+            dbc = load_dbc_file(dbc_source)
 
     except Exception as e:
         print(f"❌ Failed to load DBC: {e}")
         return
     
+    # Long layout (CSV_LAYOUT=long, see long_csv.py) keeps every sample, so it is never resampled
+    long_layout = long_layout_enabled()
+
     # ---------------- Time resolution selection ----------------
-    interval_var = tk.DoubleVar(value=0)
-    interval_win = tk.Toplevel(root)
-    interval_win.title("⏱️ Select Time Resolution")
-    tk.Label(interval_win, text="Select the time resolution for the output CSV:", font=("Segoe UI", 12)).pack(pady=10)
+    if long_layout:
+        selected_interval = 0.0
+    else:
+        interval_var = tk.DoubleVar(value=0)
+        interval_win = tk.Toplevel(root)
+        interval_win.title("⏱️ Select Time Resolution")
+        tk.Label(interval_win, text="Select the time resolution for the output CSV:", font=("Segoe UI", 12)).pack(pady=10)
+
+        def set_interval(val):
+            interval_var.set(val)
+            interval_win.destroy()
+
+        tk.Button(interval_win, text="Default TRC timestamps", command=lambda: set_interval(0), width=25).pack(pady=5)
+        tk.Button(interval_win, text="Resample every 300 ms", command=lambda: set_interval(0.3), width=25).pack(pady=5)
+        tk.Button(interval_win, text="Resample every 500 ms", command=lambda: set_interval(0.5), width=25).pack(pady=5)
+        tk.Button(interval_win, text="Resample every 1000 ms", command=lambda: set_interval(1), width=25).pack(pady=5)
+        interval_win.grab_set()
+        root.wait_window(interval_win)
 
-    def set_interval(val):
-        interval_var.set(val)
-        interval_win.destroy()
+        selected_interval = float(interval_var.get())
 
-    tk.Button(interval_win, text="Default TRC timestamps", command=lambda: set_interval(0), width=25).pack(pady=5)
-    tk.Button(interval_win, text="Resample every 300 ms", command=lambda: set_interval(0.3), width=25).pack(pady=5)
-    tk.Button(interval_win, text="Resample every 500 ms", command=lambda: set_interval(0.5), width=25).pack(pady=5)
-    tk.Button(interval_win, text="Resample every 1000 ms", command=lambda: set_interval(1), width=25).pack(pady=5)
-    interval_win.grab_set()
-    root.wait_window(interval_win)
+    # Optional compressed output, e.g. CSV_COMPRESSION=gzip or zstd:9 (see csv_writer.py)
+    compression, level = compression_from_env()
+    if compression == "zstd":
+        ensure_package("zstandard")
 
-    selected_interval = float(interval_var.get())
+    # Optional MEMORY_BUDGET_MB: spill decoded rows to disk past it (see spill.py)
+    budget = memory_budget()
 
     # If multiple TRCs are selected, sort them by $STARTTIME from the TRC header
     ordered_trc_files = list(trc_files)
@@ -853,6 +1101,10 @@ def main(root):
         except Exception as e:
             print(f"⚠️ Could not sort TRC files by start time, using selection order. Reason: {e}")
 
+    if long_layout:
+        decode_trc_to_long_csv(root, ordered_trc_files, dbc, compression, level)
+        return
+
     # ---------------- Single TRC: keep threaded behavior ----------------
     if len(ordered_trc_files) == 1:
         trc_path = ordered_trc_files[0]
@@ -860,45 +1112,22 @@ def main(root):
 
         def on_decode_done(rows, columns, errors):
             if errors:
+                write_error_timeline(errors, trc_path)
                 show_error_alert(root, errors)
 
             if not rows:
                 print("❌ No data decoded.")
                 return
 
-            df = pd.DataFrame(rows)
-            df = df.reindex(columns=columns)
-
-            # ----------------- CIP-derived values (no filtering) -----------------
-            derived_units = {}
-            if is_cip_dbc:
-                df = _add_cip_derived_values(df)
-                derived_units = {
-                    " Max. Cell Voltage [mV]": "mV",
-                    " Min. Cell Voltage [mV]": "mV",
-                    "Temp_Max_degC": "degC",
-                    "Temp_Min_degC": "degC",
-                }
-
-            # ----------------- Add units -----------------
-            unit_map = {sig.name: sig.unit or "" for msg in dbc.messages for sig in msg.signals}
-
-            def find_unit_for_col(col_name):
-                if col_name in derived_units:
-                    return derived_units[col_name]
-                return unit_map.get(col_name, "")
-
-            unit_row = ["s" if c == "Time (s)" else find_unit_for_col(c) for c in df.columns]
-            df_units = pd.DataFrame([unit_row], columns=df.columns)
-            df = pd.concat([df_units, df], ignore_index=True)
-
-            # ----------------- Resample -----------------
-            if selected_interval > 0:
-                df = resample_dataframe(df, selected_interval)
-
             base_path = os.path.splitext(trc_path)[0] + "_decoded"
             print("\n💡 Starting CSV writing...")
-            csv_paths = write_large_csv(df, base_path)
+            try:
+                csv_paths = write_decoded_csv(
+                    rows, columns, dbc, derived, selected_interval, base_path, compression, level
+                )
+            finally:
+                if hasattr(rows, "close"):
+                    rows.close()
             print("✅ CSV writing complete!")
             output_dir = os.path.dirname(csv_paths[0])
             final_csv = os.path.join(output_dir, "merged_decoded.csv")
@@ -909,6 +1138,9 @@ def main(root):
                 final_csv,
                 open_after=False,
                 row_limit=1_000_000,
+                compression=compression,
+                level=level,
+                memory_budget=budget,
             )
 
             for path in csv_paths:
@@ -925,7 +1157,16 @@ def main(root):
                     os.startfile(first_csv)
 
         try:
-            rows, columns, errors = parse_trc_file(trc_path, dbc)
+            bus_stats = BusStats()
+            sinks = open_sample_sinks(trc_path, dbc)
+            change_filter = new_change_filter(selected_interval)
+            rows, columns, errors = parse_trc_file_to_sinks(
+                trc_path, dbc, sinks, bus_stats=bus_stats, change_filter=change_filter,
+                row_store=new_row_store(budget),
+            )
+            if change_filter is not None:
+                print(change_filter.summary())
+            write_bus_reports(bus_stats, trc_path)
             on_decode_done(rows, columns, errors)
         except Exception as e:
             print(f"❌ Failed to decode {trc_path}: {e}")
@@ -934,60 +1175,48 @@ def main(root):
     # ---------------- Multiple TRCs: per‑file CSV + merge ----------------
     print("\n🔍 Decoding multiple TRC files one by one...")
 
-    all_error_frames = []
+    from can_errors import CanErrorStats
+
+    all_errors = CanErrorStats()
     all_csv_paths = []
 
     for trc_path in ordered_trc_files:
         print(f"\n▶ Processing {os.path.basename(trc_path)}")
         try:
-            rows, columns, errors = parse_trc_file(trc_path, dbc)
+            bus_stats = BusStats()
+            sinks = open_sample_sinks(trc_path, dbc)
+            change_filter = new_change_filter(selected_interval)
+            rows, columns, errors = parse_trc_file_to_sinks(
+                trc_path, dbc, sinks, bus_stats=bus_stats, change_filter=change_filter,
+                row_store=new_row_store(budget),
+            )
+            if change_filter is not None:
+                print(change_filter.summary())
         except Exception as e:
             print(f"❌ Failed to decode {trc_path}: {e}")
             continue
 
-        all_error_frames.extend(errors or [])
+        write_bus_reports(bus_stats, trc_path)
+
+        if errors:
+            write_error_timeline(errors, trc_path)
+            all_errors.merge(errors)
 
         if not rows:
             print(f"❌ No data decoded for {trc_path}. Skipping.")
             continue
 
-        df = pd.DataFrame(rows)
-        df = df.reindex(columns=columns)
-
-        # ----------------- CIP-derived values (no filtering) -----------------
-        derived_units = {}
-        if is_cip_dbc:
-            df = _add_cip_derived_values(df)
-            derived_units = {
-                " Max. Cell Voltage [mV]": "mV",
-                " Min. Cell Voltage [mV]": "mV",
-                "Temp_Max_degC": "degC",
-                "Temp_Min_degC": "degC",
-            }
-
-        # ----------------- Add units -----------------
-        unit_map = {sig.name: sig.unit or "" for msg in dbc.messages for sig in msg.signals}
-
-        def find_unit_for_col(col_name):
-            if col_name in derived_units:
-                return derived_units[col_name]
-            return unit_map.get(col_name, "")
-
-        unit_row = ["s" if c == "Time (s)" else find_unit_for_col(c) for c in df.columns]
-        df_units = pd.DataFrame([unit_row], columns=df.columns)
-        df = pd.concat([df_units, df], ignore_index=True)
-
-        # ----------------- Resample -----------------
-        if selected_interval > 0:
-            df = resample_dataframe(df, selected_interval)
-
         base_path = os.path.splitext(trc_path)[0] + "_decoded"
         print("💡 Writing CSV for this TRC...")
-        csv_paths = write_large_csv(df, base_path)
+        try:
+            csv_paths = write_decoded_csv(rows, columns, dbc, derived, selected_interval, base_path, compression, level)
+        finally:
+            if hasattr(rows, "close"):
+                rows.close()
         all_csv_paths.extend(csv_paths)
 
-    if all_error_frames:
-        show_error_alert(root, all_error_frames)
+    if all_errors:
+        show_error_alert(root, all_errors)
 
     if not all_csv_paths:
         print("❌ No CSV files were created from the selected TRCs.")
@@ -1004,6 +1233,9 @@ def main(root):
             final_csv,
             open_after=False,
             row_limit=1_000_000,
+            compression=compression,
+            level=level,
+            memory_budget=budget,
         )
     except Exception as e:
         print(f"❌ Failed to merge CSV files: {e}")
@@ -1029,8 +1261,14 @@ def main(root):
             os.startfile(first_csv)
 
 # ------------------ CHOICE MENU ------------------
-def show_choice_menu(root):
-    """Show menu to choose between TRC to CSV or LOG to CSV"""
+def show_choice_menu(root, update_future=None):
+    """Show menu to choose between TRC to CSV or LOG to CSV.
+
+    While the menu is open, a finished update check that found a newer
+    version closes it and returns -1 so the caller can run the updater. A
+    check that finishes after the menu closed is not applied mid-session;
+    see report_late_update.
+    """
     root.withdraw()
     
     choice_win = tk.Toplevel(root)
@@ -1066,43 +1304,63 @@ def show_choice_menu(root):
         command=lambda: (choice_var.set(2), choice_win.destroy())
     ).pack(pady=10)
     
+    def poll_update():
+        if not choice_win.winfo_exists():
+            return
+        if update_future is not None and update_future.done():
+            try:
+                remote = update_future.result()
+            except Exception:
+                remote = None
+            if remote:
+                choice_var.set(-1)
+                choice_win.destroy()
+            return
+        choice_win.after(100, poll_update)
+
+    if update_future is not None:
+        choice_win.after(100, poll_update)
+
     choice_win.focus()
     root.wait_window(choice_win)
     
     return choice_var.get()
 
+def report_late_update(update_future):
+    """Tell the user about an update the check found after the choice menu closed."""
+    def report(fut):
+        try:
+            remote = fut.result()
+        except Exception:
+            return
+        if remote:
+            print(f"⚡ Version {remote} will be installed the next time the tool starts.")
+
+    if update_future is not None:
+        update_future.add_done_callback(report)
+
 # ------------------ RUN ------------------
 if __name__ == "__main__":
-    try:
-        import socket
-        import getpass
+    update_future = start_startup_tasks()
 
-        hostname = socket.gethostname()
-        username = getpass.getuser()
-
-        requests.post(
-            "https://trc-to-csv.onrender.com/heartbeat",
-            json={
-                "device": hostname,
-                "name": username
-            },
-            timeout=2
-        )
-    except Exception:
-        pass
+    root = tk.Tk()
+    root.withdraw()
 
-    for fname, url in URLS.items():
-        path = os.path.join(BASE_DIR, fname)
-        if not os.path.exists(path):
-            print(f"⚡ Missing file detected: {fname}, downloading...")
-            download_file(url, path)
+    # Warm every preset DBC while the user is still picking files; scheduled
+    # on the event loop so it starts only once the choice menu is up
+    from dbc_cache import prefetch_dbcs
+    root.after(50, lambda: prefetch_dbcs(list(DBC_URLS.values()) + [MARVEL_DEFAULT_DBC_URL]))
 
-    check_for_update()
+    choice = show_choice_menu(root, update_future)
 
-    root = tk.Tk()
-    root.withdraw()
+    if choice == -1:
+        try:
+            root.destroy()
+        except Exception:
+            pass
+        run_updater()
 
-    choice = show_choice_menu(root)
+    report_late_update(update_future)
 
     if choice == 1:
         main(root)
@@ -1,7 +1,12 @@
 import os
 import sys
+import json
+import hashlib
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 import requests
+from requests.adapters import HTTPAdapter
 import tkinter as tk
 from tkinter import messagebox
 
@@ -21,6 +26,12 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 MAIN_SCRIPT = os.path.join(BASE_DIR, "trc to csv.py")
 LOCAL_VERSION_FILE = os.path.join(BASE_DIR, "version.txt")
+MANIFEST_FILE = os.path.join(BASE_DIR, "manifest.json")
+
+RAW_BASE_URL = "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/"
+MANIFEST_URL = RAW_BASE_URL + "manifest.json"
+DOWNLOAD_WORKERS = 6
+DOWNLOAD_TIMEOUT = 10
 
 URLS = {
     MAIN_SCRIPT: "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/trc%20to%20csv.py",
@@ -28,9 +39,30 @@ URLS = {
     "busmaster_to_csv.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/busmaster_to_csv.py",
     "updater.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/updater.py",
     "version.txt": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/version.txt",
-    "can_error_reference.txt": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/can_error_reference.txt"
+    "can_error_reference.txt": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/can_error_reference.txt",
+    "progress.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/progress.py",
+    "dbc_cache.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/dbc_cache.py",
+    "dbc_compiled.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/dbc_compiled.py",
+    "can_errors.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/can_errors.py",
+    "bus_stats.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/bus_stats.py",
+    "derived_signals.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/derived_signals.py",
+    "csv_writer.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/csv_writer.py",
+    "signal_db.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/signal_db.py",
+    "long_csv.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/long_csv.py",
+    "delta_rows.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/delta_rows.py",
+    "spill.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/spill.py",
+    "pipeline.py": "https://raw.githubusercontent.com/itssatishkumar/Trc-to-CSV/main/pipeline.py",
 }
 
+# ------------------ HTTP ------------------
+def make_session():
+    """One pooled session for the manifest and every file download."""
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=DOWNLOAD_WORKERS)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
 # ------------------ Version Handling ------------------
 def read_local_version():
     if not os.path.exists(LOCAL_VERSION_FILE):
@@ -41,28 +73,148 @@ def read_local_version():
     except Exception:
         return "0.0.0"
 
-def fetch_remote_version():
+def fetch_remote_version(session=requests):
     try:
-        r = requests.get(URLS["version.txt"], timeout=10)
+        r = session.get(URLS["version.txt"], timeout=DOWNLOAD_TIMEOUT)
         if r.status_code == 200:
             return r.text.strip()
     except Exception as e:
         print(f"❌ Could not fetch remote version: {e}")
     return None
 
-def download_file(url, local):
+# ------------------ Manifest ------------------
+def _local_name(fname):
+    return os.path.basename(fname)
+
+def _url_for(name):
+    for fname, url in URLS.items():
+        if _local_name(fname) == name:
+            return url
+    return RAW_BASE_URL + quote(name)
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def build_manifest():
+    """Describe the local copy of every shipped file (run before a release)."""
+    files = {}
+    for fname in URLS:
+        name = _local_name(fname)
+        path = os.path.join(BASE_DIR, name)
+        if name == "version.txt" or not os.path.exists(path):
+            continue
+        files[name] = {"sha256": file_sha256(path), "size": os.path.getsize(path)}
+    return {"version": read_local_version(), "files": files}
+
+def write_manifest():
+    manifest = build_manifest()
+    with open(MANIFEST_FILE, "w", encoding="utf-8", newline="\n") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"✅ Wrote {MANIFEST_FILE} ({len(manifest['files'])} files, version {manifest['version']})")
+
+def fetch_manifest(session):
     try:
-        r = requests.get(url, timeout=10)
+        r = session.get(MANIFEST_URL, timeout=DOWNLOAD_TIMEOUT)
         if r.status_code == 200:
-            with open(local, "wb") as f:
-                f.write(r.content)
-            print(f"✅ Updated {local}")
-            return True
-        else:
+            manifest = r.json()
+            if isinstance(manifest.get("files"), dict) and manifest.get("version"):
+                return manifest
+    except Exception as e:
+        print(f"⚠️ Could not fetch update manifest: {e}")
+    return None
+
+def changed_files(manifest):
+    """Names whose local copy is missing or differs from the manifest."""
+    changed = []
+    for name, info in manifest["files"].items():
+        path = os.path.join(BASE_DIR, name)
+        try:
+            if os.path.getsize(path) == info["size"] and file_sha256(path) == info["sha256"]:
+                continue
+        except OSError:
+            pass
+        changed.append(name)
+    return changed
+
+# ------------------ Download & Swap ------------------
+def _staging_path(name):
+    return os.path.join(BASE_DIR, f"{name}.{os.getpid()}.update")
+
+def remove_stale_staging():
+    """Delete staging files left behind by an update that was killed mid-download."""
+    for entry in os.listdir(BASE_DIR):
+        if entry.endswith(".update"):
+            try:
+                os.remove(os.path.join(BASE_DIR, entry))
+            except OSError:
+                pass
+
+def download_file(url, local, session=requests, expected=None):
+    """
+    Download *url* into a staging file next to *local* and return its path.
+
+    With *expected* ({"sha256", "size"}) the content is verified before it is
+    accepted. Returns None on any failure; *local* itself is never touched.
+    """
+    try:
+        r = session.get(url, timeout=DOWNLOAD_TIMEOUT)
+        if r.status_code != 200:
             print(f"❌ Failed to fetch {url} ({r.status_code})")
+            return None
+        data = r.content
+        if expected is not None:
+            if len(data) != expected["size"] or hashlib.sha256(data).hexdigest() != expected["sha256"]:
+                print(f"❌ Hash mismatch for {url}, not installing it")
+                return None
+        staged = _staging_path(os.path.basename(local))
+        with open(staged, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return staged
     except Exception as e:
         print(f"❌ Error fetching {url}: {e}")
-    return False
+    return None
+
+def install_files(names, session, manifest=None):
+    """
+    Fetch *names* in parallel, then swap them in with os.replace.
+
+    Nothing is replaced unless every download succeeded (and verified), so an
+    interrupted or failed update leaves the old scripts untouched.
+    """
+    files = (manifest or {}).get("files", {})
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+        staged = list(pool.map(
+            lambda name: download_file(_url_for(name), os.path.join(BASE_DIR, name), session, files.get(name)),
+            names,
+        ))
+
+    if not all(staged):
+        for path in staged:
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        print("❌ Update aborted, existing files were left unchanged.")
+        return False
+
+    for name, path in zip(names, staged):
+        os.replace(path, os.path.join(BASE_DIR, name))
+        print(f"✅ Updated {name}")
+    return True
+
+def write_local_version(version):
+    tmp = LOCAL_VERSION_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(version)
+    os.replace(tmp, LOCAL_VERSION_FILE)
 
 def ask_user_update(local_version, remote_version):
     root = tk.Tk()
@@ -79,35 +231,44 @@ def run_main():
 
 # ------------------ Main Updater Logic ------------------
 def main():
+    remove_stale_staging()
+    session = make_session()
     local_version = read_local_version()
-    remote_version = fetch_remote_version() or local_version
+    manifest = fetch_manifest(session)
+    remote_version = (manifest or {}).get("version") or fetch_remote_version(session) or local_version
 
     print(f"Local version: {local_version}")
     print(f"Remote version: {remote_version}")
 
-    # 1️⃣ Download missing files
-    missing_files = [fname for fname in URLS if not os.path.exists(os.path.join(BASE_DIR, fname))]
-    if missing_files:
-        print("⬇️ Downloading missing file(s)...")
-        for fname in missing_files:
-            download_file(URLS[fname], os.path.join(BASE_DIR, fname))
-        print("✅ Missing files downloaded.")
-
-    # 2️⃣ Auto update (no user prompt)
-    if remote_version != local_version:
-        print("⬇️ New version detected. Updating automatically...")
-
-        for fname, url in URLS.items():
-            download_file(url, os.path.join(BASE_DIR, fname))
+    if manifest is not None:
+        # 1️⃣ Missing files always, changed files only when the version moved
+        if remote_version != local_version:
+            names = changed_files(manifest)
+        else:
+            names = [n for n in manifest["files"] if not os.path.exists(os.path.join(BASE_DIR, n))]
+    else:
+        # No manifest: fall back to fetching everything on a version change
+        all_names = [os.path.basename(fname) for fname in URLS if os.path.basename(fname) != "version.txt"]
+        if remote_version != local_version:
+            names = all_names
+        else:
+            names = [n for n in all_names if not os.path.exists(os.path.join(BASE_DIR, n))]
 
-        # Update version file
-        with open(LOCAL_VERSION_FILE, "w") as f:
-            f.write(remote_version)
+    ok = True
+    if names:
+        print(f"⬇️ Downloading {len(names)} file(s): {', '.join(names)}")
+        ok = install_files(names, session, manifest)
 
+    # 2️⃣ Only record the new version once its files are in place
+    if ok and remote_version != local_version:
+        write_local_version(remote_version)
         print("✅ Update complete.")
 
     run_main()
 
 
 if __name__ == "__main__":
-    main()
+    if "--write-manifest" in sys.argv:
+        write_manifest()
+    else:
+        main()